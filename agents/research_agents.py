@@ -2,15 +2,17 @@ from autogen_agentchat.agents import AssistantAgent
 from autogen_core.models import ChatCompletionClient
 from typing import Dict, List, Any
 
-def create_research_agents(model_client: ChatCompletionClient, paper_discovery_tools: List[Any] = []) -> Dict[str, AssistantAgent]:
+def create_research_agents(model_client: ChatCompletionClient, paper_discovery_tools: List[Any] = [], model_client_stream: bool = True) -> Dict[str, AssistantAgent]:
     """
     Creates and returns the research agents with specific system messages.
+    With model_client_stream, agents call create_stream and emit token chunks.
     """
     
     # Task 3: Topic Refinement Agent
     topic_refinement_agent = AssistantAgent(
         name="Topic_Refinement_Agent",
         model_client=model_client,
+        model_client_stream=model_client_stream,
         system_message="""You are an expert Research Topic Refiner.
 Your goal is to help the user clarify and refine their research topic.
 1. Analyze the user's initial query.
@@ -25,6 +27,7 @@ If you need human intervention at any point, end your message with 'REQUEST_USER
     paper_discovery_agent = AssistantAgent(
         name="Paper_Discovery_Agent",
         model_client=model_client,
+        model_client_stream=model_client_stream,
         tools=paper_discovery_tools,
         system_message="""You are a Paper Discovery Specialist.
 Your goal is to find the most relevant papers for the refined topic.
@@ -40,6 +43,7 @@ If you need human intervention at any point, end your message with 'REQUEST_USER
     insight_agent = AssistantAgent(
         name="Insight_Synthesizer_Agent",
         model_client=model_client,
+        model_client_stream=model_client_stream,
         system_message="""You are a Research Insight Synthesizer.
 Your goal is to extract key findings from the discovered papers.
 1. Read the titles and abstracts (and content if provided) of the discovered papers.
@@ -54,6 +58,7 @@ If you need human intervention at any point, end your message with 'REQUEST_USER
     report_agent = AssistantAgent(
         name="Report_Compiler_Agent",
         model_client=model_client,
+        model_client_stream=model_client_stream,
         system_message="""You are a Professional Report Compiler.
 Your goal is to compile the research findings into a coherent report.
 Format the report with:
@@ -71,6 +76,7 @@ If you need human intervention at any point, end your message with 'REQUEST_USER
     gap_agent = AssistantAgent(
         name="Gap_Analysis_Agent",
         model_client=model_client,
+        model_client_stream=model_client_stream,
         system_message="""You are a Research Gap Analyst.
 Your goal is to identify missing pieces in the current literature.
 1. Analyze the compiled report.
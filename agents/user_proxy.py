@@ -3,17 +3,21 @@ from autogen_agentchat.messages import TextMessage
 from autogen_core import CancellationToken
 from autogen_agentchat.base import Response
 import asyncio
+from typing import Callable, Optional
 
 class InteractiveUserProxyAgent(UserProxyAgent):
-    def __init__(self, name: str = "User_Proxy", description: str = "A human user."):
-        super().__init__(name=name, description=description)
+    def __init__(self, name: str = "User_Proxy", description: str = "A human user.", read_input: Optional[Callable[[str], str]] = None):
+        # Defaults to the console; benchmarks and tests pass a scripted reply.
+        # Group chats read input through input_func, direct on_messages calls through read_input.
+        super().__init__(name=name, description=description, input_func=read_input)
+        self.read_input = read_input or input
 
     async def on_messages(self, messages, cancellation_token: CancellationToken) -> Response:
         # We don't print here because the orchestration loop prints.
         # But we MUST block for input.
         print(f"\n[User_Proxy]: Requesting input...")
-        user_input = await asyncio.to_thread(input, "Enter your response: ")
+        user_input = await asyncio.to_thread(self.read_input, "Enter your response: ")
         return Response(chat_message=TextMessage(content=user_input, source=self.name))
 
-def create_user_proxy() -> UserProxyAgent:
-    return InteractiveUserProxyAgent()
+def create_user_proxy(read_input: Optional[Callable[[str], str]] = None) -> UserProxyAgent:
+    return InteractiveUserProxyAgent(read_input=read_input)
@@ -0,0 +1,91 @@
+"""
+Offline arXiv search (tools/arxiv_index.py) on a synthetic metadata snapshot.
+
+Writes N papers in the public JSON-lines dump format (titles and abstracts
+drawn from a Zipf-distributed vocabulary), builds the index, then reports
+build time, index size, cold open time and query latency percentiles for
+search_arxiv with ARXIV_BACKEND=offline. The live API path is paced at one
+query per ARXIV_MIN_INTERVAL (3 s) on top of the round trip.
+
+Usage:
+    python -m benchmarks.bench_arxiv_index --papers 200000 --queries 200
+"""
+import os
+import argparse
+import itertools
+import json
+import random
+import tempfile
+import time
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+CATEGORIES = ["cs.AI", "cs.LG", "cs.MA", "cs.RO", "cs.CV", "cs.CL", "stat.ML", "math.OC", "q-bio.BM", "physics.soc-ph"]
+
+def write_snapshot(path: str, papers: int, vocabulary: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    words = [f"term{i}" for i in range(vocabulary)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(papers):
+            title = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(6, 14)))
+            abstract = " ".join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(80, 200)))
+            year, month = 2007 + i % 18, 1 + i % 12
+            f.write(json.dumps({
+                "id": f"{year % 100:02d}{month:02d}.{i:05d}",
+                "authors": "A. Author, B. Author",
+                "title": title,
+                "categories": " ".join(rng.sample(CATEGORIES, rng.randint(1, 3))),
+                "abstract": abstract,
+                "versions": [{"version": "v1", "created": f"Mon, 1 {MONTHS[month - 1]} {year} 00:00:00 GMT"}],
+                "update_date": f"{year}-{month:02d}-01",
+                "authors_parsed": [["Author", "A.", ""], ["Author", "B.", ""]],
+            }) + "\n")
+
+def _percentile(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=100000, help="papers in the synthetic snapshot")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="distinct words")
+    parser.add_argument("--queries", type=int, default=200, help="timed searches")
+    parser.add_argument("--max-results", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "snapshot.json")
+        index_path = os.path.join(tmp, "index")
+        os.environ["ARXIV_BACKEND"] = "offline"
+        os.environ["ARXIV_INDEX_PATH"] = index_path
+        from tools.arxiv_index import build_index
+        import tools.arxiv_search as arxiv_search
+
+        started = time.perf_counter()
+        write_snapshot(snapshot, args.papers, args.vocabulary)
+        print(f"snapshot: {args.papers} papers, {os.path.getsize(snapshot) / 1e6:.0f} MB in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        stats = build_index(snapshot, index_path)
+        size = sum(os.path.getsize(os.path.join(index_path, name)) for name in os.listdir(index_path))
+        print(f"build: {time.perf_counter() - started:.1f}s, {stats['terms']} terms, {stats['postings']} postings, {size / 1e6:.0f} MB on disk")
+
+        rng = random.Random(1)
+        queries = [" ".join(f"term{rng.randint(0, 2000)}" for _ in range(rng.randint(2, 6))) for _ in range(args.queries)]
+        started = time.perf_counter()
+        arxiv_search.search_arxiv(queries[0], args.max_results)
+        print(f"cold open + first query: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        latencies = []
+        for i, query in enumerate(queries):
+            if i % 4 == 3:
+                query += " cat:cs.LG"
+            started = time.perf_counter()
+            arxiv_search.search_arxiv(query, args.max_results, sort_by_relevance=i % 5 != 4)
+            latencies.append(time.perf_counter() - started)
+        print(f"query: p50 {_percentile(latencies, 0.5) * 1000:.2f} ms | p95 {_percentile(latencies, 0.95) * 1000:.2f} ms | "
+              f"p99 {_percentile(latencies, 0.99) * 1000:.2f} ms over {len(latencies)} queries "
+              f"(live API: >= {arxiv_search.ARXIV_MIN_INTERVAL:.0f} s per uncached query)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of per-step CrewAI setup overhead.
+
+"rebuild" is what graph/nodes.py used to do on every node call: build an
+Agent, a Task and a Crew(verbose=True). "pooled" checks a crew out of
+CrewRegistry and interpolates the step inputs into its templated task.
+No LLM call is made.
+
+Usage:
+    python -m benchmarks.bench_crew_setup --steps 200
+"""
+import os
+import argparse
+import time
+
+# Only object construction is measured; the key is never used
+os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+
+from crewai import Crew
+from crew.agents import ResearchAgents
+from crew.tasks import ResearchTasks
+from crew.registry import CrewRegistry
+
+TOPIC = "Multi-agent systems for autonomous driving"
+
+def rebuild_step(agents, tasks):
+    agent = agents.topic_refiner()
+    task = tasks.refine_task(agent, TOPIC)
+    return Crew(agents=[agent], tasks=[task], verbose=True)
+
+def pooled_step(registry):
+    with registry.checkout("refine") as crew:
+        crew._interpolate_inputs({"topic": TOPIC})
+        return crew
+
+def measure(name, fn, steps):
+    fn()  # warm-up (imports, first pool entry)
+    start = time.perf_counter()
+    for _ in range(steps):
+        fn()
+    per_step = (time.perf_counter() - start) / steps
+    print(f"{name:>8}: {per_step * 1000:8.3f} ms/step")
+    return per_step
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    agents = ResearchAgents(stream=True)
+    tasks = ResearchTasks()
+    registry = CrewRegistry(stream=True)
+
+    rebuild = measure("rebuild", lambda: rebuild_step(agents, tasks), args.steps)
+    pooled = measure("pooled", lambda: pooled_step(registry), args.steps)
+    print(f"speed-up: {rebuild / pooled:.1f}x, crews built by the pool: {registry.stats()['created']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Prompt size per pipeline stage for each handoff format (graph/handoff.py),
+measured against the mock Gemini service (benchmarks/mock_services.py).
+
+Runs the LangGraph pipeline once per format with rule routing and reports,
+per worker stage, the estimated size of the stage inputs (handoff tokens) and
+the prompt tokens the mock counted for the stage's LLM calls (request bytes / 4).
+
+    text  the previous stage's full output (before graph/handoff.py)
+    json  compact outline: IDs, titles, key points
+
+Usage:
+    python -m benchmarks.bench_handoff --response-tokens 800
+"""
+import os
+import argparse
+import asyncio
+import json
+import tempfile
+from benchmarks.bench_load import TOPIC, configure_env
+from benchmarks.mock_services import MockSettings, ServerThread, create_mock_app
+
+STAGES = ["Topic_Refiner", "Paper_Discoverer", "Insight_Synthesizer", "Report_Compiler", "Gap_Analyst"]
+
+async def run_pipeline(fmt: str) -> None:
+    from langchain_core.messages import HumanMessage
+    import graph.handoff as handoff
+    from graph.checkpoint import session_config
+    from graph.workflow import create_workflow
+    from server.events import graph_events
+
+    handoff.HANDOFF_FORMAT = fmt
+    config = session_config(f"handoff-{fmt}", routing_mode="rule", use_memo=False)
+    async for event in graph_events(create_workflow(), {"messages": [HumanMessage(content=TOPIC)]}, config, stream_tokens=False):
+        if event["type"] == "error":
+            raise RuntimeError(event)
+
+def stage_tokens(trace_file: str, fmt: str) -> dict:
+    totals = {}
+    with open(trace_file, encoding="utf-8") as f:
+        for line in f:
+            span = json.loads(line)
+            if span["kind"] == "node" and span["session"] == f"handoff-{fmt}" and span["name"] in STAGES:
+                handoff_tokens, prompt_tokens = totals.get(span["name"], (0, 0))
+                totals[span["name"]] = (handoff_tokens + span.get("handoff_tokens", 0), prompt_tokens + span.get("prompt_tokens", 0))
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", default=["text", "json"], choices=["text", "json"])
+    parser.add_argument("--response-tokens", type=int, default=800, help="approximate tokens per mock reply")
+    parser.add_argument("--arxiv-results", type=int, default=5, help="papers per mock arXiv query")
+    args = parser.parse_args()
+
+    settings = MockSettings(latency=0, tokens_per_second=0, response_tokens=args.response_tokens, arxiv_latency=0, arxiv_results=args.arxiv_results)
+    with ServerThread(create_mock_app(settings)) as mock, tempfile.TemporaryDirectory() as cache_dir:
+        configure_env(mock.url, cache_dir)
+        trace_file = os.path.join(cache_dir, "trace.jsonl")
+        os.environ["TRACE_FILE"] = trace_file
+
+        results = {}
+        for fmt in args.formats:
+            asyncio.run(run_pipeline(fmt))
+            results[fmt] = stage_tokens(trace_file, fmt)
+
+    print(f"{'stage':<20}" + "".join(f"{fmt + ' handoff':>14}{fmt + ' prompt':>14}" for fmt in args.formats))
+    for stage in STAGES:
+        print(f"{stage:<20}" + "".join(f"{results[fmt].get(stage, (0, 0))[0]:>14}{results[fmt].get(stage, (0, 0))[1]:>14}" for fmt in args.formats))
+    print(f"{'total':<20}" + "".join(
+        f"{sum(h for h, _ in results[fmt].values()):>14}{sum(p for _, p in results[fmt].values()):>14}" for fmt in args.formats
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Offline load test of the research workflows against the local Gemini/arXiv
+stand-ins in benchmarks/mock_services.py (no API key or network needed).
+
+Modes:
+    stream   POST /research-stream (SSE); time to first event = first data frame
+    sync     POST /researchagents (legacy, one JSON response per session)
+    autogen  workflow.orchestration.run_workflow in this process
+
+The FastAPI app is served by uvicorn on a background thread unless --target
+points at a running server (which must itself use GEMINI_API_BASE and
+ARXIV_API_URL of the mock, see --mock). Reports p50/p95/p99 session latency,
+time to first event (TTFE), time to first agent output and sessions/sec.
+
+Usage:
+    python -m benchmarks.bench_load --mode stream sync autogen --sessions 32 --concurrency 8
+    python -m benchmarks.bench_load --mode stream --latency 0.5 --tokens-per-second 100
+"""
+import os
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+
+TOPIC = "Multi-agent systems for autonomous driving"
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def configure_env(mock_url: str, cache_dir: str) -> None:
+    """
+    Points every client at the mock and turns off what would distort an
+    offline run (quota pacing, arXiv politeness delay, caches, durable
+    checkpoints). Must run before the app modules are imported.
+    """
+    os.environ["GEMINI_API_BASE"] = mock_url
+    os.environ["ARXIV_API_URL"] = f"{mock_url}/api/query"
+    os.environ["ARXIV_PDF_URL"] = f"{mock_url}/pdf/{{id}}"
+    os.environ.setdefault("PDF_CACHE_DIR", os.path.join(cache_dir, "pdfs"))
+    os.environ.setdefault("CORPUS_PATH", os.path.join(cache_dir, "corpus"))
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+    os.environ.setdefault("GEMINI_RPM", "0")
+    os.environ.setdefault("ARXIV_MIN_INTERVAL", "0")
+    os.environ.setdefault("ARXIV_CACHE_PATH", os.path.join(cache_dir, "arxiv_cache.sqlite"))
+    os.environ.setdefault("GEMINI_RESPONSE_CACHE", "0")
+    os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+    # Build the graphs before the first session, so its latency is not inflated by the warmup
+    os.environ.setdefault("WARMUP", "eager")
+    os.environ.setdefault("CREW_VERBOSE", "false")
+    # Repeated sessions on one topic would otherwise be answered from the research memo store
+    os.environ.setdefault("MEMO_STORE", "0")
+
+class Sample:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_event = None
+        self.first_output = None
+        self.end = None
+        self.error = None
+
+    def mark(self, output: bool = False) -> None:
+        now = time.perf_counter() - self.start
+        if self.first_event is None:
+            self.first_event = now
+        if output and self.first_output is None:
+            self.first_output = now
+
+async def stream_session(client, target: str, args) -> Sample:
+    sample = Sample()
+    body = {"topic": TOPIC, "session_id": uuid.uuid4().hex, "parallel": args.parallel, "routing_mode": args.routing_mode}
+    async with client.stream("POST", f"{target}/research-stream", json=body) as response:
+        if response.status_code != 200:
+            sample.error = f"HTTP {response.status_code}"
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            sample.mark(output=event.get("type") in ("message", "delta"))
+            if event.get("type") == "error":
+                sample.error = event.get("content")
+    sample.end = time.perf_counter() - sample.start
+    return sample
+
+async def sync_session(client, target: str, args) -> Sample:
+    sample = Sample()
+    body = {"topic": TOPIC, "parallel": args.parallel, "routing_mode": args.routing_mode}
+    response = await client.post(f"{target}/researchagents", json=body)
+    sample.mark(output=True)
+    if response.status_code != 200:
+        sample.error = f"HTTP {response.status_code}"
+    sample.end = time.perf_counter() - sample.start
+    return sample
+
+async def autogen_session(client, target: str, args) -> Sample:
+    from workflow.orchestration import run_workflow
+    sample = Sample()
+    # The first item is the task itself; agent replies carry a model source
+    on_message = lambda msg: sample.mark(output=getattr(msg, "source", "user") not in ("user", "User_Proxy"))
+    await run_workflow(TOPIC, read_input=lambda prompt: "TERMINATE", on_message=on_message, verbose=False, close_http_pool=False)
+    sample.end = time.perf_counter() - sample.start
+    return sample
+
+SESSIONS = {"stream": stream_session, "sync": sync_session, "autogen": autogen_session}
+
+async def run_mode(mode: str, target: str, mock_url: str, args) -> None:
+    import httpx
+    from tools.custom_gemini_client import close_shared_http_client
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        await client.delete(f"{mock_url}/stats")
+
+        async def one():
+            async with semaphore:
+                try:
+                    return await SESSIONS[mode](client, target, args)
+                except Exception as e:
+                    sample = Sample()
+                    sample.error = f"{type(e).__name__}: {e}"
+                    sample.end = time.perf_counter() - sample.start
+                    return sample
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(one() for _ in range(args.sessions)))
+        wall = time.perf_counter() - start
+        calls = (await client.get(f"{mock_url}/stats")).json()
+    await close_shared_http_client()
+
+    ok = [s for s in samples if s.error is None]
+    errors = [s.error for s in samples if s.error is not None]
+    peak = calls.pop("peak_in_flight")
+
+    def row(name, values):
+        return (f"  {name:<13} p50 {_percentile(values, 0.5) * 1000:9.1f} ms | "
+                f"p95 {_percentile(values, 0.95) * 1000:9.1f} ms | p99 {_percentile(values, 0.99) * 1000:9.1f} ms")
+
+    print(f"{mode}: {len(ok)}/{len(samples)} ok in {wall:.2f}s -> {len(ok) / wall:.2f} sessions/s "
+          f"(concurrency {args.concurrency}); mock calls/session {json.dumps({k: round(v / len(samples), 1) for k, v in calls.items()})}, "
+          f"peak concurrent Gemini requests {peak}")
+    print(row("latency", [s.end for s in ok]))
+    print(row("first event", [s.first_event for s in ok if s.first_event is not None]))
+    print(row("first output", [s.first_output for s in ok if s.first_output is not None]))
+    for error in sorted(set(errors))[:5]:
+        print(f"  error ({errors.count(error)}x): {error[:200]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", nargs="+", choices=sorted(SESSIONS), default=["stream"], help="entry points to drive")
+    parser.add_argument("--sessions", type=int, default=16, help="sessions per mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions in flight at once")
+    parser.add_argument("--parallel", action="store_true", help="use the parallel graph (stream/sync)")
+    parser.add_argument("--routing-mode", default="rule", choices=["rule", "hybrid", "llm"], help="Supervisor routing (stream/sync)")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock Gemini seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="mock Gemini generation speed (0 = instant)")
+    parser.add_argument("--response-tokens", type=int, default=200, help="approximate tokens per mock reply")
+    parser.add_argument("--arxiv-latency", type=float, default=0.1, help="mock arXiv seconds per query")
+    parser.add_argument("--mock", help="URL of an already running benchmarks.mock_services")
+    parser.add_argument("--target", help="URL of an already running app (default: serve main:app in-process)")
+    args = parser.parse_args()
+
+    from benchmarks.mock_services import MockSettings, ServerThread, create_mock_app
+
+    mock = None
+    mock_url = args.mock
+    if mock_url is None:
+        settings = MockSettings(args.latency, args.tokens_per_second, args.response_tokens, arxiv_latency=args.arxiv_latency)
+        mock = ServerThread(create_mock_app(settings)).start()
+        mock_url = mock.url
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        configure_env(mock_url, cache_dir)
+        app_server = None
+        target = args.target
+        if target is None and set(args.mode) & {"stream", "sync"}:
+            from main import app
+            app_server = ServerThread(app).start()
+            target = app_server.url
+
+        print(f"mock {mock_url}, app {target}, {args.sessions} sessions/mode")
+        try:
+            for mode in args.mode:
+                asyncio.run(run_mode(mode, target, mock_url, args))
+        finally:
+            if app_server is not None:
+                app_server.stop()
+            if mock is not None:
+                mock.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark for the /research-stream SSE writer.
+
+Compares the legacy event generator (fixed asyncio.sleep(0.1) after every event)
+with server.sse.sse_stream over a fake graph, so no LLM or network is involved.
+
+Usage:
+    python -m benchmarks.bench_sse --sessions 50 --steps 11 --step-latency 0.0
+"""
+import argparse
+import asyncio
+import json
+import time
+from server.events import graph_events
+from server.sse import sse_stream
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+class FakeGraph:
+    """
+    Replays the update sequence of a full research run (Supervisor <-> 5 workers).
+    """
+    WORKERS = ["Topic_Refiner", "Paper_Discoverer", "Insight_Synthesizer", "Report_Compiler", "Gap_Analyst"]
+
+    def __init__(self, steps: int, step_latency: float, deltas_per_step: int):
+        self.steps = steps
+        self.step_latency = step_latency
+        self.deltas_per_step = deltas_per_step
+
+    async def astream(self, graph_input, stream_mode=None, config=None):
+        for i in range(self.steps):
+            await asyncio.sleep(self.step_latency)
+            worker = self.WORKERS[(i // 2) % len(self.WORKERS)]
+            if i % 2 == 0:
+                yield "updates", {"Supervisor": {"next": worker}}
+            else:
+                for d in range(self.deltas_per_step):
+                    yield "custom", {"agent": worker, "delta": f"token{d} "}
+                yield "updates", {worker: {"messages": [_Message(f"{worker}: output of step {i}")]}}
+
+async def legacy_generator(graph):
+    """
+    The pre-sse_stream event generator from main.py, including its pacing sleeps.
+    """
+    yield f"data: {json.dumps({'type': 'status', 'agent': 'Supervisor', 'status': 'planning'})}\n\n"
+    async for mode, output in graph.astream(None):
+        if mode == "custom":
+            yield f"data: {json.dumps({'type': 'delta', 'agent': output['agent'], 'content': output['delta']})}\n\n"
+            continue
+        for key, value in output.items():
+            if key == "Supervisor":
+                next_agent = value.get("next", "Unknown")
+                thought_content = f"Analyzed current state. Deciding next step: **{next_agent}**."
+                yield f"data: {json.dumps({'type': 'message', 'agent': 'Supervisor', 'content': thought_content})}\n\n"
+                await asyncio.sleep(0.1) # Force yield
+                yield f"data: {json.dumps({'type': 'status', 'agent': next_agent, 'status': 'working'})}\n\n"
+                await asyncio.sleep(0.1) # Force yield
+            else:
+                content = value["messages"][-1].content
+                yield f"data: {json.dumps({'type': 'message', 'agent': key, 'content': content})}\n\n"
+                await asyncio.sleep(0.1) # Force yield
+                yield f"data: {json.dumps({'type': 'status', 'agent': key, 'status': 'completed'})}\n\n"
+                await asyncio.sleep(0.1) # Force yield
+    yield f"data: {json.dumps({'type': 'status', 'agent': 'System', 'status': 'finished'})}\n\n"
+    await asyncio.sleep(0.1) # Force yield
+
+def new_generator(graph):
+    return sse_stream(graph_events(graph, None, {}, stream_tokens=True))
+
+async def _consume(stream):
+    """
+    Drains a stream like StreamingResponse would; returns (events, writes, seconds).
+    """
+    start = time.perf_counter()
+    events = writes = 0
+    async for chunk in stream:
+        writes += 1
+        events += chunk.count("data: ")
+    return events, writes, time.perf_counter() - start
+
+async def run_variant(name, make_stream, args):
+    graph_time = args.steps * args.step_latency
+
+    async def one_session():
+        graph = FakeGraph(args.steps, args.step_latency, args.deltas)
+        return await _consume(make_stream(graph))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_session() for _ in range(args.sessions)))
+    wall = time.perf_counter() - start
+
+    total_events = sum(r[0] for r in results)
+    total_writes = sum(r[1] for r in results)
+    mean_session = sum(r[2] for r in results) / len(results)
+    print(f"{name:>8}: {total_events / wall:10.0f} events/s | "
+          f"{total_writes / len(results):6.1f} writes/session | "
+          f"session {mean_session * 1000:8.1f} ms | "
+          f"overhead {(mean_session - graph_time) * 1000:8.1f} ms/session")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="concurrent SSE sessions")
+    parser.add_argument("--steps", type=int, default=11, help="graph steps per session (full run = 11)")
+    parser.add_argument("--step-latency", type=float, default=0.0, help="simulated seconds per graph step")
+    parser.add_argument("--deltas", type=int, default=20, help="token deltas emitted per worker step")
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.steps} steps, step latency {args.step_latency}s, {args.deltas} deltas/step")
+    asyncio.run(run_variant("legacy", legacy_generator, args))
+    asyncio.run(run_variant("sse", new_generator, args))
+
+if __name__ == "__main__":
+    main()
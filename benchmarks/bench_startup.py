@@ -0,0 +1,94 @@
+"""
+Cold start of the FastAPI backend, in fresh processes.
+
+import      `import main` (the server process's import phase), median of --runs
+server      `uvicorn main:app` per WARMUP mode: time from process start to the
+            first 200 from /health (liveness) and from /ready (graphs and crew
+            registry built, see main.warmup)
+
+No API key or network is needed; checkpoints are kept in memory.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --warmup eager background lazy
+"""
+import os
+import sys
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import time
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("crewai", "langgraph", "langchain_google_genai")
+
+IMPORT_SCRIPT = f"""
+import sys, time, json
+started = time.perf_counter()
+import main
+print(json.dumps({{"seconds": time.perf_counter() - started, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+def _env(**extra) -> dict:
+    env = dict(os.environ, CHECKPOINT_BACKEND="memory", GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "benchmark-key"))
+    env.update(extra)
+    return env
+
+def measure_import() -> dict:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=_env(), capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _wait_for(client: httpx.Client, url: str, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+def measure_server(warmup: str, timeout: float = 120.0) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(WARMUP=warmup), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            health = _wait_for(client, f"{base}/health", started, timeout)
+            if warmup == "lazy":
+                # Nothing is built until a request needs a graph
+                client.get(f"{base}/sessions/unknown")
+            ready = _wait_for(client, f"{base}/ready", started, timeout)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"health": health, "ready": ready}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per measurement")
+    parser.add_argument("--warmup", nargs="+", default=["eager", "background"], choices=["eager", "background", "lazy"])
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    print(f"import main: median {statistics.median(i['seconds'] for i in imports):.2f}s "
+          f"(heavy modules loaded: {imports[0]['heavy'] or 'none'})")
+
+    for warmup in args.warmup:
+        runs = [measure_server(warmup) for _ in range(args.runs)]
+        print(f"WARMUP={warmup:<10} first healthy /health: median {statistics.median(r['health'] for r in runs):.2f}s | "
+              f"/ready: median {statistics.median(r['ready'] for r in runs):.2f}s")
+
+if __name__ == "__main__":
+    main()
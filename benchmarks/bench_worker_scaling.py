@@ -0,0 +1,68 @@
+"""
+Worker-stage scaling against the mock Gemini service (benchmarks/mock_services.py).
+
+Runs N concurrent pooled "report" stages for each execution path:
+
+    legacy  asyncio.to_thread(crew.kickoff), the old graph/nodes.py path
+            (default executor: min(32, cpu + 4) threads)
+    thread  crew.kickoff on the dedicated crew executor (CREW_THREADS)
+    async   crew.execution.run_crew: the agent LLM's native acall(), no threads
+
+and reports wall time, stages/s and the peak number of concurrent Gemini
+requests seen by the mock. Crews are built up front so only execution is measured.
+
+Usage:
+    python -m benchmarks.bench_worker_scaling --concurrency 8 32 64 --latency 1.0
+"""
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+from benchmarks.bench_load import configure_env
+from benchmarks.mock_services import MockSettings, ServerThread, create_mock_app
+
+async def run_variant(variant: str, registry, concurrency: int, mock_url: str) -> None:
+    import httpx
+    from crew.execution import run_crew
+
+    async def one(i):
+        with registry.checkout("report") as crew:
+            inputs = {"insights": f"Insights of session {i}"}
+            if variant == "legacy":
+                return str(await asyncio.to_thread(crew.kickoff, inputs=inputs))
+            return await run_crew(crew, inputs, mode=variant)
+
+    async with httpx.AsyncClient() as client:
+        await client.delete(f"{mock_url}/stats")
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(concurrency)))
+        wall = time.perf_counter() - start
+        peak = (await client.get(f"{mock_url}/stats")).json()["peak_in_flight"]
+    print(f"{variant:>7} x{concurrency:<4} {wall:7.2f}s | {concurrency / wall:7.1f} stages/s | peak concurrent requests {peak}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 64], help="concurrent stages per round")
+    parser.add_argument("--variants", nargs="+", default=["legacy", "thread", "async"], choices=["legacy", "thread", "async"])
+    parser.add_argument("--latency", type=float, default=1.0, help="mock Gemini seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="mock Gemini generation speed (0 = instant)")
+    args = parser.parse_args()
+
+    settings = MockSettings(latency=args.latency, tokens_per_second=args.tokens_per_second, response_tokens=100)
+    with ServerThread(create_mock_app(settings)) as mock, tempfile.TemporaryDirectory() as cache_dir:
+        configure_env(mock.url, cache_dir)
+        os.environ.setdefault("CREW_THREADS", str(max(args.concurrency)))
+        from crew.registry import CrewRegistry
+
+        registry = CrewRegistry(stream=True, pool_size=max(args.concurrency))
+        print(f"Building {max(args.concurrency)} pooled crews...")
+        registry.warm(["report"], per_stage=max(args.concurrency))
+        print(f"default executor: {min(32, (os.cpu_count() or 1) + 4)} threads, mock latency {args.latency}s")
+
+        for concurrency in args.concurrency:
+            for variant in args.variants:
+                asyncio.run(run_variant(variant, registry, concurrency, mock.url))
+
+if __name__ == "__main__":
+    main()
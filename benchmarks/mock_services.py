@@ -0,0 +1,256 @@
+"""
+Local stand-ins for the Gemini API and the arXiv query API, so the research
+workflows can be benchmarked offline and without spending quota.
+
+Gemini: POST /v1beta/models/{model}:generateContent and
+:streamGenerateContent (?alt=sse), as called by CustomGeminiClient, the
+google-genai SDK (CrewAI) and langchain-google-genai (Supervisor).
+arXiv: GET /api/query returning an Atom feed, GET /pdf/{id} a one-page PDF.
+
+Point the app at it with GEMINI_API_BASE=http://HOST:PORT and
+ARXIV_API_URL=http://HOST:PORT/api/query (benchmarks.bench_load does this).
+
+Usage:
+    python -m benchmarks.mock_services --port 8765 --latency 0.2 --tokens-per-second 200
+"""
+import argparse
+import asyncio
+import json
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# Shaped so every stage parses it: CrewAI's "Final Answer:", the refined topic
+# line and list items used by graph/discovery.py
+REPLY_TEMPLATE = (
+    "Thought: I now know the final answer.\n"
+    "Final Answer: Mock analysis for benchmarking.\n"
+    "**FINAL REFINED TOPIC:** Cooperative perception for multi-agent autonomous driving\n"
+    "1. Communication-efficient cooperative perception\n"
+    "2. Multi-agent reinforcement learning for traffic negotiation\n"
+    "3. Safety verification of learned driving policies\n"
+)
+
+@dataclass
+class MockSettings:
+    latency: float = 0.2            # seconds before the first token
+    tokens_per_second: float = 200  # generation speed after that (0 = instant)
+    response_tokens: int = 200      # approximate tokens per reply
+    chunk_tokens: int = 10          # tokens per streamed SSE chunk
+    arxiv_latency: float = 0.1      # seconds per arXiv query
+    arxiv_results: int = 5          # upper bound on entries per feed
+
+def reply_tokens(settings: MockSettings) -> List[str]:
+    """
+    The reply split into word-sized "tokens" (each keeps its trailing
+    whitespace, so joining any slices gives back the exact text).
+    """
+    tokens = re.findall(r"\S+\s*", REPLY_TEMPLATE)
+    filler = max(0, settings.response_tokens - len(tokens))
+    return tokens + [f"detail{i % 50} " for i in range(filler)]
+
+def _candidate(text: str) -> dict:
+    return {"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": completion_tokens,
+        "totalTokenCount": prompt_tokens + completion_tokens,
+    }
+
+def atom_feed(query: str, count: int) -> str:
+    entries = []
+    for i in range(count):
+        ident = f"2401.{abs(hash((query, i))) % 100000:05d}"
+        entries.append(f"""
+  <entry>
+    <id>http://arxiv.org/abs/{ident}v1</id>
+    <updated>2024-01-{i % 28 + 1:02d}T00:00:00Z</updated>
+    <published>2024-01-{i % 28 + 1:02d}T00:00:00Z</published>
+    <title>Mock paper {i + 1} on {escape(query)}</title>
+    <summary>We study {escape(query)} and report mock results for benchmarking purposes.</summary>
+    <author><name>Author {i + 1}</name></author>
+    <link href="http://arxiv.org/abs/{ident}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/{ident}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="cs.AI" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="cs.AI" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">
+  <title>arXiv Query: {escape(query)}</title>
+  <id>http://arxiv.org/api/mock</id>
+  <updated>2024-01-01T00:00:00Z</updated>
+  <opensearch:totalResults>{count}</opensearch:totalResults>
+  <opensearch:startIndex>0</opensearch:startIndex>
+  <opensearch:itemsPerPage>{count}</opensearch:itemsPerPage>{"".join(entries)}
+</feed>
+"""
+
+def minimal_pdf(lines: List[str]) -> bytes:
+    """
+    A valid one-page PDF showing the given lines in Helvetica (enough for
+    text extraction; no layout).
+    """
+    def literal(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    stream = "BT /F1 11 Tf 14 TL 50 780 Td " + " ".join(f"({literal(line)}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+def create_mock_app(settings: Optional[MockSettings] = None) -> FastAPI:
+    settings = settings or MockSettings()
+    app = FastAPI(title="Mock Gemini + arXiv")
+    app.state.settings = settings
+    app.state.requests: Dict[str, int] = {"generate": 0, "stream": 0, "arxiv": 0, "pdf": 0}
+    # Gemini requests being answered right now, and the most seen at once
+    app.state.in_flight = {"current": 0, "peak": 0}
+
+    def enter():
+        flight = app.state.in_flight
+        flight["current"] += 1
+        flight["peak"] = max(flight["peak"], flight["current"])
+
+    def leave():
+        app.state.in_flight["current"] -= 1
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate(model: str, request: Request):
+        app.state.requests["generate"] += 1
+        prompt_tokens = len(await request.body()) // 4
+        tokens = reply_tokens(settings)
+        delay = settings.latency + (len(tokens) / settings.tokens_per_second if settings.tokens_per_second > 0 else 0)
+        enter()
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            leave()
+        return JSONResponse({
+            "candidates": [_candidate("".join(tokens))],
+            "usageMetadata": _usage(prompt_tokens, len(tokens)),
+            "modelVersion": model,
+        })
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate(model: str, request: Request):
+        app.state.requests["stream"] += 1
+        prompt_tokens = len(await request.body()) // 4
+        tokens = reply_tokens(settings)
+        step = max(1, settings.chunk_tokens)
+
+        async def chunks():
+            enter()
+            try:
+                await asyncio.sleep(settings.latency)
+                for start in range(0, len(tokens), step):
+                    if start and settings.tokens_per_second > 0:
+                        await asyncio.sleep(step / settings.tokens_per_second)
+                    text = "".join(tokens[start:start + step])
+                    chunk = {"candidates": [_candidate(text)], "usageMetadata": _usage(prompt_tokens, min(len(tokens), start + step)), "modelVersion": model}
+                    yield f"data: {json.dumps(chunk)}\r\n\r\n"
+            finally:
+                leave()
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.get("/api/query")
+    async def arxiv_query(search_query: str = "", max_results: int = 10, start: int = 0):
+        app.state.requests["arxiv"] += 1
+        await asyncio.sleep(settings.arxiv_latency)
+        count = 0 if start else min(max_results, settings.arxiv_results)
+        return Response(atom_feed(search_query, count), media_type="application/atom+xml")
+
+    @app.get("/pdf/{arxiv_id:path}")
+    async def arxiv_pdf(arxiv_id: str):
+        app.state.requests["pdf"] += 1
+        await asyncio.sleep(settings.arxiv_latency)
+        lines = [f"Full text of mock paper {arxiv_id}."] + [
+            f"Section {i}: we evaluate cooperative perception and multi-agent reinforcement learning in setting {i}." for i in range(1, 30)
+        ]
+        return Response(minimal_pdf(lines), media_type="application/pdf")
+
+    @app.get("/stats")
+    async def stats():
+        return {**app.state.requests, "peak_in_flight": app.state.in_flight["peak"]}
+
+    @app.delete("/stats")
+    async def reset_stats():
+        app.state.requests.update({key: 0 for key in app.state.requests})
+        app.state.in_flight["peak"] = app.state.in_flight["current"]
+        return {}
+
+    return app
+
+class ServerThread:
+    """
+    Serves an ASGI app with uvicorn on a background thread (own event loop) on
+    a free local port. Usable as a context manager.
+    """
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.url = f"http://{host}:{self.sock.getsockname()[1]}"
+        config = uvicorn.Config(app, log_level="warning", lifespan="auto", timeout_keep_alive=30)
+        self.server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self.server.run, kwargs={"sockets": [self.sock]}, daemon=True)
+
+    def start(self, timeout: float = 30.0) -> "ServerThread":
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if not self._thread.is_alive() or time.time() > deadline:
+                raise RuntimeError(f"Server at {self.url} failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+        self.sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="generation speed (0 = instant)")
+    parser.add_argument("--response-tokens", type=int, default=200, help="approximate tokens per reply")
+    parser.add_argument("--arxiv-latency", type=float, default=0.1, help="seconds per arXiv query")
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.tokens_per_second, args.response_tokens, arxiv_latency=args.arxiv_latency)
+    print(f"Mock Gemini:  GEMINI_API_BASE=http://{args.host}:{args.port}")
+    print(f"Mock arXiv:   ARXIV_API_URL=http://{args.host}:{args.port}/api/query")
+    uvicorn.run(create_mock_app(settings), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
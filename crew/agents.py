@@ -2,71 +2,81 @@ import os
 from crewai import Agent, LLM
 from langchain_google_genai import ChatGoogleGenerativeAI
 from crew.tools import ArxivTools
+from tools.llm_scheduler import schedule_crewai_llm
 
 # Function to get the LLM
-def get_llm():
+def get_llm(stream: bool = False):
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY not found in environment variables")
     
+    # Optional API host override (see GEMINI_API_BASE in tools/custom_gemini_client.py)
+    base_url = os.getenv("GEMINI_API_BASE")
+    extra = {"client_params": {"http_options": {"base_url": base_url}}} if base_url else {}
+
     # Custom Gemini Client wrapped for CrewAI/LangChain
-    return LLM(
+    llm = LLM(
         model="gemini/gemini-2.5-flash", # Using available Flash model
         api_key=api_key,
-        temperature=0.7
+        temperature=0.7,
+        stream=stream, # Emit token chunks on the CrewAI event bus
+        **extra
     )
+    # Every call waits for the process-wide Gemini budget
+    return schedule_crewai_llm(llm)
 
 class ResearchAgents:
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(self, stream: bool = False, verbose: bool = True):
+        self.llm = get_llm(stream=stream)
+        self.verbose = verbose
 
-    def topic_refiner(self):
+    def topic_refiner(self, llm=None):
         return Agent(
             role='Research Topic Refiner',
             goal='Clarify and refine the user\'s research topic',
             backstory='You are an expert academic advisor. Your job is to take a vague research interest and refine it into a specific, viable research topic with clear scope.',
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False,
-            llm=self.llm
+            llm=llm or self.llm
         )
 
-    def paper_discoverer(self):
+    def paper_discoverer(self, llm=None):
         return Agent(
             role='Paper Discovery Specialist',
             goal='Find relevant and high-quality research papers',
             backstory='You are a skilled librarian and researcher. You know how to search arXiv effectively to find the most relevant papers for a given topic.',
             tools=[ArxivTools.search_arxiv],
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False,
-            llm=self.llm
+            llm=llm or self.llm
         )
 
-    def insight_synthesizer(self):
+    def insight_synthesizer(self, llm=None):
         return Agent(
             role='Research Insight Synthesizer',
             goal='Extract and synthesize key insights from papers',
             backstory='You are an analytical thinker. You read paper summaries and extract the most important findings, methodologies, and common themes.',
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False,
-            llm=self.llm
+            llm=llm or self.llm
         )
 
-    def report_compiler(self):
+    def report_compiler(self, llm=None):
         return Agent(
             role='Report Compiler',
             goal='Compile findings into a professional research report',
             backstory='You are a professional technical writer. You take synthesized insights and organize them into a well-structured, academic standard report.',
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False,
-            llm=self.llm
+            llm=llm or self.llm
         )
 
-    def gap_analyst(self):
+    def gap_analyst(self, llm=None):
         return Agent(
             role='Research Gap Analyst',
             goal='Identify opportunities for future research',
             backstory='You are a visionary researcher. You look at what has been done and identify what is missing, proposing novel directions for future work.',
-            verbose=True,
+            verbose=self.verbose,
             allow_delegation=False,
-            llm=self.llm
+            llm=llm or self.llm
         )
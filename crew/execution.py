@@ -0,0 +1,87 @@
+import os
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+from tools.cancellation import raise_if_cancelled
+
+# Annotations only: importing CrewAI takes seconds and the server starts without it (see main.warmup)
+if TYPE_CHECKING:
+    from crewai import Crew
+
+# "async": tool-free crews call their LLM's native acall() on the event loop; crews with
+# tools (and everything in "thread" mode) run crew.kickoff on the dedicated crew executor
+CREW_EXECUTION = os.getenv("CREW_EXECUTION", "async")
+# Size of the crew executor. Only tool-using stages and crew construction use it in
+# "async" mode; in "thread" mode it bounds how many stages run at once.
+CREW_THREADS = int(os.getenv("CREW_THREADS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_crew_executor() -> ThreadPoolExecutor:
+    """
+    Dedicated thread pool for blocking CrewAI work, so it never competes with
+    (or is capped by) the event loop's default executor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CREW_THREADS, thread_name_prefix="crew")
+        return _executor
+
+def shutdown_crew_executor() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Runs fn on the crew executor with a copy of the current context (like
+    asyncio.to_thread), so delta sinks, spans, the LLM session and the run's
+    cancellation token carry over.
+    """
+    raise_if_cancelled()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_crew_executor(), call)
+
+def uses_tools(crew: "Crew") -> bool:
+    return any(agent.tools for agent in crew.agents)
+
+def task_messages(crew: "Crew", inputs: dict) -> list:
+    """
+    The prompt CrewAI gives a single tool-free agent: its role-playing system
+    message and the interpolated task with its expected output.
+    """
+    crew._interpolate_inputs(inputs)
+    agent, task = crew.agents[0], crew.tasks[0]
+    return [
+        {"role": "system", "content": f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"},
+        {"role": "user", "content": task.prompt()},
+    ]
+
+def final_answer(text: str) -> str:
+    # Models sometimes answer in CrewAI's ReAct format anyway
+    marker = "Final Answer:"
+    return text.split(marker, 1)[1].strip() if marker in text else text.strip()
+
+async def run_crew(crew: "Crew", inputs: dict, mode: str = None) -> str:
+    """
+    Runs a pooled single-task crew and returns its final output.
+
+    CrewAI's akickoff still hops through the default executor for every agent
+    step, so tool-free crews skip it and await the agent's LLM directly (no
+    thread at all). Crews with tools need CrewAI's tool loop and run kickoff
+    on the crew executor.
+    """
+    mode = mode or CREW_EXECUTION
+    if mode == "async" and len(crew.tasks) == 1 and not uses_tools(crew):
+        result = await crew.agents[0].llm.acall(task_messages(crew, inputs))
+        return final_answer(str(result))
+    result = await run_blocking(crew.kickoff, inputs=inputs)
+    return str(result)
@@ -0,0 +1,96 @@
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from crewai import Crew, Process
+from crew.agents import ResearchAgents, get_llm
+from crew.tasks import ResearchTasks
+from crew.execution import run_blocking
+
+# CrewAI console logging for pooled crews (verbose output is costly on a busy server)
+CREW_VERBOSE = os.getenv("CREW_VERBOSE", "false").lower() in ("1", "true", "yes")
+# Idle crews kept per stage; more are built on demand under load and dropped on return
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", "8"))
+
+# stage -> (agent factory, task factory with {placeholders} filled at kickoff)
+STAGES = {
+    "refine": ("topic_refiner", lambda tasks, agent: tasks.refine_task(agent, "{topic}")),
+    "discover": ("paper_discoverer", lambda tasks, agent: tasks.discovery_task(agent, "{refined_topic}", candidates="{candidates}")),
+    # Discovery when the arXiv fan-out found no candidates: the agent searches with its tool
+    "discover_search": ("paper_discoverer", lambda tasks, agent: tasks.discovery_task(agent, "{refined_topic}")),
+    "synthesize": ("insight_synthesizer", lambda tasks, agent: tasks.synthesis_task(agent, "{papers}")),
+    "paper_insight": ("insight_synthesizer", lambda tasks, agent: tasks.paper_insight_task(agent, "{paper}")),
+    "report": ("report_compiler", lambda tasks, agent: tasks.report_task(agent, "{insights}")),
+    "gap": ("gap_analyst", lambda tasks, agent: tasks.gap_analysis_task(agent, "{report}")),
+}
+
+class CrewRegistry:
+    """
+    Pool of ready-made single-agent crews, one pool per pipeline stage.
+
+    Each crew is built once from ResearchAgents/ResearchTasks with templated
+    task descriptions and is reused across requests: callers check a crew out,
+    run crew.kickoff(inputs={...}) and return it. A checked-out crew is never
+    shared, so concurrent requests get separate Agent/Crew/LLM instances.
+    """
+    def __init__(self, agents: ResearchAgents = None, tasks: ResearchTasks = None, pool_size: int = CREW_POOL_SIZE, verbose: bool = CREW_VERBOSE, stream: bool = True):
+        self.agents = agents or ResearchAgents(stream=stream, verbose=verbose)
+        self.tasks = tasks or ResearchTasks()
+        self.pool_size = pool_size
+        self.verbose = verbose
+        self.stream = stream
+        self._idle = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def build(self, stage: str) -> Crew:
+        """
+        Builds a new crew for a stage. Every crew gets its own LLM instance so
+        token usage and streaming state never mix between concurrent runs.
+        """
+        agent_factory, task_factory = STAGES[stage]
+        agent = getattr(self.agents, agent_factory)(llm=get_llm(stream=self.stream))
+        task = task_factory(self.tasks, agent)
+        with self._lock:
+            self.created += 1
+        return Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=self.verbose)
+
+    def _take(self, stage: str):
+        with self._lock:
+            return self._idle[stage].pop() if self._idle[stage] else None
+
+    def _give_back(self, stage: str, crew: Crew) -> None:
+        with self._lock:
+            if len(self._idle[stage]) < self.pool_size:
+                self._idle[stage].append(crew)
+
+    @contextmanager
+    def checkout(self, stage: str):
+        crew = self._take(stage) or self.build(stage)
+        # A crew whose run failed is dropped rather than reused
+        yield crew
+        self._give_back(stage, crew)
+
+    @asynccontextmanager
+    async def acheckout(self, stage: str):
+        """
+        checkout() for the event loop: a crew that has to be built (which
+        creates a Gemini client and its SSL contexts, ~0.1 s of CPU) is built
+        on the crew executor instead of blocking the loop.
+        """
+        crew = self._take(stage) or await run_blocking(self.build, stage)
+        yield crew
+        self._give_back(stage, crew)
+
+    def warm(self, stages=None, per_stage: int = 1) -> None:
+        """
+        Pre-builds crews so the first requests don't pay the setup cost.
+        """
+        for stage in stages or STAGES:
+            for _ in range(per_stage):
+                crew = self.build(stage)
+                with self._lock:
+                    self._idle[stage].append(crew)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"created": self.created, "idle": {stage: len(crews) for stage, crews in self._idle.items()}}
@@ -12,7 +12,22 @@ class ResearchTasks:
             agent=agent
         )
 
-    def discovery_task(self, agent, refined_topic):
+    def discovery_task(self, agent, refined_topic, candidates=""):
+        if candidates:
+            # Papers were already fetched by the parallel discovery fan-out
+            return Task(
+                description=f"""Using the refined topic from the previous task:
+            "{refined_topic}"
+            
+            These candidate papers were already retrieved from arXiv for the topic and its subtopics:
+            {candidates}
+            
+            1. Select the 3-5 most relevant papers from the candidates.
+            2. Only use the search_arxiv tool if the candidates are clearly insufficient.
+            3. Return a list of papers with their Titles, URLs, and Summaries.""",
+                expected_output="A list of 3-5 relevant research papers with details.",
+                agent=agent
+            )
         return Task(
             description=f"""Using the refined topic from the previous task:
             "{refined_topic}"
@@ -37,6 +52,18 @@ class ResearchTasks:
             agent=agent
         )
 
+    def paper_insight_task(self, agent, paper):
+        return Task(
+            description=f"""Analyze this single paper:
+            {paper}
+            
+            1. Extract its key findings, methodology, and results.
+            2. Note its limitations and how it relates to the research topic.
+            Keep it concise: at most 5 bullet points.""",
+            expected_output="A concise bullet-point summary of the paper's key insights.",
+            agent=agent
+        )
+
     def report_task(self, agent, insights):
         return Task(
             description=f"""Compile a comprehensive research report based on the synthesized insights:
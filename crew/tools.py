@@ -1,41 +1,25 @@
 from crewai.tools import tool
-import arxiv
 from typing import List, Dict, Any
+from tools.arxiv_search import search_arxiv as cached_search_arxiv
 
 class ArxivTools:
     @tool("Search arXiv")
     def search_arxiv(query: str):
         """
-        Search arXiv for papers based on a query. 
+        Search arXiv for papers based on a query.
         Useful for finding research papers on specific topics.
         """
         # Default parameters
         max_results = 5
         sort_by_relevance = True
-        
-        client = arxiv.Client()
-        sort_criterion = arxiv.SortCriterion.Relevance if sort_by_relevance else arxiv.SortCriterion.SubmittedDate
 
-        search = arxiv.Search(
-            query=query,
-            max_results=max_results,
-            sort_by=sort_criterion
-        )
+        # Shares the on-disk cache and rate limiter with the AutoGen tool
+        results = cached_search_arxiv(query, max_results=max_results, sort_by_relevance=sort_by_relevance)
 
-        results = []
-        for r in client.results(search):
-            results.append({
-                "title": r.title,
-                "summary": r.summary.replace("\n", " "),
-                "url": r.entry_id,
-                "published": str(r.published.date()),
-                "authors": [a.name for a in r.authors],
-                "categories": r.categories
-            })
-        
         # Format the results into a string for the LLM
         output = ""
         for p in results:
-            output += f"Title: {p['title']}\nURL: {p['url']}\nSummary: {p['summary']}\n---\n"
-            
+            summary = p['summary'].replace("\n", " ")
+            output += f"Title: {p['title']}\nURL: {p['url']}\nSummary: {summary}\n---\n"
+
         return output
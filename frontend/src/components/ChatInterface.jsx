@@ -74,6 +74,9 @@ export function ChatInterface({ messages, isLoading, activeAgent, onSend, onStop
                                     {!isUser && msg.agent && (
                                         <div className="text-[10px] font-semibold uppercase tracking-widest mb-2 text-stone-400 dark:text-stone-500 select-none flex items-center gap-1">
                                             {msg.agent.replace('_', ' ')}
+                                            {msg.streaming && msg.source && (
+                                                <span className="normal-case tracking-normal font-normal">· {msg.source}</span>
+                                            )}
                                         </div>
                                     )}
                                     <div className={`text-sm sm:text-base leading-relaxed ${isUser ? '' : 'markdown-body dark:markdown-invert font-normal text-stone-700 dark:text-stone-300'}`}>
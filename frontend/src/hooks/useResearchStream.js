@@ -1,37 +1,76 @@
 import { useState, useRef } from 'react';
 
+// Streamed text is buffered per agent and source: Paper_Insight branches of the parallel
+// workflow stream at the same time, one paper each
+const draftKey = (agent, source) => `${agent}::${source ?? ''}`;
+
 export function useResearchStream() {
     const [messages, setMessages] = useState([]);
     const [status, setStatus] = useState({}); // { agent: 'working' | 'completed' | 'idle' }
     const [activeAgent, setActiveAgent] = useState(null);
     const [isLoading, setIsLoading] = useState(false);
+    const [sessionId, setSessionId] = useState(null); // checkpointed session, used to resume an interrupted run
     const abortControllerRef = useRef(null);
+    const draftsRef = useRef(new Map()); // draftKey -> text streamed so far
 
     const handleEvent = (event) => {
-        if (event.type === 'status') {
+        if (event.type === 'session') {
+            setSessionId(event.session_id);
+        } else if (event.type === 'status') {
             setStatus(prev => ({ ...prev, [event.agent]: event.status }));
             if (event.status === 'working' || event.status === 'planning') {
                 setActiveAgent(event.agent);
             } else if (event.status === 'finished') {
                 setActiveAgent(null);
             }
+        } else if (event.type === 'delta') {
+            // Token deltas: grow one draft message per branch until the agent's final message arrives
+            const key = draftKey(event.agent, event.source);
+            const content = (draftsRef.current.get(key) || '') + event.content;
+            draftsRef.current.set(key, content);
+            setMessages(prev => {
+                const idx = prev.findIndex(m => m.streaming && m.draftKey === key);
+                if (idx !== -1) {
+                    return [...prev.slice(0, idx), { ...prev[idx], content }, ...prev.slice(idx + 1)];
+                }
+                return [...prev, {
+                    agent: event.agent,
+                    source: event.source,
+                    draftKey: key,
+                    content,
+                    type: 'agent',
+                    streaming: true,
+                    timestamp: Date.now()
+                }];
+            });
         } else if (event.type === 'message') {
-            setMessages(prev => [...prev, {
+            // The final message replaces the streamed drafts of the agent (all of its branches)
+            for (const key of [...draftsRef.current.keys()]) {
+                if (key.startsWith(draftKey(event.agent, ''))) draftsRef.current.delete(key);
+            }
+            setMessages(prev => [...prev.filter(m => !(m.streaming && m.agent === event.agent)), {
                 agent: event.agent,
                 content: event.content,
                 type: 'agent',
                 timestamp: Date.now()
             }]);
+        } else if (event.type === 'memo') {
+            // The run is answered (reuse) or seeded from a stored run of a similar topic
+            const action = event.mode === 'reuse' ? 'Reusing' : 'Starting from';
+            setMessages(prev => [...prev, {
+                agent: 'Supervisor',
+                content: `${action} earlier research on "${event.topic}" (similarity ${event.similarity.toFixed(2)}).`,
+                type: 'agent',
+                timestamp: Date.now()
+            }]);
         } else if (event.type === 'error') {
             setMessages(prev => [...prev, { type: 'error', content: event.content, timestamp: Date.now() }]);
         }
     };
 
-    const startResearch = async (topic) => {
+    const streamEvents = async (path, body) => {
         setIsLoading(true);
-        setMessages([]);
-        setStatus({});
-        setActiveAgent(null);
+        draftsRef.current.clear();
 
         // Abort previous request if any
         if (abortControllerRef.current) {
@@ -41,10 +80,10 @@ export function useResearchStream() {
 
         try {
             const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
-            const response = await fetch(`${API_URL}/research-stream`, {
+            const response = await fetch(`${API_URL}${path}`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ topic }),
+                body: body ? JSON.stringify(body) : undefined,
                 signal: abortControllerRef.current.signal,
             });
 
@@ -87,6 +126,20 @@ export function useResearchStream() {
         }
     };
 
+    const startResearch = async (topic) => {
+        setMessages([]);
+        setStatus({});
+        setActiveAgent(null);
+        setSessionId(null);
+        await streamEvents('/research-stream', { topic });
+    };
+
+    // Continues the last session from its last completed step (finished steps are not re-run)
+    const resumeResearch = async () => {
+        if (!sessionId) return;
+        await streamEvents(`/sessions/${sessionId}/resume`);
+    };
+
     const stopResearch = () => {
         if (abortControllerRef.current) {
             abortControllerRef.current.abort();
@@ -96,5 +149,5 @@ export function useResearchStream() {
         }
     };
 
-    return { messages, status, activeAgent, isLoading, startResearch, stopResearch };
+    return { messages, status, activeAgent, isLoading, sessionId, startResearch, resumeResearch, stopResearch };
 }
@@ -0,0 +1,100 @@
+import os
+from typing import List, Optional
+
+# "sqlite" (durable, survives restarts), "memory" (per process) or "none"
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+
+# Run options stored with every checkpoint (LangGraph copies primitive configurable values
+# into the checkpoint metadata), so a session can be resumed with the graph it started on
+SESSION_OPTIONS = ("routing_mode", "parallel", "max_concurrency", "use_memo")
+
+async def open_checkpointer(backend: str = None, path: str = None):
+    """
+    Creates the checkpointer for the compiled graphs. Must be called from the
+    event loop that will run them (the SQLite saver binds to it).
+    LangGraph is imported here rather than with the module, so the server
+    starts without it (see main.warmup).
+    """
+    from langgraph.checkpoint.memory import MemorySaver
+
+    # SQLite checkpointing needs the optional 'langgraph-checkpoint-sqlite' package
+    try:
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    except ImportError:
+        aiosqlite = None
+        AsyncSqliteSaver = None
+
+    backend = backend or CHECKPOINT_BACKEND
+    if backend == "none":
+        return None
+    if backend == "sqlite":
+        if AsyncSqliteSaver is None:
+            print("DEBUG: langgraph-checkpoint-sqlite is not installed, sessions are kept in memory only")
+        else:
+            path = path or CHECKPOINT_PATH
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            conn = await aiosqlite.connect(path)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            saver = AsyncSqliteSaver(conn)
+            await saver.setup()
+            return saver
+    return MemorySaver()
+
+async def close_checkpointer(checkpointer) -> None:
+    conn = getattr(checkpointer, "conn", None)
+    if conn is not None:
+        await conn.close()
+
+def session_config(session_id: str, checkpoint_id: Optional[str] = None, **configurable) -> dict:
+    """
+    Graph config addressing a session (LangGraph thread), optionally at an
+    earlier checkpoint.
+    """
+    configurable["thread_id"] = session_id
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+def session_options(metadata: dict) -> dict:
+    return {key: metadata.get(key) for key in SESSION_OPTIONS}
+
+async def get_session(graph, session_id: str) -> Optional[dict]:
+    """
+    Latest checkpoint of a session, or None if the session is unknown.
+    A session with pending nodes ("next") was interrupted and can be resumed.
+    """
+    if graph.checkpointer is None:
+        return None
+    snapshot = await graph.aget_state(session_config(session_id))
+    if snapshot.created_at is None:
+        return None
+    metadata = snapshot.metadata or {}
+    return {
+        "session_id": session_id,
+        "status": "interrupted" if snapshot.next else "completed",
+        "next": list(snapshot.next),
+        "checkpoint_id": snapshot.config["configurable"].get("checkpoint_id"),
+        "step": metadata.get("step"),
+        "updated_at": snapshot.created_at,
+        "options": session_options(metadata),
+        "messages": [{"type": m.type, "content": m.content} for m in snapshot.values.get("messages", [])],
+    }
+
+async def session_history(graph, session_id: str, limit: Optional[int] = None) -> List[dict]:
+    """
+    Checkpoints of a session, newest first. Any of them can be replayed.
+    """
+    history = []
+    if graph.checkpointer is None:
+        return history
+    async for snapshot in graph.aget_state_history(session_config(session_id), limit=limit):
+        history.append({
+            "checkpoint_id": snapshot.config["configurable"].get("checkpoint_id"),
+            "step": (snapshot.metadata or {}).get("step"),
+            "next": list(snapshot.next),
+            "created_at": snapshot.created_at,
+        })
+    return history
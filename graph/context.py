@@ -0,0 +1,153 @@
+import os
+import re
+from typing import List, Optional
+from langchain_core.messages import BaseMessage, SystemMessage
+from tools.llm_scheduler import scheduled_ainvoke
+
+# Recent turns kept verbatim in AgentState.messages; older turns are folded into one summary message
+CONTEXT_WINDOW = int(os.getenv("CONTEXT_WINDOW", "8"))
+# Upper bound on the running summary of evicted turns
+CONTEXT_SUMMARY_CHARS = int(os.getenv("CONTEXT_SUMMARY_CHARS", "2000"))
+# Per-message cap in the Supervisor's view (worker outputs such as reports can be very long)
+CONTEXT_MESSAGE_CHARS = int(os.getenv("CONTEXT_MESSAGE_CHARS", "1500"))
+# How evicted turns are compacted: "extractive" (no LLM call) or "llm" (Supervisor condenses the summary)
+CONTEXT_SUMMARY_MODE = os.getenv("CONTEXT_SUMMARY_MODE", "extractive")
+
+# Characters of each evicted turn kept in the extractive summary
+DIGEST_CHARS = 240
+
+SUMMARY_PREFIX = "Summary of earlier turns:"
+
+def is_summary(message: BaseMessage) -> bool:
+    return bool(message.additional_kwargs.get("context_summary"))
+
+def summary_message(text: str) -> SystemMessage:
+    return SystemMessage(content=f"{SUMMARY_PREFIX}\n{text}", additional_kwargs={"context_summary": True})
+
+def summary_text(message: Optional[BaseMessage]) -> str:
+    if message is None:
+        return ""
+    return message.content[len(SUMMARY_PREFIX):].strip() if message.content.startswith(SUMMARY_PREFIX) else message.content
+
+def _content(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+def digest(message: BaseMessage, max_chars: int = DIGEST_CHARS) -> str:
+    """
+    One-line extractive digest of a turn: its agent label and opening sentences.
+    """
+    text = _content(message).strip()
+    label = message.type
+    # Worker outputs start with "<Agent>_Agent:"
+    match = re.match(r"^(\w+_Agent):\s*", text)
+    if match:
+        label = match.group(1)
+        text = text[match.end():]
+    text = " ".join(re.sub(r"[*_`#>|]", " ", text).split())
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + " ..."
+    return f"- {label}: {text}"
+
+def extractive_summary(previous: str, evicted: List[BaseMessage], max_chars: int = CONTEXT_SUMMARY_CHARS) -> str:
+    """
+    Appends digests of evicted turns to the running summary, dropping the
+    oldest lines once it exceeds max_chars.
+    """
+    lines = [line for line in previous.splitlines() if line.strip()]
+    lines.extend(digest(message) for message in evicted)
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)[-max_chars:]
+
+def split_history(messages: List[BaseMessage]):
+    """
+    Splits the history into (head, summary, body): the user's original request,
+    the running summary (if any) and the verbatim recent turns.
+    """
+    head = messages[0] if messages and messages[0].type == "human" and not is_summary(messages[0]) else None
+    rest = messages[1:] if head is not None else list(messages)
+    summary = next((m for m in rest if is_summary(m)), None)
+    body = [m for m in rest if not is_summary(m)]
+    return head, summary, body
+
+def merge_messages(left: List[BaseMessage], right: List[BaseMessage], window: int = None) -> List[BaseMessage]:
+    """
+    Appends like operator.add, but keeps only the first user message, one
+    summary message and the last `window` turns. A summary message in `right`
+    replaces the current summary instead of being appended (used for LLM
+    compaction), so the last message is always a real turn.
+    """
+    window = window or CONTEXT_WINDOW
+    if not isinstance(right, list):
+        right = [right]
+    head, summary, body = split_history(list(left or []))
+    for message in right:
+        if is_summary(message):
+            summary = message
+        elif head is None and not body and message.type == "human":
+            head = message
+        else:
+            body.append(message)
+
+    if len(body) > window:
+        evicted, body = body[:-window], body[-window:]
+        summary = summary_message(extractive_summary(summary_text(summary), evicted))
+
+    return ([head] if head is not None else []) + ([summary] if summary is not None else []) + body
+
+def bounded_messages(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
+    # Reducer for AgentState.messages (LangGraph reducers take exactly two arguments)
+    return merge_messages(left, right)
+
+def _truncate(message: BaseMessage, max_chars: int) -> BaseMessage:
+    content = _content(message)
+    if len(content) <= max_chars:
+        return message
+    return message.model_copy(update={"content": content[:max_chars] + "\n[... truncated]"})
+
+def supervisor_view(messages: List[BaseMessage], max_message_chars: int = None, window: int = None) -> List[BaseMessage]:
+    """
+    What the Supervisor's routing LLM sees: the original request, the summary
+    of older turns and the most recent turns, each capped in length. Its size
+    is bounded regardless of how many steps the session has run.
+    """
+    max_message_chars = max_message_chars or CONTEXT_MESSAGE_CHARS
+    window = window or CONTEXT_WINDOW
+    head, summary, body = split_history(messages)
+    view = [_truncate(m, max_message_chars) for m in ([head] if head is not None else []) + body[-window:]]
+    if summary is not None:
+        # System messages after the first one are merged into the system instruction by the Gemini adapter
+        view.insert(1 if head is not None else 0, _truncate(summary, CONTEXT_SUMMARY_CHARS + len(SUMMARY_PREFIX) + 1))
+    return view
+
+async def compact_with_llm(summary: BaseMessage, llm) -> SystemMessage:
+    """
+    Condenses an extractive summary with the LLM. The result is flagged so it
+    is not condensed again until more turns are evicted into it.
+    """
+    prompt = (
+        "Condense these notes about earlier steps of a research workflow into a short summary. "
+        "Keep which stages have finished and the key topic, papers and findings.\n\n"
+        + summary_text(summary)
+    )
+    result = await scheduled_ainvoke(llm, prompt, len(prompt) // 4)
+    text = _content(result).strip()[:CONTEXT_SUMMARY_CHARS]
+    return SystemMessage(content=f"{SUMMARY_PREFIX}\n{text}", additional_kwargs={"context_summary": True, "llm_compacted": True})
+
+def needs_llm_compaction(messages: List[BaseMessage], mode: str = None) -> bool:
+    _, summary, _ = split_history(messages)
+    return (mode or CONTEXT_SUMMARY_MODE) == "llm" and summary is not None and not summary.additional_kwargs.get("llm_compacted")
+
+def agent_view(messages: List[BaseMessage], agent: str) -> List[BaseMessage]:
+    """
+    Per-agent view of the history. Workers only act on the previous stage's
+    output; the Supervisor gets the bounded routing view.
+    """
+    if agent == "Supervisor":
+        return supervisor_view(messages)
+    body = [m for m in messages if not is_summary(m)]
+    return body[-1:]
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    # ~4 characters per token is close enough for budgeting Gemini prompts
+    return sum(len(_content(m)) for m in messages) // 4
@@ -0,0 +1,279 @@
+import os
+import re
+import asyncio
+from typing import Any, Dict, List, Optional
+from tools.cancellation import run_cancellation
+from tools.arxiv_search import ARXIV_BACKEND, ARXIV_MIN_INTERVAL, asearch_arxiv, merge_results, normalize_query, search_arxiv_many
+from tools.memo_store import topic_terms
+from tools.paper_corpus import FULLTEXT_MAX_PAPERS, PaperCorpus, get_corpus
+from tools.paper_index import PaperIndex
+from tools.telemetry import current_span, span
+
+# Number of arXiv queries per discovery pass (refined topic + subtopics) and results per query
+DISCOVERY_MAX_QUERIES = int(os.getenv("DISCOVERY_MAX_QUERIES", "5"))
+DISCOVERY_RESULTS_PER_QUERY = int(os.getenv("DISCOVERY_RESULTS_PER_QUERY", "5"))
+
+# Candidates shown to Paper_Discoverer after re-ranking, and abstract chunks passed on to Insight_Synthesizer
+DISCOVERY_MAX_CANDIDATES = int(os.getenv("DISCOVERY_MAX_CANDIDATES", "10"))
+SYNTHESIS_TOP_K = int(os.getenv("SYNTHESIS_TOP_K", "8"))
+# Full-text passages (tools/paper_corpus.py) added to the synthesis input when FULLTEXT is on
+FULLTEXT_TOP_K = int(os.getenv("FULLTEXT_TOP_K", "6"))
+
+# Speculative discovery: arXiv searches start on the subtopics Topic_Refiner streams (and on the raw
+# topic when arXiv is not paced), before refinement has finished; a refined query reuses a search whose terms overlap this much
+SPECULATIVE_DISCOVERY = os.getenv("SPECULATIVE_DISCOVERY", "1").lower() in ("1", "true", "yes")
+SPECULATIVE_MATCH = float(os.getenv("SPECULATIVE_MATCH", "0.75"))
+
+# Queries longer than this are trimmed; arXiv relevance search degrades on long free text
+MAX_QUERY_WORDS = 12
+
+_LIST_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.*)$")
+_FINAL_TOPIC = re.compile(r"final\s+refined\s+(?:topic|research\s+question)\s*[:\-]*\s*(.*)", re.IGNORECASE)
+
+def _clean(text: str) -> str:
+    # Drop markdown emphasis, quotes and trailing punctuation, then trim to a search-sized phrase
+    text = re.sub(r"[*_`#>\"]", "", text).strip()
+    # "Subtopic name: long explanation" -> "Subtopic name"
+    if ":" in text and len(text.split(":", 1)[0].split()) >= 2:
+        text = text.split(":", 1)[0]
+    text = text.strip(" .:;?-")
+    return " ".join(text.split()[:MAX_QUERY_WORDS])
+
+def extract_subqueries(refined_text: str, max_queries: int = DISCOVERY_MAX_QUERIES) -> List[str]:
+    """
+    Expands the Topic_Refiner output into search queries: the final refined
+    topic first, followed by the listed subtopics.
+    """
+    text = refined_text.split("Refinement_Agent:", 1)[-1]
+    lines = text.splitlines()
+
+    final_topic = ""
+    for i, line in enumerate(lines):
+        match = _FINAL_TOPIC.search(line)
+        if match:
+            final_topic = match.group(1)
+            # The topic may be on the line after the heading
+            if not _clean(final_topic) and i + 1 < len(lines):
+                final_topic = lines[i + 1]
+
+    queries = []
+    if _clean(final_topic):
+        queries.append(_clean(final_topic))
+
+    for line in lines:
+        match = _LIST_ITEM.match(line)
+        if match and _clean(match.group(1)):
+            queries.append(_clean(match.group(1)))
+
+    if not queries:
+        queries.append(_clean(text))
+
+    # Keep order, drop duplicates
+    unique = []
+    for q in queries:
+        if q and q.lower() not in (u.lower() for u in unique):
+            unique.append(q)
+    return unique[:max_queries]
+
+def _overlap(a: str, b: str) -> float:
+    terms_a, terms_b = set(topic_terms(a)), set(topic_terms(b))
+    union = terms_a | terms_b
+    return len(terms_a & terms_b) / len(union) if union else 0.0
+
+class SpeculativeDiscovery:
+    """
+    arXiv searches started while Topic_Refiner is still running: one on the
+    raw topic (when arXiv is not paced), then one per subtopic and final topic
+    line as the refiner's output streams in (feed). discover_papers takes over the searches that
+    match a refined query and cancels the rest.
+    """
+    def __init__(self, max_queries: int = DISCOVERY_MAX_QUERIES, results_per_query: int = DISCOVERY_RESULTS_PER_QUERY):
+        self.max_queries = max_queries
+        self.results_per_query = results_per_query
+        self.searches: Dict[str, asyncio.Task] = {}
+        self._line = ""
+        self._subtopics = 0
+
+    def start(self, query: str) -> None:
+        key = normalize_query(query)
+        if key and key not in self.searches:
+            task = self.searches[key] = asyncio.create_task(asearch_arxiv(query, self.results_per_query))
+            # The search outlives the node that started it; an abandoned run cancels it
+            token = run_cancellation.get()
+            if token is not None:
+                token.link_future(task)
+
+    def feed(self, chunk: str) -> None:
+        """
+        Takes a token delta of the refiner; every completed line that
+        extract_subqueries would turn into a query starts its search.
+        """
+        self._line += chunk
+        *lines, self._line = self._line.split("\n")
+        for line in lines:
+            final = _FINAL_TOPIC.search(line)
+            item = _LIST_ITEM.match(line)
+            if final and _clean(final.group(1)):
+                self.start(_clean(final.group(1)))
+            # The final topic takes one of the max_queries slots
+            elif item and _clean(item.group(1)) and self._subtopics < self.max_queries - 1:
+                self._subtopics += 1
+                self.start(_clean(item.group(1)))
+
+    def take(self, query: str) -> Optional[asyncio.Task]:
+        """
+        Removes and returns the search for the query, or for the speculative
+        query closest to it (term overlap >= SPECULATIVE_MATCH), if any.
+        """
+        key = normalize_query(query)
+        if key not in self.searches:
+            scored = [(_overlap(query, other), other) for other in self.searches]
+            score, key = max(scored, default=(0.0, None))
+            if score < SPECULATIVE_MATCH:
+                return None
+        return self.searches.pop(key)
+
+    def cancel(self) -> int:
+        """
+        Cancels the searches nobody took; returns how many were still running.
+        """
+        running = 0
+        for task in self.searches.values():
+            if not task.done():
+                task.cancel()
+                running += 1
+            elif not task.cancelled():
+                # Mark a failed search as retrieved so asyncio does not log it
+                task.exception()
+        self.searches.clear()
+        return running
+
+# Speculation of each session, from its Topic_Refiner run until its Paper_Discoverer run
+# (or the end of the run: the graph entry points call cancel_speculation)
+_speculations: Dict[str, SpeculativeDiscovery] = {}
+
+def begin_speculation(session_id: Optional[str], topic: str) -> Optional[SpeculativeDiscovery]:
+    """
+    Starts speculative discovery for a session, replacing (and cancelling)
+    an earlier one. Needs a running event loop.
+    """
+    if not SPECULATIVE_DISCOVERY or not session_id:
+        return None
+    cancel_speculation(session_id)
+    speculation = _speculations[session_id] = SpeculativeDiscovery()
+    # The raw topic seldom matches a refined query closely enough to be reused, so it only
+    # gets a search when that does not hold up the refined queries behind the arXiv pacing
+    if ARXIV_BACKEND == "offline" or ARXIV_MIN_INTERVAL <= 0:
+        speculation.start(_clean(topic))
+    return speculation
+
+def take_speculation(session_id: Optional[str]) -> Optional[SpeculativeDiscovery]:
+    return _speculations.pop(session_id, None) if session_id else None
+
+def cancel_speculation(session_id: Optional[str]) -> None:
+    speculation = take_speculation(session_id)
+    if speculation is not None:
+        speculation.cancel()
+
+async def discover_papers(refined_text: str, max_queries: int = DISCOVERY_MAX_QUERIES, results_per_query: int = DISCOVERY_RESULTS_PER_QUERY, speculation: Optional[SpeculativeDiscovery] = None) -> List[Dict[str, Any]]:
+    """
+    Fans out one arXiv search per sub-query concurrently and returns the merged,
+    deduplicated candidate list. Searches a speculation already started for
+    a sub-query are awaited instead of repeated; its other searches are cancelled.
+    """
+    queries = extract_subqueries(refined_text, max_queries)
+    print(f"DEBUG: Discovery fan-out over {len(queries)} queries: {queries}")
+    if speculation is None or speculation.results_per_query != results_per_query:
+        if speculation is not None:
+            speculation.cancel()
+        return await search_arxiv_many(queries, max_results=results_per_query)
+
+    taken = [speculation.take(q) for q in queries]
+    reused = sum(task is not None for task in taken)
+    cancelled = speculation.cancel()
+    print(f"DEBUG: Speculative discovery reused {reused} searches, cancelled {cancelled}")
+    node_span = current_span()
+    if node_span is not None:
+        node_span.set(speculative_reused=reused, speculative_cancelled=cancelled)
+    outcomes = await asyncio.gather(
+        *(task if task is not None else asearch_arxiv(q, results_per_query) for q, task in zip(queries, taken)),
+        return_exceptions=True
+    )
+    return merge_results(queries, outcomes)
+
+def refined_query(refined_text: str) -> str:
+    """
+    Ranking query for a Topic_Refiner output: the final refined topic and its subtopics.
+    """
+    return " ".join(extract_subqueries(refined_text))
+
+def rank_candidates(query: str, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Re-orders the merged arXiv candidates by BM25 relevance to the query
+    (tools/paper_index.py) instead of arXiv API order.
+    """
+    with span("index", "rank", papers=len(papers)):
+        return PaperIndex(papers).rank_papers(query) if papers else []
+
+def selected_papers(messages: list, papers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The candidates named (by arXiv ID, URL or title) in Paper_Discoverer's
+    latest answer, in ranked order; all of them when it names none of them.
+    """
+    answer = next((str(m.content) for m in reversed(messages) if m.type == "ai" and str(m.content).startswith("Discovery_Agent:")), "")
+    lowered = answer.lower()
+    chosen = [
+        p for p in papers
+        if p.get("id", p["url"]) in answer or p["url"] in answer or p["title"].lower() in lowered
+    ]
+    return chosen or papers
+
+def relevant_excerpts(query: str, papers: List[Dict[str, Any]], k: int = SYNTHESIS_TOP_K) -> List[Dict[str, Any]]:
+    """
+    The k abstract chunks most relevant to the query, grouped by paper (best
+    paper first) as {"id", "title", "url", "excerpts"} records.
+    """
+    with span("index", "excerpts", papers=len(papers)) as index_span:
+        index = PaperIndex(papers)
+        chunks = index.top_chunks(query, k)
+        index_span.set(chunks=len(chunks), indexed=len(index))
+
+    grouped: Dict[int, List[str]] = {}
+    for chunk in chunks:
+        grouped.setdefault(chunk["paper"], []).append(chunk["text"])
+    return [
+        {"id": papers[i].get("id", papers[i]["url"]), "title": papers[i]["title"], "url": papers[i]["url"], "excerpts": texts}
+        for i, texts in grouped.items()
+    ]
+
+def with_passages(records: List[Dict[str, Any]], query: str, papers: List[Dict[str, Any]], corpus: PaperCorpus = None, k: int = FULLTEXT_TOP_K) -> List[Dict[str, Any]]:
+    """
+    Adds the k full-text passages most relevant to the query, taken from the
+    stored text of the FULLTEXT_MAX_PAPERS best papers, to the excerpt
+    records as "passages".
+    """
+    corpus = corpus if corpus is not None else get_corpus()
+    top = {p.get("id", p["url"]): p for p in papers[:FULLTEXT_MAX_PAPERS]}
+    with span("index", "passages", papers=len(top)) as index_span:
+        passages = corpus.passages(query, [pid for pid in top if pid in corpus], k)
+        index_span.set(passages=len(passages))
+
+    by_id = {record["id"]: record for record in records}
+    for passage in passages:
+        record = by_id.get(passage["id"])
+        if record is None:
+            paper = top[passage["id"]]
+            record = by_id[passage["id"]] = {"id": passage["id"], "title": paper["title"], "url": paper["url"], "excerpts": []}
+            records = records + [record]
+        record.setdefault("passages", []).append(passage["text"])
+    return records
+
+def format_papers(papers: List[Dict[str, Any]]) -> str:
+    """
+    Formats candidate papers for an LLM prompt (same layout as the search_arxiv tool).
+    """
+    output = ""
+    for p in papers:
+        summary = p["summary"].replace("\n", " ")
+        output += f"Title: {p['title']}\nURL: {p['url']}\nSummary: {summary}\n---\n"
+    return output
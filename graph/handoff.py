@@ -0,0 +1,96 @@
+import os
+import re
+import json
+from typing import Any, Dict, List, Optional
+
+# Stage inputs: "json" passes a compact outline of the previous stage (IDs, titles,
+# key points), "text" the previous stage's full output
+HANDOFF_FORMAT = os.getenv("HANDOFF_FORMAT", "json").lower()
+# Compaction limits: key points kept per section and characters per point
+HANDOFF_MAX_POINTS = int(os.getenv("HANDOFF_MAX_POINTS", "6"))
+HANDOFF_POINT_CHARS = int(os.getenv("HANDOFF_POINT_CHARS", "240"))
+
+_HEADING = re.compile(r"^\s*#{1,6}\s+(.*)$")
+_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.*)$")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+def dumps(data: Any) -> str:
+    # No indentation or spaces after separators: whitespace costs prompt tokens too
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+def _plain(text: str) -> str:
+    return " ".join(re.sub(r"[*_`>]", "", text).split())
+
+def _shorten(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+def key_points(text: str, max_points: int = HANDOFF_MAX_POINTS, max_chars: int = HANDOFF_POINT_CHARS) -> List[str]:
+    """
+    Compaction step: the list items of a stage output, or its first sentences
+    when it has none, without Markdown and cut to max_chars each.
+    """
+    lines = text.splitlines()
+    points = [_plain(m.group(1)) for m in map(_ITEM.match, lines) if m]
+    if not points:
+        points = [_plain(s) for s in _SENTENCE.split(" ".join(lines))]
+    return [_shorten(p, max_chars) for p in points if p][:max_points]
+
+def outline(text: str, papers: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Markdown output (insights, report) as {"sections": [{"heading", "points"}]}.
+    Sections headed by a paper title also carry the paper's "id".
+    """
+    ids = {_plain(p["title"]).lower(): p.get("id", p.get("url")) for p in papers or []}
+    sections, heading, body = [], "", []
+
+    def close():
+        points = key_points("\n".join(body))
+        if points:
+            section = {"heading": heading, "points": points} if heading else {"points": points}
+            if heading.lower() in ids:
+                section = {"id": ids[heading.lower()], **section}
+            sections.append(section)
+
+    for line in text.splitlines():
+        match = _HEADING.match(line)
+        if match:
+            close()
+            heading, body = _plain(match.group(1)), []
+        else:
+            body.append(line)
+    close()
+    return {"sections": sections}
+
+def excerpts_text(records: List[Dict[str, Any]]) -> str:
+    output = ""
+    for record in records:
+        excerpts = "\n".join(f"- {text}" for text in record["excerpts"])
+        output += f"Title: {record['title']}\nURL: {record['url']}\nRelevant excerpts:\n{excerpts}\n"
+        if record.get("passages"):
+            passages = "\n".join(f"- {text}" for text in record["passages"])
+            output += f"Full-text passages:\n{passages}\n"
+        output += "---\n"
+    return output
+
+def synthesis_input(records: List[Dict[str, Any]], fmt: str = None, topic: Optional[str] = None) -> str:
+    """
+    Insight_Synthesizer input from the ranked excerpts (graph.discovery.relevant_excerpts),
+    headed by the refined topic they were ranked for.
+    """
+    if (fmt or HANDOFF_FORMAT) == "text":
+        return (f"Topic: {topic}\n---\n" if topic else "") + excerpts_text(records)
+    # The arXiv ID stands in for the URL (https://arxiv.org/abs/<id>)
+    papers = [{key: r[key] for key in ("id", "title", "excerpts", "passages") if key in r} for r in records]
+    return dumps({"topic": topic, "papers": papers} if topic else {"papers": papers})
+
+def stage_input(output: str, papers: Optional[List[Dict[str, Any]]] = None, fmt: str = None) -> str:
+    """
+    Report_Compiler / Gap_Analyst input from the previous stage's output.
+    The agent prefix ("Insight_Agent: ") is dropped in both formats.
+    """
+    text = output.split(": ", 1)[1] if re.match(r"^\w+_Agent: ", output) else output
+    if (fmt or HANDOFF_FORMAT) == "text":
+        return text
+    return dumps(outline(text, papers))
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import AIMessage, BaseMessage
+from tools.memo_store import MemoStore, get_memo_store, MEMO_REUSE_SIMILARITY, MEMO_SEED_SIMILARITY
+from tools.telemetry import span
+
+# Stage artifact -> worker message prefix, in pipeline order
+MEMO_STAGES = [
+    ("refined", "Refinement_Agent:"),
+    ("discovery", "Discovery_Agent:"),
+    ("insights", "Insight_Agent:"),
+    ("report", "Report_Agent:"),
+    ("gaps", "Gap_Agent:"),
+]
+
+def memo_enabled(config: Optional[dict]) -> bool:
+    # Per run opt-out via config["configurable"]["use_memo"] (ResearchRequest.use_memo)
+    configurable = (config or {}).get("configurable", {})
+    return configurable.get("use_memo") is not False
+
+def run_artifacts(messages: List[BaseMessage], papers: Optional[List[dict]] = None) -> Dict[str, Any]:
+    """
+    Latest output of each stage found in the history, plus the discovered papers.
+    """
+    artifacts: Dict[str, Any] = {}
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        for name, prefix in MEMO_STAGES:
+            if message.type == "ai" and content.startswith(prefix):
+                artifacts[name] = content
+    artifacts["papers"] = list(papers or [])
+    return artifacts
+
+def record_run(topic: str, messages: List[BaseMessage], papers: Optional[List[dict]] = None, store: Optional[MemoStore] = None) -> Optional[str]:
+    """
+    Stores a finished run. Runs missing a stage (e.g. evicted from the
+    history) are not stored, so a memo can always replay the whole pipeline.
+    """
+    # Not `store or ...`: an empty MemoStore is falsy (it has __len__)
+    store = store if store is not None else get_memo_store()
+    artifacts = run_artifacts(messages, papers)
+    if store is None or not all(name in artifacts for name, _ in MEMO_STAGES):
+        return None
+    key = store.put(topic, artifacts)
+    print(f"DEBUG: Stored research memo '{key}'")
+    return key
+
+def seed_from_memo(topic: str, store: Optional[MemoStore] = None) -> Optional[dict]:
+    """
+    State update for Topic_Refiner from a stored run of the same or a similar
+    topic: every stage output when similarity >= MEMO_REUSE_SIMILARITY (the
+    Supervisor then finishes), only the candidate papers when it is
+    >= MEMO_SEED_SIMILARITY: the stages run again for the new topic, and
+    Paper_Discoverer skips the arXiv search. None when nothing matches.
+    """
+    store = store if store is not None else get_memo_store()
+    if store is None:
+        return None
+    with span("memo", "lookup") as memo_span:
+        hit = store.lookup(topic, min_similarity=MEMO_SEED_SIMILARITY)
+        memo_span.set(cached=hit is not None, similarity=hit["similarity"] if hit else 0.0)
+    if hit is None:
+        return None
+
+    mode = "reuse" if hit["similarity"] >= MEMO_REUSE_SIMILARITY else "seed"
+    stages = [name for name, _ in MEMO_STAGES] if mode == "reuse" else []
+    artifacts = hit["artifacts"]
+    print(f"DEBUG: Research memo '{hit['key']}' ({hit['similarity']:.2f}) -> {mode} {stages}")
+    return {
+        "messages": [AIMessage(content=artifacts[name], additional_kwargs={"memo": hit["key"]}) for name in stages],
+        "papers": artifacts.get("papers", []),
+        "memo": {"key": hit["key"], "topic": hit["topic"], "similarity": hit["similarity"], "mode": mode, "created": hit["created"]},
+    }
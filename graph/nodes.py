@@ -1,79 +1,160 @@
 import asyncio
+import threading
+from typing import Callable, Optional
 from langchain_core.messages import HumanMessage, AIMessage
-from crew.agents import ResearchAgents
-from crew.tasks import ResearchTasks
-from crewai import Crew, Process
-from graph.state import AgentState
+from langchain_core.runnables import RunnableConfig
+from crew.execution import run_crew
+from graph.state import AgentState, PaperInsightState
+from graph.streaming import stream_deltas
+from graph.discovery import (
+    DISCOVERY_MAX_CANDIDATES, begin_speculation, cancel_speculation, discover_papers, extract_subqueries,
+    format_papers, rank_candidates, refined_query, relevant_excerpts, selected_papers, take_speculation, with_passages
+)
+from graph.context import split_history
+from graph.memo import memo_enabled, record_run, seed_from_memo
+from graph.handoff import stage_input, synthesis_input
+from tools.paper_corpus import FULLTEXT, FULLTEXT_MAX_PAPERS, ingest_papers
+from tools.telemetry import current_span
 
-# Initialize Agents and Tasks instances globally to avoid recreation
-_agents = ResearchAgents()
-_tasks = ResearchTasks()
+# Pooled Agent/Crew objects, reused across requests instead of rebuilt per node call
+# (streaming LLMs so token deltas can be forwarded to /research-stream)
+_registry = None
+_registry_lock = threading.Lock()
 
-async def _run_task_async(agent, task_func, state: AgentState):
+def get_registry():
     """
-    Helper to run a single task with a single agent asynchronously.
+    The crew registry, built on first use (or by main.warmup): CrewAI takes
+    seconds to import and the agents need GEMINI_API_KEY.
     """
-    messages = state["messages"]
-    last_message = messages[-1].content
-    
-    # Create the task
-    # Note: Task creation is fast/local, so it can remain sync or be wrapped if needed.
-    # Assuming task creation doesn't block significantly.
-    task = task_func(agent, last_message if "Refinement" in agent.role else state)
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from crew.registry import CrewRegistry
+            _registry = CrewRegistry(stream=True)
+        return _registry
+
+async def _run_stage(stage: str, agent_name: str, inputs: dict, source: str = None, tap: Callable[[str], None] = None) -> str:
+    """
+    Runs a pooled crew for the stage (see crew.execution.run_crew), forwarding
+    its token deltas tagged with agent_name (and to `tap`). The size of the
+    inputs (~4 characters per token) is recorded on the node span as handoff_tokens.
+    """
+    node_span = current_span()
+    if node_span is not None:
+        node_span.add(handoff_tokens=sum(len(str(value)) for value in inputs.values()) // 4)
+    async with get_registry().acheckout(stage) as crew:
+        with stream_deltas(agent_name, source, tap):
+            return await run_crew(crew, inputs)
+
+def _session_id(config: Optional[dict]) -> Optional[str]:
+    return (config or {}).get("configurable", {}).get("thread_id")
 
-    # Note: CrewAI is designed for teams, but we can run a crew of 1 for granular control
-    crew = Crew(
-        agents=[agent],
-        tasks=[task],
-        process=Process.sequential,
-        verbose=True
-    )
-    
-    # Run kickoff in a separate thread to avoid blocking the event loop
-    result = await asyncio.to_thread(crew.kickoff)
-    return {"messages": [AIMessage(content=str(result))]}
+def _refined_text(messages) -> str:
+    # Latest Topic_Refiner output, or the user's request if it is no longer in the history
+    for message in reversed(messages):
+        if message.type == "ai" and str(message.content).startswith("Refinement_Agent:"):
+            return message.content
+    head, _, _ = split_history(messages)
+    return head.content if head is not None else messages[-1].content
 
-async def topic_refiner_node(state: AgentState):
-    agent = _agents.topic_refiner()
+async def topic_refiner_node(state: AgentState, config: RunnableConfig = None):
     messages = state["messages"]
     topic = messages[-1].content
-    task = _tasks.refine_task(agent, topic)
-    crew = Crew(agents=[agent], tasks=[task], verbose=True)
-    result = await asyncio.to_thread(crew.kickoff)
-    return {"messages": [AIMessage(content=f"Refinement_Agent: {result}")]}
+    # A stored run of the same or a similar topic skips or seeds the pipeline (graph/memo.py)
+    seeded = seed_from_memo(topic) if memo_enabled(config) else None
+    if seeded is not None and seeded["memo"]["mode"] == "reuse":
+        return seeded
+    if seeded is not None:
+        # Only the similar run's papers are reused: the new topic is refined as usual
+        result = await _run_stage("refine", "Topic_Refiner", {"topic": topic})
+        return {**seeded, "messages": [AIMessage(content=f"Refinement_Agent: {result}")]}
+    # arXiv searches on the raw topic and on the subtopics as they stream in overlap refinement
+    session_id = _session_id(config)
+    speculation = begin_speculation(session_id, topic)
+    try:
+        result = await _run_stage("refine", "Topic_Refiner", {"topic": topic}, tap=speculation.feed if speculation else None)
+    except BaseException:
+        cancel_speculation(session_id)
+        raise
+    # A memo seed from an earlier turn of the session no longer applies
+    return {"messages": [AIMessage(content=f"Refinement_Agent: {result}")], "memo": {}}
 
-async def paper_discoverer_node(state: AgentState):
-    agent = _agents.paper_discoverer()
+async def paper_discoverer_node(state: AgentState, config: RunnableConfig = None):
     messages = state["messages"]
     refined_topic = messages[-1].content
-    task = _tasks.discovery_task(agent, refined_topic)
-    crew = Crew(agents=[agent], tasks=[task], verbose=True)
-    result = await asyncio.to_thread(crew.kickoff)
-    return {"messages": [AIMessage(content=f"Discovery_Agent: {result}")]}
+    if (state.get("memo") or {}).get("mode") == "seed" and state.get("papers"):
+        # Candidates of a similar stored run (graph/memo.py), ranked for the new topic below
+        papers = state["papers"]
+    else:
+        # Search the refined topic and its subtopics concurrently before the agent runs,
+        # reusing the searches Topic_Refiner started speculatively
+        papers = await discover_papers(refined_topic, speculation=take_speculation(_session_id(config)))
+    # Best matches for the refined topic first (BM25 over titles and abstracts), not arXiv order
+    papers = rank_candidates(refined_query(refined_topic), papers)
+    if papers:
+        inputs = {"refined_topic": refined_topic, "candidates": format_papers(papers[:DISCOVERY_MAX_CANDIDATES])}
+        stage = _run_stage("discover", "Paper_Discoverer", inputs)
+    else:
+        # Nothing to choose from (arXiv down or no hits): the agent searches on its own
+        stage = _run_stage("discover_search", "Paper_Discoverer", {"refined_topic": refined_topic})
+    if FULLTEXT:
+        # PDFs of the best candidates are fetched and parsed while the agent runs
+        ids = [p["id"] for p in papers[:FULLTEXT_MAX_PAPERS] if "id" in p]
+        result, _ = await asyncio.gather(stage, ingest_papers(ids))
+    else:
+        result = await stage
+    return {"messages": [AIMessage(content=f"Discovery_Agent: {result}")], "papers": papers}
 
 async def insight_synthesizer_node(state: AgentState):
-    agent = _agents.insight_synthesizer()
     messages = state["messages"]
-    papers = messages[-1].content
-    task = _tasks.synthesis_task(agent, papers)
-    crew = Crew(agents=[agent], tasks=[task], verbose=True)
-    result = await asyncio.to_thread(crew.kickoff)
+    # The papers the Paper_Discoverer agent picked from the candidates
+    candidates = selected_papers(messages, state.get("papers") or [])
+    if candidates:
+        # Only the abstract chunks most relevant to the refined topic go into the prompt
+        refined = _refined_text(messages)
+        query = refined_query(refined)
+        records = relevant_excerpts(query, candidates)
+        if FULLTEXT:
+            records = with_passages(records, query, candidates)
+        papers = synthesis_input(records, topic=extract_subqueries(refined, 1)[0])
+    else:
+        papers = messages[-1].content
+    result = await _run_stage("synthesize", "Insight_Synthesizer", {"papers": papers})
     return {"messages": [AIMessage(content=f"Insight_Agent: {result}")]}
 
+async def paper_insight_node(state: PaperInsightState):
+    """
+    Map step of the parallel workflow: insights for a single paper.
+    """
+    paper = state["paper"]
+    paper_id = paper.get("id", paper["url"])
+    result = await _run_stage("paper_insight", "Insight_Synthesizer", {"paper": format_papers([paper])}, source=paper_id)
+    return {"paper_insights": [{"id": paper_id, "title": paper["title"], "insight": result}]}
+
+async def insight_reducer_node(state: AgentState):
+    """
+    Reduce step of the parallel workflow: merges per-paper insights, in discovery order,
+    into the single Insight_Agent message the report stage expects.
+    """
+    order = {p.get("id", p["url"]): i for i, p in enumerate(state.get("papers", []))}
+    insights = sorted(state.get("paper_insights", []), key=lambda item: order.get(item["id"], len(order)))
+    body = "\n\n".join(f"### {item['title']}\n{item['insight']}" for item in insights)
+    return {"messages": [AIMessage(content=f"Insight_Agent: {body}")]}
+
 async def report_compiler_node(state: AgentState):
-    agent = _agents.report_compiler()
     messages = state["messages"]
-    insights = messages[-1].content
-    task = _tasks.report_task(agent, insights)
-    crew = Crew(agents=[agent], tasks=[task], verbose=True)
-    result = await asyncio.to_thread(crew.kickoff)
+    # Compact outline of the insights (graph/handoff.py), not the full text
+    insights = stage_input(messages[-1].content, state.get("papers"))
+    result = await _run_stage("report", "Report_Compiler", {"insights": insights})
     return {"messages": [AIMessage(content=f"Report_Agent: {result}")]}
 
-async def gap_analyst_node(state: AgentState):
-    agent = _agents.gap_analyst()
+async def gap_analyst_node(state: AgentState, config: RunnableConfig = None):
     messages = state["messages"]
-    report = messages[-1].content
-    task = _tasks.gap_analysis_task(agent, report)
-    crew = Crew(agents=[agent], tasks=[task], verbose=True)
-    result = await asyncio.to_thread(crew.kickoff)
-    return {"messages": [AIMessage(content=f"Gap_Agent: {result}")]}
+    report = stage_input(messages[-1].content)
+    result = await _run_stage("gap", "Gap_Analyst", {"report": report})
+    message = AIMessage(content=f"Gap_Agent: {result}")
+    # Last stage: keep the finished run for later sessions on the same topic
+    head, _, _ = split_history(messages)
+    if head is not None and memo_enabled(config):
+        record_run(head.content, messages + [message], state.get("papers"))
+    return {"messages": [message]}
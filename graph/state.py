@@ -1,9 +1,21 @@
 from typing import TypedDict, Annotated, List, Union
 from langchain_core.messages import BaseMessage
 import operator
+from graph.context import bounded_messages
 
 class AgentState(TypedDict):
-    # The list of messages in the conversation
-    messages: Annotated[List[BaseMessage], operator.add]
+    # The list of messages in the conversation: the user's request, a summary of
+    # older turns and the last CONTEXT_WINDOW turns (see graph/context.py)
+    messages: Annotated[List[BaseMessage], bounded_messages]
     # The next agent to act
     next: str
+    # Candidate papers found by Paper_Discoverer (deduplicated by arXiv ID, most relevant first)
+    papers: List[dict]
+    # Per-paper insights produced concurrently by the parallel workflow (fan-in)
+    paper_insights: Annotated[List[dict], operator.add]
+    # Stored run this session was answered or seeded from, if any (see graph/memo.py)
+    memo: dict
+
+class PaperInsightState(TypedDict):
+    # Input of one Paper_Insight branch in the parallel workflow
+    paper: dict
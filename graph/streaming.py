@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+from langgraph.config import get_stream_writer
+
+# CrewAI moved its event bus between releases; token streaming is skipped if neither is available
+try:
+    from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+except ImportError:
+    try:
+        from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+    except ImportError:
+        crewai_event_bus = None
+        LLMStreamChunkEvent = None
+
+# Sink for token deltas of the node currently running in this context.
+# Crew kickoff threads get a copy of the context (crew.execution.run_blocking), so they see
+# the sink of their own node; direct acall() chunks are emitted on the event loop itself.
+_delta_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("delta_sink", default=None)
+
+if crewai_event_bus is not None:
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def _forward_stream_chunk(source, event):
+        # Stream chunk handlers run synchronously in the emitting thread or task
+        sink = _delta_sink.get()
+        if sink is not None and event.chunk and not getattr(event, "tool_call", None):
+            sink(event.chunk)
+
+def _get_writer():
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        # Called outside of a graph run (e.g. directly from a test)
+        return None
+
+@contextmanager
+def stream_deltas(agent: str, source: Optional[str] = None, tap: Optional[Callable[[str], None]] = None):
+    """
+    Forwards LLM token deltas produced inside the block to the LangGraph
+    "custom" stream as {"agent": agent, "delta": text}. `source` tells apart
+    concurrent branches of the same agent (e.g. one per paper). `tap`, if
+    given, is also called with every delta on the event loop, even outside a
+    graph run.
+    Must be entered from the event loop; chunks may arrive from worker threads.
+    """
+    writer = _get_writer()
+    if writer is None and tap is None:
+        yield None
+        return
+
+    loop = asyncio.get_running_loop()
+
+    def sink(chunk: str):
+        if writer is not None:
+            payload = {"agent": agent, "delta": chunk}
+            if source is not None:
+                payload["source"] = source
+            loop.call_soon_threadsafe(writer, payload)
+        if tap is not None:
+            loop.call_soon_threadsafe(tap, chunk)
+
+    token = _delta_sink.set(sink)
+    try:
+        yield sink
+    finally:
+        _delta_sink.reset(token)
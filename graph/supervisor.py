@@ -1,63 +1,140 @@
-from typing import Literal
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.output_parsers import JsonOutputParser
+from typing import Literal, Optional
 from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig
 from graph.state import AgentState
+from graph.context import agent_view, compact_with_llm, needs_llm_compaction, split_history, estimate_tokens
+from tools.llm_scheduler import scheduled_ainvoke
 import os
 
 # Define the list of workers
 workers = ["Topic_Refiner", "Paper_Discoverer", "Insight_Synthesizer", "Report_Compiler", "Gap_Analyst"]
 
-async def supervisor_node(state: AgentState):
+# Routing modes:
+#  - "rule":   deterministic routing on the worker prefixes, never calls the LLM
+#  - "hybrid": deterministic routing, LLM only when the state is ambiguous
+#  - "llm":    the LLM decides every step (original behaviour)
+RoutingMode = Literal["rule", "hybrid", "llm"]
+ROUTING_MODES = ("rule", "hybrid", "llm")
+DEFAULT_ROUTING_MODE = os.getenv("SUPERVISOR_ROUTING_MODE", "hybrid")
+
+# Each worker node in graph/nodes.py prefixes its output; the prefix tells us which stage just finished
+WORKER_PREFIXES = {
+    "Refinement_Agent:": "Paper_Discoverer",
+    "Discovery_Agent:": "Insight_Synthesizer",
+    "Insight_Agent:": "Report_Compiler",
+    "Report_Agent:": "Gap_Analyst",
+    "Gap_Agent:": "FINISH",
+}
+
+SYSTEM_PROMPT = (
+    "You are the supervisor of a research team.\n"
+    "Your goal is to manage the research workflow: Refine Topic -> Discover Papers -> Synthesize Insights -> Compile Report -> Analyze Gaps.\n"
+    "Given the conversation history, decide who should act next.\n"
+    " - If the user just started, pick 'Topic_Refiner'.\n"
+    " - If the topic is refined, pick 'Paper_Discoverer'.\n"
+    " - If papers are returned, pick 'Insight_Synthesizer'.\n"
+    " - If insights are ready, pick 'Report_Compiler'.\n"
+    " - If report is done, pick 'Gap_Analyst'.\n"
+    " - If Gap Analysis is done, pick 'FINISH'.\n\n"
+    "Return ONLY the name of the next agent or 'FINISH'."
+)
+
+_router_llm = None
+
+def _get_router_llm():
     """
-    The Supervisor node decides which agent should act next.
+    Lazily builds the routing LLM once and reuses it across steps.
     """
-    messages = state["messages"]
-    system_prompt = (
-        "You are the supervisor of a research team.\n"
-        "Your goal is to manage the research workflow: Refine Topic -> Discover Papers -> Synthesize Insights -> Compile Report -> Analyze Gaps.\n"
-        "Given the conversation history, decide who should act next.\n"
-        " - If the user just started, pick 'Topic_Refiner'.\n"
-        " - If the topic is refined, pick 'Paper_Discoverer'.\n"
-        " - If papers are returned, pick 'Insight_Synthesizer'.\n"
-        " - If insights are ready, pick 'Report_Compiler'.\n"
-        " - If report is done, pick 'Gap_Analyst'.\n"
-        " - If Gap Analysis is done, pick 'FINISH'.\n\n"
-        "Return ONLY the name of the next agent or 'FINISH'."
-    )
-    
-    # We can use a simpler LLM call here since it's just routing
-    api_key = os.getenv("GEMINI_API_KEY")
-    llm = ChatGoogleGenerativeAI(model="models/gemini-2.5-flash", api_key=api_key)
-    
-    
+    global _router_llm
+    if _router_llm is None:
+        # Imported here: the Gemini SDK takes about a second to load and rule routing never needs it
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        api_key = os.getenv("GEMINI_API_KEY")
+        _router_llm = ChatGoogleGenerativeAI(model="models/gemini-2.5-flash", api_key=api_key, base_url=os.getenv("GEMINI_API_BASE"))
+    return _router_llm
+
+def route_by_rules(messages) -> Optional[str]:
+    """
+    Deterministic routing based on the prefix of the last message.
+    Returns None when the state is ambiguous (no known prefix).
+    """
+    if not messages:
+        return "Topic_Refiner"
+
+    last_msg = messages[-1]
+    if last_msg.type == "human":
+        return "Topic_Refiner"
+
+    content = last_msg.content if isinstance(last_msg.content, str) else str(last_msg.content)
+    content = content.lstrip()
+    for prefix, next_agent in WORKER_PREFIXES.items():
+        if content.startswith(prefix):
+            return next_agent
+    return None
+
+def route_by_keywords(last_msg: str) -> str:
+    """
+    Basic heuristic fallback: looks for a worker prefix anywhere in the message.
+    """
+    for prefix, next_agent in WORKER_PREFIXES.items():
+        if prefix.rstrip(":") in last_msg:
+            return next_agent
+    return "Topic_Refiner"
+
+async def route_with_llm(messages) -> str:
+    """
+    Asks the LLM who should act next.
+    """
+    # Imported on first use, like the routing LLM: rule routing never loads the prompt machinery
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
     # Simple prompt
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+        ("system", SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="messages"),
         ("human", "Who should act next?")
     ])
-    
-    chain = prompt | llm
-    # Use ainvoke for async execution
-    result = await chain.ainvoke({"messages": messages})
+
+    chain = prompt | _get_router_llm()
+    # Only the bounded view goes to the LLM, not the whole history
+    view = agent_view(messages, "Supervisor")
+    result = await scheduled_ainvoke(chain, {"messages": view}, estimate_tokens(view) + len(SYSTEM_PROMPT) // 4)
     next_agent = result.content.strip().replace("'", "").replace('"', "")
-    
+
     print(f"\n[Supervisor]: Logic thinks next step is '{next_agent}'")
-    
+
     # Fallback cleanup
     if next_agent not in workers and next_agent != "FINISH":
-         # Basic heuristic fallback if LLM gets confused
-         last_msg = messages[-1].content
-         if "Refinement_Agent" in last_msg: next_agent = "Paper_Discoverer"
-         elif "Discovery_Agent" in last_msg: next_agent = "Insight_Synthesizer"
-         elif "Insight_Agent" in last_msg: next_agent = "Report_Compiler"
-         elif "Report_Agent" in last_msg: next_agent = "Gap_Analyst"
-         elif "Gap_Agent" in last_msg: next_agent = "FINISH"
-         else: next_agent = "Topic_Refiner"
-         
-         print(f"[Supervisor]: Fallback override -> '{next_agent}'")
-
-    print(f"[Supervisor]: Routing to -> {next_agent}\n")
-    return {"next": next_agent}
+        # Basic heuristic fallback if LLM gets confused
+        next_agent = route_by_keywords(messages[-1].content)
+        print(f"[Supervisor]: Fallback override -> '{next_agent}'")
+
+    return next_agent
+
+async def supervisor_node(state: AgentState, config: RunnableConfig = None):
+    """
+    The Supervisor node decides which agent should act next.
+    The routing mode is read from config["configurable"]["routing_mode"].
+    """
+    messages = state["messages"]
+    configurable = (config or {}).get("configurable", {})
+    mode = configurable.get("routing_mode") or DEFAULT_ROUTING_MODE
+
+    next_agent = None
+    if mode != "llm":
+        next_agent = route_by_rules(messages)
+
+    if next_agent is None:
+        if mode == "rule":
+            next_agent = route_by_keywords(messages[-1].content)
+            print(f"[Supervisor]: Ambiguous state, keyword fallback -> '{next_agent}'")
+        else:
+            next_agent = await route_with_llm(messages)
+
+    print(f"[Supervisor]: Routing to -> {next_agent} (mode: {mode})\n")
+    update = {"next": next_agent}
+    if needs_llm_compaction(messages):
+        # Replaces the extractive summary of evicted turns (see graph.context.bounded_messages)
+        _, summary, _ = split_history(messages)
+        update["messages"] = [await compact_with_llm(summary, _get_router_llm())]
+    return update
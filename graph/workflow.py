@@ -1,26 +1,59 @@
+import os
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from graph.state import AgentState
 from graph.nodes import (
     topic_refiner_node,
     paper_discoverer_node,
     insight_synthesizer_node,
+    paper_insight_node,
+    insight_reducer_node,
     report_compiler_node,
     gap_analyst_node
 )
+from graph.discovery import selected_papers
 from graph.supervisor import supervisor_node
+from tools.telemetry import traced_node
 
-def create_workflow():
+# Parallel workflow: papers analysed per run and how many of them run at once
+INSIGHT_MAX_PAPERS = int(os.getenv("INSIGHT_MAX_PAPERS", "8"))
+INSIGHT_MAX_CONCURRENCY = int(os.getenv("INSIGHT_MAX_CONCURRENCY", "4"))
+
+def route_supervisor(state: AgentState):
+    return state["next"]
+
+def route_supervisor_parallel(state: AgentState):
+    """
+    Same as route_supervisor, but the insight stage fans out one
+    Paper_Insight branch per paper the Paper_Discoverer agent selected (at most
+    INSIGHT_MAX_PAPERS, most relevant first).
+    """
+    next_agent = state["next"]
+    papers = selected_papers(state["messages"], state.get("papers") or [])
+    if next_agent == "Insight_Synthesizer" and papers:
+        return [Send("Paper_Insight", {"paper": paper}) for paper in papers[:INSIGHT_MAX_PAPERS]]
+    return next_agent
+
+def create_workflow(parallel: bool = False, checkpointer=None):
+    """
+    Builds the Supervisor <-> workers graph.
+    With parallel=True, insight synthesis runs per paper concurrently (Send fan-out)
+    and is reduced into one Insight_Agent message before the report stage; cap the
+    concurrency with config["max_concurrency"].
+    With a checkpointer (see graph/checkpoint.py) every completed step is saved under
+    config["configurable"]["thread_id"], so an interrupted run can be resumed.
+    """
     workflow = StateGraph(AgentState)
 
-    # Add Supervisor
-    workflow.add_node("Supervisor", supervisor_node)
+    # Add Supervisor (every node runs in a telemetry span, see tools/telemetry.py)
+    workflow.add_node("Supervisor", traced_node("Supervisor", supervisor_node))
 
     # Add Workers
-    workflow.add_node("Topic_Refiner", topic_refiner_node)
-    workflow.add_node("Paper_Discoverer", paper_discoverer_node)
-    workflow.add_node("Insight_Synthesizer", insight_synthesizer_node)
-    workflow.add_node("Report_Compiler", report_compiler_node)
-    workflow.add_node("Gap_Analyst", gap_analyst_node)
+    workflow.add_node("Topic_Refiner", traced_node("Topic_Refiner", topic_refiner_node))
+    workflow.add_node("Paper_Discoverer", traced_node("Paper_Discoverer", paper_discoverer_node))
+    workflow.add_node("Insight_Synthesizer", traced_node("Insight_Synthesizer", insight_synthesizer_node))
+    workflow.add_node("Report_Compiler", traced_node("Report_Compiler", report_compiler_node))
+    workflow.add_node("Gap_Analyst", traced_node("Gap_Analyst", gap_analyst_node))
 
     # Entry Point
     workflow.set_entry_point("Supervisor")
@@ -33,18 +66,28 @@ def create_workflow():
     workflow.add_edge("Report_Compiler", "Supervisor")
     workflow.add_edge("Gap_Analyst", "Supervisor")
 
+    path_map = {
+        "Topic_Refiner": "Topic_Refiner",
+        "Paper_Discoverer": "Paper_Discoverer",
+        "Insight_Synthesizer": "Insight_Synthesizer",
+        "Report_Compiler": "Report_Compiler",
+        "Gap_Analyst": "Gap_Analyst",
+        "FINISH": END
+    }
+
+    if parallel:
+        # Fan-out per paper, fan-in once every branch has finished
+        workflow.add_node("Paper_Insight", traced_node("Paper_Insight", paper_insight_node))
+        workflow.add_node("Insight_Reducer", traced_node("Insight_Reducer", insight_reducer_node))
+        workflow.add_edge("Paper_Insight", "Insight_Reducer")
+        workflow.add_edge("Insight_Reducer", "Supervisor")
+        path_map["Paper_Insight"] = "Paper_Insight"
+
     # Conditional Logic from Supervisor
     workflow.add_conditional_edges(
         "Supervisor",
-        lambda state: state["next"],
-        {
-            "Topic_Refiner": "Topic_Refiner",
-            "Paper_Discoverer": "Paper_Discoverer",
-            "Insight_Synthesizer": "Insight_Synthesizer",
-            "Report_Compiler": "Report_Compiler",
-            "Gap_Analyst": "Gap_Analyst",
-            "FINISH": END
-        }
+        route_supervisor_parallel if parallel else route_supervisor,
+        path_map
     )
 
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
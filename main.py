@@ -4,16 +4,96 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-import json
-import asyncio
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from starlette.background import BackgroundTask
+import time
+import uuid
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
+from typing import Optional
+from pydantic import BaseModel, Field
 from langchain_core.messages import HumanMessage
-from graph.workflow import create_workflow
+from graph.supervisor import RoutingMode
+from graph.checkpoint import open_checkpointer, close_checkpointer, session_config, get_session, session_history
+from server.events import graph_events, replay_events
+from server.sse import sse_stream, SSE_HEADERS
+from server.jobs import JobManager
+from crew.execution import shutdown_crew_executor
+from tools.paper_corpus import shutdown_process_pool
+from tools.llm_scheduler import get_scheduler, llm_session, INTERACTIVE, BATCH
+from tools.telemetry import render_metrics, trace_session
+
+# When the graphs are built (LangGraph, CrewAI and the Gemini SDKs take seconds to import):
+# "background" right after startup while /health already answers, "lazy" on the first request
+# that needs them, "eager" before the server accepts requests
+WARMUP = os.getenv("WARMUP", "background").lower()
+
+# Compiled graphs, built by warmup() (the SQLite checkpointer binds to the server's event loop)
+graph = None
+parallel_graph = None
+checkpointer = None
+_warmup_task: Optional[asyncio.Task] = None
+# Sessions with a run in progress; they can't be resumed or replayed until it ends
+running_sessions = set()
+# Serialises the "session ID unused" check with the registration of the new run (see _new_session)
+_session_lock = asyncio.Lock()
+
+async def _build_graphs() -> None:
+    global graph, parallel_graph, checkpointer
+    started = time.perf_counter()
+    # Heavy imports run in a worker thread so the event loop keeps serving meanwhile
+    workflow = await asyncio.to_thread(importlib.import_module, "graph.workflow")
+    nodes = importlib.import_module("graph.nodes")
+    try:
+        await asyncio.to_thread(nodes.get_registry)
+    except ValueError as e:
+        # e.g. GEMINI_API_KEY missing: sessions can still be read, runs fail at their first stage
+        print(f"WARNING: Crew registry not built: {e}")
+    checkpointer = await open_checkpointer()
+    # Published last: a built graph is what /ready reports
+    parallel_graph = workflow.create_workflow(parallel=True, checkpointer=checkpointer)
+    graph = workflow.create_workflow(checkpointer=checkpointer)
+    print(f"DEBUG: Warmup finished in {time.perf_counter() - started:.2f}s")
+
+def _report_warmup(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"ERROR: Warmup failed: {task.exception()}")
+
+def _start_warmup() -> asyncio.Task:
+    global _warmup_task
+    # A failed build is retried by the next caller
+    if _warmup_task is None or (_warmup_task.done() and (_warmup_task.cancelled() or _warmup_task.exception() is not None)):
+        _warmup_task = asyncio.create_task(_build_graphs())
+        _warmup_task.add_done_callback(_report_warmup)
+    return _warmup_task
 
-app = FastAPI(title="Multi-Agent Research Assistant (LangGraph + CrewAI)")
+async def warmup() -> None:
+    """
+    Builds the graphs and the crew registry once; concurrent callers share
+    the same build. Every endpoint that needs a graph awaits this first.
+    """
+    # Shielded: a caller that goes away does not abort the build for everyone else
+    await asyncio.shield(_start_warmup())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await jobs.start()
+    if WARMUP == "eager":
+        await warmup()
+    elif WARMUP == "background":
+        _start_warmup()
+    yield
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+    await jobs.stop()
+    await close_checkpointer(checkpointer)
+    shutdown_crew_executor()
+    shutdown_process_pool()
+
+app = FastAPI(title="Multi-Agent Research Assistant (LangGraph + CrewAI)", lifespan=lifespan)
 
 # Enable CORS for Frontend (Allow all origins for deployment)
 app.add_middleware(
@@ -24,11 +104,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Graph
-graph = create_workflow()
-
 class ResearchRequest(BaseModel):
     topic: str
+    # Supervisor routing: "rule", "hybrid" (rules + LLM fallback) or "llm". Defaults to SUPERVISOR_ROUTING_MODE.
+    routing_mode: Optional[RoutingMode] = None
+    # Forward LLM token deltas as {"type": "delta"} events on /research-stream
+    stream_tokens: bool = True
+    # Synthesize insights per paper concurrently (fan-out/fan-in workflow)
+    parallel: bool = False
+    # Cap on concurrently running branches in the parallel workflow
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+    # Checkpointed session ID; generated when omitted and sent to the client as a "session" event
+    session_id: Optional[str] = None
+    # Answer or seed the run from a stored run of the same or a similar topic (see graph/memo.py)
+    use_memo: bool = True
+
+class ReplayRequest(BaseModel):
+    # Re-run the session from this checkpoint (see GET /sessions/{id}/history).
+    # When omitted, the stored messages are re-emitted without running anything.
+    checkpoint_id: Optional[str] = None
+    stream_tokens: bool = True
+
+def _graph_config(session_id: str, routing_mode: Optional[str] = None, parallel: bool = False, max_concurrency: Optional[int] = None, checkpoint_id: Optional[str] = None, priority: str = INTERACTIVE, use_memo: Optional[bool] = True) -> dict:
+    # Options are stored with each checkpoint so resume/replay run with the same settings.
+    # priority: LLM scheduling class, interactive (a client is watching) or batch (background job)
+    config = session_config(session_id, checkpoint_id, routing_mode=routing_mode, parallel=parallel, priority=priority, use_memo=use_memo is not False)
+    config["recursion_limit"] = 50
+    if parallel:
+        from graph.workflow import INSIGHT_MAX_CONCURRENCY
+        config["max_concurrency"] = max_concurrency or INSIGHT_MAX_CONCURRENCY
+        config["configurable"]["max_concurrency"] = config["max_concurrency"]
+    return config
+
+def _select_graph(parallel: bool):
+    return parallel_graph if parallel else graph
+
+async def _load_session(session_id: str) -> dict:
+    await warmup()
+    if session_id in running_sessions:
+        raise HTTPException(status_code=409, detail="Session is already running")
+    # The parallel graph has every node of the sequential one, so it can read any session
+    session = await get_session(parallel_graph, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+@asynccontextmanager
+async def _new_session(session_id: Optional[str]):
+    """
+    Guards the start of a run under a client-chosen session ID: 409 if it
+    has a run in progress, a queued or running job, or checkpoints. The run
+    must be registered (running_sessions, jobs.submit) inside the block, so
+    two requests for the same ID can't both pass the check.
+    """
+    async with _session_lock:
+        if session_id and (session_id in running_sessions or session_id in jobs.jobs or await get_session(parallel_graph, session_id)):
+            raise HTTPException(status_code=409, detail="Session already exists, use /sessions/{session_id}/resume")
+        yield
+
+async def _track(session_id: str, events):
+    running_sessions.add(session_id)
+    try:
+        async for event in events:
+            yield event
+    finally:
+        running_sessions.discard(session_id)
+
+def _stream(session_id: str, events, request: Optional[Request] = None) -> StreamingResponse:
+    # sse_stream flushes each ready batch immediately and sends keep-alive comments while agents work;
+    # with the request, a client disconnect cancels the run (graph and crew threads) within a poll interval
+    is_disconnected = request.is_disconnected if request is not None else None
+    # The background task releases a session registered up front whose stream never started (client gone)
+    return StreamingResponse(sse_stream(_track(session_id, events), is_disconnected=is_disconnected), media_type="text/event-stream",
+                             headers=SSE_HEADERS, background=BackgroundTask(running_sessions.discard, session_id))
+
+async def _job_events(job):
+    # A job's ID doubles as its session ID, so a failed job can be resumed via /sessions/{id}/resume
+    await warmup()
+    spec = job.spec
+    initial_state = {"messages": [HumanMessage(content=spec.topic)]}
+    config = _graph_config(job.id, spec.routing_mode, spec.parallel, spec.max_concurrency, priority=BATCH, use_memo=spec.use_memo)
+    async for event in graph_events(_select_graph(spec.parallel), initial_state, config, stream_tokens=spec.stream_tokens):
+        yield event
+
+def _run_job(job):
+    return _track(job.id, _job_events(job))
+
+# Background research runs on a bounded worker pool (JOB_WORKERS, JOB_QUEUE_SIZE)
+jobs = JobManager(_run_job)
 
 @app.get("/")
 def home():
@@ -41,6 +204,15 @@ def health_check():
     """
     return {"status": "ok", "service": "research-assistant-backend"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: 200 once the graphs are built (see WARMUP), 503 before.
+    """
+    if graph is None:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
 @app.post("/researchagents")
 async def run_research_agents(request: ResearchRequest):
     """
@@ -50,11 +222,18 @@ async def run_research_agents(request: ResearchRequest):
     if not topic:
         raise HTTPException(status_code=400, detail="Topic is required")
 
+    session_id = request.session_id or uuid.uuid4().hex
+    await warmup()
+    async with _new_session(request.session_id):
+        running_sessions.add(session_id)
     try:
         initial_state = {"messages": [HumanMessage(content=topic)]}
         print(f"DEBUG: Invoking graph with topic: {topic}")
         
-        final_state = await graph.ainvoke(initial_state, config={"recursion_limit": 50})
+        config = _graph_config(session_id, request.routing_mode, request.parallel, request.max_concurrency, use_memo=request.use_memo)
+        llm_session.set(session_id)
+        trace_session.set(session_id)
+        final_state = await _select_graph(request.parallel).ainvoke(initial_state, config=config)
         
         messages = []
         for msg in final_state["messages"]:
@@ -68,6 +247,11 @@ async def run_research_agents(request: ResearchRequest):
     except Exception as e:
         print(f"ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        running_sessions.discard(session_id)
+        # Speculative arXiv searches of a run that ended before Paper_Discoverer took them
+        from graph.discovery import cancel_speculation
+        cancel_speculation(session_id)
 
 @app.post("/research-stream")
 async def stream_research_agents(request: Request, body: ResearchRequest):
@@ -78,57 +262,151 @@ async def stream_research_agents(request: Request, body: ResearchRequest):
     if not topic:
         raise HTTPException(status_code=400, detail="Topic is required")
 
-    async def event_generator():
-        initial_state = {"messages": [HumanMessage(content=topic)]}
-        
-        # We use graph.stream to get updates from each node
+    session_id = body.session_id or uuid.uuid4().hex
+    await warmup()
+    async with _new_session(body.session_id):
+        # Registered now rather than when the stream starts: a job or stream for the same ID sees it
+        running_sessions.add(session_id)
+
+    initial_state = {"messages": [HumanMessage(content=topic)]}
+    config = _graph_config(session_id, body.routing_mode, body.parallel, body.max_concurrency, use_memo=body.use_memo)
+    events = graph_events(_select_graph(body.parallel), initial_state, config, stream_tokens=body.stream_tokens)
+    return _stream(session_id, events, request)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: span latency per node/LLM/arXiv, tokens per agent, cache hits, queue waits.
+    """
+    scheduler = get_scheduler().stats()
+    job_stats = jobs.stats()
+    gauges = {
+        "research_llm_queued_requests": ("LLM requests waiting for the Gemini budget", {
+            (("priority", p),): v["queued"] for p, v in scheduler["priorities"].items()
+        }),
+        "research_llm_available_tokens": ("Tokens left in the Gemini per-minute budget", {(): scheduler["available_tokens"]}),
+        "research_jobs": ("Background research jobs by state", {
+            (("state", "running"),): job_stats["running"],
+            (("state", "queued"),): job_stats["queued"],
+        }),
+        "research_sessions_running": ("Research runs in progress", {(): len(running_sessions)}),
+    }
+    return PlainTextResponse(render_metrics(gauges), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm-scheduler")
+async def llm_scheduler_stats():
+    """
+    Gemini budget and queue wait times per priority class.
+    """
+    return get_scheduler().stats()
+
+@app.post("/jobs", status_code=202)
+async def submit_job(body: ResearchRequest):
+    """
+    Queues a research run and returns its job ID at once.
+    Poll GET /jobs/{job_id} or stream GET /jobs/{job_id}/events.
+    """
+    if not body.topic:
+        raise HTTPException(status_code=400, detail="Topic is required")
+    await warmup()
+    async with _new_session(body.session_id):
         try:
-            # Send initial status
-            yield f"data: {json.dumps({'type': 'status', 'agent': 'Supervisor', 'status': 'planning'})}\n\n"
-            
-            # Using stream with stream_mode="updates" ensures we get the output of each node as it finishes
-            async for output in graph.astream(initial_state, stream_mode="updates", config={"recursion_limit": 50}):
-                if await request.is_disconnected():
-                    print("DEBUG: Client disconnected. Stopping research.")
-                    break
-                
-                print(f"DEBUG: Graph step output: {output.keys()}")
-                for key, value in output.items():
-                    # key is the node name (e.g., 'Topic_Refiner', 'Supervisor')
-                    
-                    if key == "Supervisor":
-                        next_agent = value.get("next", "Unknown")
-                        print(f"DEBUG: Supervisor routing to {next_agent}")
-                        
-                        # Emit Supervisor thought/decision as a message
-                        thought_content = f"Analyzed current state. Deciding next step: **{next_agent}**."
-                        yield f"data: {json.dumps({'type': 'message', 'agent': 'Supervisor', 'content': thought_content})}\n\n"
-                        await asyncio.sleep(0.1) # Force yield
-                        
-                        yield f"data: {json.dumps({'type': 'status', 'agent': next_agent, 'status': 'working'})}\n\n"
-                        await asyncio.sleep(0.1) # Force yield
-                    
-                    else:
-                        print(f"DEBUG: Agent {key} finished task.")
-                        # Worker node content
-                        if "messages" in value and value["messages"]:
-                            last_msg = value["messages"][-1]
-                            content = last_msg.content
-                            yield f"data: {json.dumps({'type': 'message', 'agent': key, 'content': content})}\n\n"
-                            await asyncio.sleep(0.1) # Force yield
-                            
-                            # Log completion of this agent
-                            yield f"data: {json.dumps({'type': 'status', 'agent': key, 'status': 'completed'})}\n\n"
-                            await asyncio.sleep(0.1) # Force yield
-
-            yield f"data: {json.dumps({'type': 'status', 'agent': 'System', 'status': 'finished'})}\n\n"
-            await asyncio.sleep(0.1) # Force yield
-            
-        except Exception as e:
-            print(f"ERROR: Stream loop failed: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+            job = jobs.submit(body, job_id=body.session_id)
+        except asyncio.QueueFull:
+            # Admission control: shed load instead of queueing without bound
+            return JSONResponse(status_code=429, content={"detail": "Job queue is full, retry later", **jobs.stats()}, headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status, "position": jobs.position(job), "events_url": f"/jobs/{job.id}/events"}
+
+@app.get("/jobs")
+async def job_stats():
+    return jobs.stats()
+
+@app.get("/jobs/{job_id}")
+async def read_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict(position=jobs.position(job))
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """
+    Streams a job's events (SSE): everything so far, then live events until it finishes.
+    Disconnecting does not affect the job.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(sse_stream(job.events()), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not jobs.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job already finished")
+    return {"job_id": job_id, "cancelled": True}
+
+@app.get("/sessions/{session_id}")
+async def read_session(session_id: str):
+    """
+    Latest checkpoint of a session: status ("interrupted" or "completed"), pending nodes and messages.
+    """
+    await warmup()
+    session = await get_session(parallel_graph, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+@app.get("/sessions/{session_id}/history")
+async def read_session_history(session_id: str, limit: Optional[int] = None):
+    """
+    Checkpoints of a session, newest first.
+    """
+    await warmup()
+    history = await session_history(parallel_graph, session_id, limit=limit)
+    if not history:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"session_id": session_id, "checkpoints": history}
+
+@app.post("/sessions/{session_id}/resume")
+async def resume_session(request: Request, session_id: str, stream_tokens: bool = True):
+    """
+    Continues an interrupted session from its last completed node (SSE).
+    Steps that already finished are not run again.
+    """
+    session = await _load_session(session_id)
+    if session["status"] == "completed":
+        raise HTTPException(status_code=409, detail="Session already completed")
+
+    options = session["options"]
+    config = _graph_config(session_id, options["routing_mode"], bool(options["parallel"]), options["max_concurrency"], use_memo=options["use_memo"])
+    print(f"DEBUG: Resuming session {session_id} at {session['next']}")
+    events = graph_events(_select_graph(bool(options["parallel"])), None, config, stream_tokens=stream_tokens)
+    return _stream(session_id, events, request)
+
+@app.post("/sessions/{session_id}/replay")
+async def replay_session(request: Request, session_id: str, body: Optional[ReplayRequest] = None):
+    """
+    Without a checkpoint_id, re-emits the stored messages of the session (SSE, no LLM calls).
+    With one, re-runs the session from that checkpoint; the new run forks the session history.
+    """
+    body = body or ReplayRequest()
+    session = await _load_session(session_id)
+    if body.checkpoint_id is None:
+        return _stream(session_id, replay_events(session))
+
+    options = session["options"]
+    config = _graph_config(session_id, options["routing_mode"], bool(options["parallel"]), options["max_concurrency"], checkpoint_id=body.checkpoint_id, use_memo=options["use_memo"])
+    print(f"DEBUG: Replaying session {session_id} from checkpoint {body.checkpoint_id}")
+    events = graph_events(_select_graph(bool(options["parallel"])), None, config, stream_tokens=body.stream_tokens)
+    return _stream(session_id, events, request)
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream", headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache", "Connection": "keep-alive"})
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    await _load_session(session_id)
+    await checkpointer.adelete_thread(session_id)
+    return {"session_id": session_id, "deleted": True}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,146 @@
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Optional
+from tools.cancellation import CancellationToken, run_cancellation
+from tools.llm_scheduler import llm_session, llm_priority, INTERACTIVE
+from tools.telemetry import trace_session
+
+def status_event(agent: str, status: str) -> dict:
+    return {"type": "status", "agent": agent, "status": status}
+
+def message_event(agent: str, content: str) -> dict:
+    return {"type": "message", "agent": agent, "content": content}
+
+# Graph nodes reported to the client under another agent's name
+NODE_AGENTS = {"Insight_Reducer": "Insight_Synthesizer"}
+
+def session_event(session_id: str) -> dict:
+    return {"type": "session", "session_id": session_id}
+
+# Worker message prefix -> agent that produced it (used to replay stored sessions)
+MESSAGE_AGENTS = {
+    "Refinement_Agent:": "Topic_Refiner",
+    "Discovery_Agent:": "Paper_Discoverer",
+    "Insight_Agent:": "Insight_Synthesizer",
+    "Report_Agent:": "Report_Compiler",
+    "Gap_Agent:": "Gap_Analyst",
+}
+
+def memo_event(memo: dict) -> dict:
+    return {"type": "memo", **memo}
+
+def message_agent(content: Any) -> Optional[str]:
+    content = content if isinstance(content, str) else str(content)
+    return next((a for prefix, a in MESSAGE_AGENTS.items() if content.startswith(prefix)), None)
+
+def updates_to_events(output: dict):
+    """
+    Translates one LangGraph "updates" chunk into client events.
+    """
+    for key, value in output.items():
+        key = NODE_AGENTS.get(key, key)
+        # key is the node name (e.g., 'Topic_Refiner', 'Supervisor')
+        if key == "Supervisor":
+            next_agent = value.get("next", "Unknown")
+            print(f"DEBUG: Supervisor routing to {next_agent}")
+
+            # Emit Supervisor thought/decision as a message
+            thought_content = f"Analyzed current state. Deciding next step: **{next_agent}**."
+            yield message_event("Supervisor", thought_content)
+            yield status_event(next_agent, "working")
+
+        else:
+            print(f"DEBUG: Agent {key} finished task.")
+            if value and value.get("memo"):
+                yield memo_event(value["memo"])
+            # Worker node content
+            if value and "messages" in value and value["messages"]:
+                if len(value["messages"]) > 1:
+                    # Stages reused from a research memo, each reported under its own agent
+                    for message in value["messages"]:
+                        agent = message_agent(message.content) or key
+                        yield message_event(agent, message.content)
+                        yield status_event(agent, "completed")
+                    continue
+                last_msg = value["messages"][-1]
+                yield message_event(key, last_msg.content)
+
+                # Log completion of this agent
+                yield status_event(key, "completed")
+
+async def graph_events(
+    graph: Any,
+    graph_input: Any,
+    config: dict,
+    stream_tokens: bool = True,
+) -> AsyncIterator[dict]:
+    """
+    Runs the graph and yields client events (dicts) as the run progresses.
+    Errors are reported as an {"type": "error"} event instead of raised.
+    When the consumer stops early (client disconnect, cancelled job), the
+    running nodes are cancelled and the run's cancellation token stops the
+    crew work in threads (tools/cancellation.py).
+    """
+    token = CancellationToken()
+    run_cancellation.set(token)
+    configurable = config.get("configurable", {})
+    session_id = configurable.get("thread_id")
+    finished = False
+    try:
+        # LLM calls of this run are fair-queued per session and prioritised (tools.llm_scheduler)
+        llm_session.set(session_id)
+        trace_session.set(session_id)
+        llm_priority.set(configurable.get("priority") or INTERACTIVE)
+        # Tell the client which session to resume if the connection drops
+        if session_id:
+            yield session_event(session_id)
+
+        # Send initial status
+        yield status_event("Supervisor", "planning")
+
+        # "updates" gives the output of each node as it finishes, "custom" carries token deltas from the workers
+        stream_mode = ["updates", "custom"] if stream_tokens else ["updates"]
+        async with aclosing(graph.astream(graph_input, stream_mode=stream_mode, config=config)) as stream:
+            async for mode, output in stream:
+                if mode == "custom":
+                    # Token delta from a worker node, tagged with the agent that produced it
+                    event = {"type": "delta", "agent": output["agent"], "content": output["delta"]}
+                    if "source" in output:
+                        event["source"] = output["source"]
+                    yield event
+                    continue
+
+                print(f"DEBUG: Graph step output: {output.keys()}")
+                for event in updates_to_events(output):
+                    yield event
+        finished = True
+
+        yield status_event("System", "finished")
+
+    except Exception as e:
+        print(f"ERROR: Stream loop failed: {e}")
+        yield {"type": "error", "content": str(e)}
+    finally:
+        if not finished:
+            # Stopped early (client gone, job cancelled, error): stop whatever still runs in crew
+            # threads. A finished run is not cancelled, which would fire its token's callbacks.
+            token.cancel()
+        # Speculative arXiv searches of a run that ended before Paper_Discoverer took them
+        # (graph.discovery is loaded with the graphs, which this run needed anyway)
+        from graph.discovery import cancel_speculation
+        cancel_speculation(session_id)
+
+async def replay_events(session: dict) -> AsyncIterator[dict]:
+    """
+    Re-emits the stored messages of a session (see graph.checkpoint.get_session)
+    without running anything, so a reconnecting client can rebuild its view.
+    """
+    yield session_event(session["session_id"])
+    for message in session["messages"]:
+        content = message["content"] if isinstance(message["content"], str) else str(message["content"])
+        agent = message_agent(content)
+        if message["type"] != "ai" or agent is None:
+            continue
+        yield message_event(agent, content)
+        yield status_event(agent, "completed")
+    if session["status"] == "completed":
+        yield status_event("System", "finished")
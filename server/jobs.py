@@ -0,0 +1,199 @@
+import os
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+# Research runs executing at once; further jobs wait in the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Jobs allowed to wait for a worker; submissions beyond this are rejected (HTTP 429)
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+# Finished jobs kept in memory for GET /jobs/{id} (their sessions stay in the checkpointer)
+JOB_MAX_FINISHED = int(os.getenv("JOB_MAX_FINISHED", "256"))
+
+FINISHED = ("completed", "failed", "cancelled")
+
+_END = object()
+
+class Job:
+    """
+    One research run submitted through the job API. Its events are kept
+    (except token deltas, which are superseded by the final message) so a
+    client can attach at any time and still get the whole run.
+    """
+    def __init__(self, job_id: str, spec: Any):
+        self.id = job_id
+        self.spec = spec
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.history = []
+        self._subscribers = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    def publish(self, event: dict) -> None:
+        if event.get("type") != "delta":
+            self.history.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.time()
+        for queue in self._subscribers:
+            queue.put_nowait(_END)
+
+    async def events(self) -> AsyncIterator[dict]:
+        """
+        Past events of the job followed by live ones until it finishes.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        # Snapshot and subscribe without awaiting in between, so no event is missed or repeated
+        past = list(self.history)
+        finished = self.done
+        if not finished:
+            self._subscribers.add(queue)
+        try:
+            for event in past:
+                yield event
+            if finished:
+                return
+            while True:
+                event = await queue.get()
+                if event is _END:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    def to_dict(self, position: Optional[int] = None) -> dict:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "messages": [e for e in self.history if e.get("type") == "message"],
+        }
+        if position is not None:
+            data["position"] = position
+        return data
+
+class JobManager:
+    """
+    Runs research jobs on a fixed pool of asyncio workers behind a bounded
+    queue. `runner(job)` returns the async iterator of client events for a job
+    (see server.events.graph_events); the run's lifetime no longer depends on
+    any HTTP connection.
+    """
+    def __init__(self, runner: Callable[[Job], AsyncIterator[dict]], workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE, max_finished: int = JOB_MAX_FINISHED):
+        self.runner = runner
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_finished = max_finished
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.counts = {status: 0 for status in FINISHED}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for job in self.jobs.values():
+            if job._task is not None and not job._task.done():
+                job._task.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, spec: Any, job_id: Optional[str] = None) -> Job:
+        """
+        Queues a job. Raises asyncio.QueueFull when the queue is at capacity.
+        """
+        job = Job(job_id or uuid.uuid4().hex, spec)
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        print(f"DEBUG: Job {job.id} queued ({self._queue.qsize()} waiting)")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def position(self, job: Job) -> Optional[int]:
+        # 0 means next in line
+        if job.status != "queued":
+            return None
+        return sum(1 for other in self.jobs.values() if other.status == "queued" and other.created_at < job.created_at)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        if job._task is not None:
+            job._task.cancel()
+        else:
+            # Still queued: the worker that picks it up skips it
+            job.publish({"type": "status", "agent": "System", "status": "cancelled"})
+            job.finish("cancelled")
+            self._finished(job)
+        return True
+
+    def stats(self) -> dict:
+        running = sum(1 for job in self.jobs.values() if job.status == "running")
+        return {
+            "workers": self.workers,
+            "running": running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            **self.counts,
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status != "queued":
+                    continue
+                job._task = asyncio.create_task(self._run(job))
+                # wait() doesn't raise when the job is cancelled, only when the worker is
+                await asyncio.wait({job._task})
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            async for event in self.runner(job):
+                if event.get("type") == "error":
+                    job.error = event.get("content")
+                job.publish(event)
+            job.finish("failed" if job.error else "completed")
+        except asyncio.CancelledError:
+            job.publish({"type": "status", "agent": "System", "status": "cancelled"})
+            job.finish("cancelled")
+        except Exception as e:
+            print(f"ERROR: Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.publish({"type": "error", "content": str(e)})
+            job.finish("failed")
+        finally:
+            self._finished(job)
+
+    def _finished(self, job: Job) -> None:
+        self.counts[job.status] += 1
+        print(f"DEBUG: Job {job.id} {job.status}")
+        finished = [j for j in self.jobs.values() if j.done]
+        for old in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[old.id]
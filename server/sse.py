@@ -0,0 +1,119 @@
+import os
+import json
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+# Idle time after which a keep-alive comment is sent (keeps proxies from closing the stream)
+HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+# Maximum number of ready events framed into a single write
+MAX_BATCH = int(os.getenv("SSE_MAX_BATCH", "64"))
+# Events buffered between the producer and a slow client before the producer is paused
+MAX_BUFFER = int(os.getenv("SSE_MAX_BUFFER", "1024"))
+# How often the client connection is checked; a disconnect cancels the run within about this time
+DISCONNECT_POLL_INTERVAL = float(os.getenv("SSE_DISCONNECT_POLL_INTERVAL", "1.0"))
+
+SSE_HEADERS = {"X-Accel-Buffering": "no", "Cache-Control": "no-cache", "Connection": "keep-alive"}
+
+_DONE = object()
+
+def format_event(data: Any, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    """
+    Frames one SSE event. `data` is JSON-encoded unless it is already a string.
+    """
+    payload = data if isinstance(data, str) else json.dumps(data)
+    frame = ""
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    if event is not None:
+        frame += f"event: {event}\n"
+    for line in payload.splitlines() or [""]:
+        frame += f"data: {line}\n"
+    return frame + "\n"
+
+def format_comment(text: str = "keep-alive") -> str:
+    # Lines starting with ':' are ignored by SSE clients
+    return f": {text}\n\n"
+
+async def sse_stream(
+    events: AsyncIterator[Any],
+    heartbeat_interval: Optional[float] = None,
+    max_batch: Optional[int] = None,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Turns an async iterator of events into SSE chunks for a StreamingResponse.
+
+    Every yielded chunk is flushed to the client immediately, so there is no
+    artificial pacing: events already waiting are framed together in one write
+    (up to max_batch), and a keep-alive comment is sent whenever the producer
+    has been idle for heartbeat_interval seconds.
+
+    With `is_disconnected` (Request.is_disconnected), the connection is
+    polled while the producer works, and the producer is cancelled as soon as
+    the client is gone instead of at its next event.
+    """
+    heartbeat_interval = HEARTBEAT_INTERVAL if heartbeat_interval is None else heartbeat_interval
+    max_batch = MAX_BATCH if max_batch is None else max_batch
+    queue: asyncio.Queue = asyncio.Queue(maxsize=MAX_BUFFER)
+
+    async def pump():
+        try:
+            async for event in events:
+                await queue.put(event)
+            await queue.put(_DONE)
+        except Exception as e:
+            await queue.put(e)
+        except asyncio.CancelledError:
+            # The consumer may be gone too: never wait for room in a full buffer here
+            try:
+                queue.put_nowait(_DONE)
+            except asyncio.QueueFull:
+                pass
+            raise
+
+    async def watch():
+        while not await is_disconnected():
+            await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+        print("DEBUG: Client disconnected. Stopping research.")
+        producer.cancel()
+        # The consumer is still draining: make sure it sees the end even if the buffer was full
+        await asyncio.wait([producer])
+        await queue.put(_DONE)
+
+    producer = asyncio.create_task(pump())
+    watcher = asyncio.create_task(watch()) if is_disconnected is not None else None
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield format_comment()
+                continue
+
+            frames = []
+            done = False
+            while True:
+                if item is _DONE:
+                    done = True
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                frames.append(format_event(item))
+                if len(frames) >= max_batch or queue.empty():
+                    break
+                item = queue.get_nowait()
+
+            if frames:
+                yield "".join(frames)
+            if done:
+                return
+    finally:
+        # Client went away (or we finished): stop the producer
+        if watcher is not None:
+            watcher.cancel()
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,66 @@
+import os
+import time
+import tempfile
+import tools.arxiv_search as arxiv_search
+from tools.disk_cache import DiskCache
+from tools.rate_limit import RateLimiter
+
+def test_disk_cache_ttl_and_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(os.path.join(tmp, "c.sqlite"), ttl=0.2, max_entries=2)
+        cache.set("a", [1])
+        cache.set("b", [2])
+        assert cache.get("a") == [1]  # touch 'a' so 'b' is least recently used
+        cache.set("c", [3])
+        assert cache.get("b") is None
+        assert cache.get("a") == [1] and cache.get("c") == [3]
+
+        time.sleep(0.25)
+        assert cache.get("a") is None
+        assert cache.stats()["hits"] == 3
+        cache.close()
+
+def test_query_normalization_keeps_boolean_operators():
+    assert arxiv_search.normalize_query("  Multi-Agent   Systems ") == "multi-agent systems"
+    assert arxiv_search.cache_key("LLM agents", 5, True) == arxiv_search.cache_key("llm  AGENTS", 5, True)
+    assert arxiv_search.cache_key("a AND b", 5, True) != arxiv_search.cache_key("a and b", 5, True)
+    assert arxiv_search.cache_key("llm", 5, True) != arxiv_search.cache_key("llm", 10, True)
+
+def test_repeat_search_is_served_from_cache():
+    calls = []
+
+    def fake_fetch(query, max_results, sort_by_relevance):
+        calls.append(query)
+        return [{"title": "Paper", "summary": "S", "url": "http://arxiv.org/abs/1", "published": "2024-01-01", "authors": [], "categories": []}]
+
+    original_fetch, original_cache = arxiv_search._fetch, arxiv_search._cache
+    with tempfile.TemporaryDirectory() as tmp:
+        arxiv_search._fetch = fake_fetch
+        arxiv_search._cache = DiskCache(os.path.join(tmp, "arxiv.sqlite"), namespace="arxiv")
+        try:
+            first = arxiv_search.search_arxiv("Graph Neural Networks")
+            start = time.perf_counter()
+            second = arxiv_search.search_arxiv("graph neural  networks")
+            elapsed = time.perf_counter() - start
+        finally:
+            arxiv_search._cache.close()
+            arxiv_search._fetch, arxiv_search._cache = original_fetch, original_cache
+
+    assert first == second
+    assert calls == ["Graph Neural Networks"]
+    assert elapsed < 0.05
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rate=20, burst=1)
+    start = time.perf_counter()
+    for _ in range(4):
+        limiter.acquire()
+    # First call is free, the next three wait ~50 ms each
+    assert time.perf_counter() - start >= 0.14
+
+if __name__ == "__main__":
+    test_disk_cache_ttl_and_lru_eviction()
+    test_query_normalization_keeps_boolean_operators()
+    test_repeat_search_is_served_from_cache()
+    test_rate_limiter_spaces_requests()
+    print("arXiv cache tests passed.")
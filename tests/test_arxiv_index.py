@@ -0,0 +1,90 @@
+import os
+import json
+import asyncio
+import tempfile
+import tools.arxiv_index as arxiv_index
+import tools.arxiv_search as arxiv_search
+from tools.arxiv_index import ArxivIndex, build_index, parse_query
+
+def _line(pid, title, abstract, categories, created):
+    # Same fields as the public arXiv metadata dump
+    return json.dumps({
+        "id": pid, "submitter": "A", "authors": "Ada Lovelace, Alan Turing", "title": title, "comments": None,
+        "journal-ref": None, "doi": None, "report-no": None, "categories": categories, "license": None,
+        "abstract": f"  {abstract}\n", "versions": [{"version": "v1", "created": created}, {"version": "v2", "created": created}],
+        "update_date": "2024-06-01", "authors_parsed": [["Lovelace", "Ada", ""], ["Turing", "Alan", ""]],
+    })
+
+SNAPSHOT = [
+    _line("2401.00001", "Multi-agent reinforcement learning for cooperative driving",
+          "Vehicles learn joint driving policies with multi-agent reinforcement learning.", "cs.MA cs.LG", "Mon, 1 Jan 2024 10:00:00 GMT"),
+    _line("2301.00002", "A survey of reinforcement learning",
+          "We survey reinforcement learning methods and benchmarks.", "cs.LG stat.ML", "Sun, 1 Jan 2023 10:00:00 GMT"),
+    _line("2402.00003", "Graph neural networks for molecules",
+          "Message passing predicts molecular properties.", "q-bio.BM", "Thu, 1 Feb 2024 10:00:00 GMT"),
+    _line("2403.00004", "Cooperative perception for driving",
+          "Vehicles share sensor features for cooperative perception in driving.", "cs.CV cs.RO", "Fri, 1 Mar 2024 10:00:00 GMT"),
+]
+
+def _build(tmp, **kwargs):
+    snapshot = os.path.join(tmp, "snapshot.json")
+    with open(snapshot, "w", encoding="utf-8") as f:
+        f.write("\n".join(SNAPSHOT) + "\n")
+    return build_index(snapshot, os.path.join(tmp, "index"), **kwargs)
+
+def test_query_parsing():
+    assert parse_query('cat:cs.AI AND ti:"multi agent"') == ("multi agent", ["cs.AI"])
+    assert parse_query("all:(graph OR networks) ANDNOT molecules") == ("graph networks", [])
+    assert parse_query('ti:agents ANDNOT (cat:q-bio.BM OR abs:"protein folding") AND cat:cs.MA') == ("agents", ["cs.MA"])
+
+def test_bm25_search_with_filters_and_search_arxiv_schema():
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = _build(tmp)
+        assert stats["papers"] == 4
+        index = ArxivIndex(os.path.join(tmp, "index"))
+
+        results = index.search("multi-agent reinforcement learning driving", max_results=3)
+        assert [r["url"] for r in results] == [
+            "http://arxiv.org/abs/2401.00001v2", "http://arxiv.org/abs/2301.00002v2", "http://arxiv.org/abs/2403.00004v2",
+        ]
+        assert results[0] == {
+            "title": "Multi-agent reinforcement learning for cooperative driving",
+            "summary": "Vehicles learn joint driving policies with multi-agent reinforcement learning.",
+            "url": "http://arxiv.org/abs/2401.00001v2",
+            "published": "2024-01-01",
+            "authors": ["Ada Lovelace", "Alan Turing"],
+            "categories": ["cs.MA", "cs.LG"],
+        }
+
+        # Whole archive or exact category, in the query or as an argument
+        assert [r["url"][-12:-2] for r in index.search("driving cat:cs.CV")] == ["2403.00004"]
+        assert len(index.search("learning", categories=["cs"])) == 2
+        assert index.search("learning", categories=["q-bio"]) == []
+        assert [r["url"][-12:-2] for r in index.search("reinforcement learning", date_from="2024-01-01")] == ["2401.00001"]
+        # Newest first without relevance sorting, category-only queries included
+        assert [r["url"][-12:-2] for r in index.search("cat:cs", sort_by_relevance=False)] == ["2403.00004", "2401.00001", "2301.00002"]
+        assert index.search("protein folding") == []
+        index.close()
+
+def test_search_arxiv_uses_offline_backend():
+    with tempfile.TemporaryDirectory() as tmp:
+        _build(tmp, categories=["cs."])
+        original = (arxiv_search.ARXIV_BACKEND, arxiv_index._index)
+        arxiv_search.ARXIV_BACKEND = "offline"
+        arxiv_index._index = ArxivIndex(os.path.join(tmp, "index"))
+        try:
+            papers = asyncio.run(arxiv_search.search_arxiv_many(["cooperative driving", "molecules"], max_results=2))
+            sync = arxiv_search.search_arxiv("cooperative perception", max_results=1)
+        finally:
+            arxiv_index._index.close()
+            arxiv_search.ARXIV_BACKEND, arxiv_index._index = original
+
+    # The q-bio paper was left out of the index by the category filter
+    assert [p["id"] for p in papers] == ["2403.00004", "2401.00001"]
+    assert sync[0]["title"] == "Cooperative perception for driving"
+
+if __name__ == "__main__":
+    test_query_parsing()
+    test_bm25_search_with_filters_and_search_arxiv_schema()
+    test_search_arxiv_uses_offline_backend()
+    print("arXiv index tests passed.")
@@ -0,0 +1,121 @@
+import time
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import TypedDict
+import httpx
+from autogen_core import CancellationToken as AutogenCancellationToken
+from autogen_core.models import UserMessage
+from langgraph.graph import StateGraph, END
+import server.sse as sse
+from crew.execution import run_blocking
+from server.events import graph_events
+from server.sse import sse_stream
+from tools.cancellation import CancellationToken
+from tools.custom_gemini_client import CustomGeminiClient
+from tools.llm_scheduler import LLMScheduler, schedule_crewai_llm
+from tools.rate_limit import RateLimiter
+
+class _State(TypedDict):
+    text: str
+
+class _FakeCrewLLM:
+    # Blocking provider call, as made by CrewAI inside crew.kickoff
+    model = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def call(self, messages, *args, **kwargs):
+        self.calls += 1
+        time.sleep(0.1)
+        return "step"
+
+    def get_token_usage_summary(self):
+        return SimpleNamespace(prompt_tokens=self.calls, completion_tokens=self.calls)
+
+def test_abandoned_session_releases_crew_thread():
+    llm = schedule_crewai_llm(_FakeCrewLLM(), scheduler=LLMScheduler(rpm=0))
+    limiter = RateLimiter(rate=1, burst=1)
+    released = threading.Event()
+
+    def kickoff():
+        # An agent loop alternating tool calls (paced like arXiv) and LLM calls
+        try:
+            for _ in range(30):
+                limiter.acquire()
+                llm.call("next step")
+            return "done"
+        finally:
+            released.set()
+
+    async def worker(state: _State):
+        return {"text": await run_blocking(kickoff)}
+
+    workflow = StateGraph(_State)
+    workflow.add_node("Paper_Discoverer", worker)
+    workflow.set_entry_point("Paper_Discoverer")
+    workflow.add_edge("Paper_Discoverer", END)
+    graph = workflow.compile()
+
+    async def run():
+        started = time.perf_counter()
+
+        async def is_disconnected():
+            return time.perf_counter() - started > 0.3
+
+        chunks = [chunk async for chunk in sse_stream(graph_events(graph, {"text": ""}, {}), heartbeat_interval=5, is_disconnected=is_disconnected)]
+        ended = time.perf_counter() - started
+        # The crew thread is blocked in a call or a rate-limit wait; it must stop on its own
+        thread_released = await asyncio.to_thread(released.wait, 1.0)
+        return chunks, ended, thread_released, time.perf_counter() - started
+
+    original = sse.DISCONNECT_POLL_INTERVAL
+    sse.DISCONNECT_POLL_INTERVAL = 0.05
+    try:
+        chunks, ended, thread_released, total = asyncio.run(run())
+    finally:
+        sse.DISCONNECT_POLL_INTERVAL = original
+
+    # The stream stops within a poll interval of the disconnect, without a "finished" event
+    assert ended < 0.6
+    assert not any("finished" in chunk for chunk in chunks)
+    # The kickoff thread gave up within one LLM call of the disconnect, after at most one more call
+    assert thread_released and total < 0.8
+    assert llm.calls <= 2
+
+def test_gemini_client_honors_cancellation_token():
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(10)
+        return httpx.Response(200, json={})
+
+    async def run(token, stream):
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = CustomGeminiClient(api_key="test-key", http_client=http_client)
+        asyncio.get_running_loop().call_later(0.1, token.cancel)
+        started = time.perf_counter()
+        try:
+            if stream:
+                async for _ in client.create_stream([UserMessage(content="Hi", source="user")], cancellation_token=token):
+                    pass
+            else:
+                await client.create([UserMessage(content="Hi", source="user")], cancellation_token=token)
+            raise AssertionError("the request was not cancelled")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await http_client.aclose()
+        return time.perf_counter() - started
+
+    # AutoGen's own token and the research run token both abort the request in flight
+    assert asyncio.run(run(AutogenCancellationToken(), stream=False)) < 1.0
+    assert asyncio.run(run(CancellationToken(), stream=True)) < 1.0
+    assert len(requests) == 2
+
+if __name__ == "__main__":
+    test_abandoned_session_releases_crew_thread()
+    test_gemini_client_honors_cancellation_token()
+    print("Cancellation tests passed.")
@@ -0,0 +1,91 @@
+import os
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from crew.execution import final_answer, run_crew, task_messages
+
+LLM_LATENCY = 0.2
+marker: ContextVar[str] = ContextVar("marker", default="")
+
+class FakeLLM:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    async def acall(self, messages):
+        self.tracker["current"] += 1
+        self.tracker["peak"] = max(self.tracker["peak"], self.tracker["current"])
+        await asyncio.sleep(LLM_LATENCY)
+        self.tracker["current"] -= 1
+        return "Thought: done\nFinal Answer: " + messages[-1]["content"]
+
+class FakeCrew:
+    """
+    The parts of a pooled single-task Crew that run_crew touches.
+    """
+    def __init__(self, tracker, tools=()):
+        self.agents = [SimpleNamespace(role="Writer", goal="Write", backstory="Writes.", tools=list(tools), llm=FakeLLM(tracker))]
+        self.tasks = [SimpleNamespace(description="Report on {topic}", prompt=None)]
+        self.kickoff_thread = None
+
+    def _interpolate_inputs(self, inputs):
+        description = self.tasks[0].description.format(**inputs)
+        self.tasks[0].prompt = lambda: description
+
+    def kickoff(self, inputs):
+        self.kickoff_thread = threading.current_thread().name
+        time.sleep(LLM_LATENCY)
+        return f"kickoff {inputs['topic']} {marker.get()}"
+
+def test_async_path_scales_past_default_thread_pool():
+    # The default executor has min(32, cpu + 4) threads; 64 runs must all be in flight at once
+    tracker = {"current": 0, "peak": 0}
+
+    async def run():
+        crews = [FakeCrew(tracker) for _ in range(64)]
+        return await asyncio.gather(*(run_crew(crew, {"topic": f"t{i}"}) for i, crew in enumerate(crews)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert tracker["peak"] == 64
+    assert elapsed < LLM_LATENCY * 4
+    assert results[5] == "Report on t5"
+
+def test_crews_with_tools_run_on_crew_executor():
+    async def run():
+        marker.set("ctx")
+        crew = FakeCrew({"current": 0, "peak": 0}, tools=["search"])
+        return crew, await run_crew(crew, {"topic": "x"})
+
+    crew, result = asyncio.run(run())
+    # The context is copied into the kickoff thread (delta sinks, spans, LLM session)
+    assert result == "kickoff x ctx"
+    assert crew.kickoff_thread.startswith("crew")
+
+def test_thread_mode_uses_kickoff():
+    async def run():
+        crew = FakeCrew({"current": 0, "peak": 0})
+        return await run_crew(crew, {"topic": "y"}, mode="thread")
+
+    assert asyncio.run(run()) == "kickoff y "
+
+def test_task_messages_and_final_answer():
+    crew = FakeCrew({"current": 0, "peak": 0})
+    messages = task_messages(crew, {"topic": "MARL"})
+    assert messages[0]["role"] == "system" and "You are Writer." in messages[0]["content"]
+    assert messages[1] == {"role": "user", "content": "Report on MARL"}
+    assert final_answer("Thought: ok\nFinal Answer: The report") == "The report"
+    assert final_answer("  Plain answer ") == "Plain answer"
+
+if __name__ == "__main__":
+    test_async_path_scales_past_default_thread_pool()
+    test_crews_with_tools_run_on_crew_executor()
+    test_thread_mode_uses_kickoff()
+    test_task_messages_and_final_answer()
+    print("Crew execution tests passed.")
@@ -0,0 +1,60 @@
+import os
+
+# Building agents needs a key; no LLM call is made
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from crew.registry import CrewRegistry, STAGES
+
+def test_checkout_reuses_idle_crew():
+    registry = CrewRegistry(stream=False)
+    with registry.checkout("refine") as first:
+        pass
+    with registry.checkout("refine") as second:
+        pass
+    assert first is second
+    assert registry.stats()["created"] == 1
+
+def test_concurrent_checkouts_get_separate_crews():
+    registry = CrewRegistry(stream=False, pool_size=1)
+    with registry.checkout("report") as a, registry.checkout("report") as b:
+        assert a is not b
+        assert a.agents[0].llm is not b.agents[0].llm
+    # Only pool_size crews are kept idle
+    assert registry.stats()["idle"]["report"] == 1
+
+def test_failed_crew_is_not_reused():
+    registry = CrewRegistry(stream=False)
+    try:
+        with registry.checkout("gap"):
+            raise RuntimeError("LLM failure")
+    except RuntimeError:
+        pass
+    assert registry.stats()["idle"]["gap"] == 0
+
+def test_templated_task_is_interpolated_per_kickoff():
+    registry = CrewRegistry(stream=False)
+    with registry.checkout("discover") as crew:
+        crew._interpolate_inputs({"refined_topic": "Topic A", "candidates": "Paper A"})
+        assert "Topic A" in crew.tasks[0].description
+    with registry.checkout("discover") as crew:
+        crew._interpolate_inputs({"refined_topic": "Topic B", "candidates": "Paper B"})
+        description = crew.tasks[0].description
+        assert "Topic B" in description and "Topic A" not in description
+    # Without candidates the agent is asked to search instead of getting an empty list
+    with registry.checkout("discover_search") as crew:
+        crew._interpolate_inputs({"refined_topic": "Topic C"})
+        assert "Topic C" in crew.tasks[0].description and "candidate" not in crew.tasks[0].description
+
+def test_warm_builds_every_stage():
+    registry = CrewRegistry(stream=False)
+    registry.warm()
+    assert registry.stats()["created"] == len(STAGES)
+    assert all(count == 1 for count in registry.stats()["idle"].values())
+
+if __name__ == "__main__":
+    test_checkout_reuses_idle_crew()
+    test_concurrent_checkouts_get_separate_crews()
+    test_failed_crew_is_not_reused()
+    test_templated_task_is_interpolated_per_kickoff()
+    test_warm_builds_every_stage()
+    print("Crew registry tests passed.")
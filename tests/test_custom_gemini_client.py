@@ -0,0 +1,90 @@
+import asyncio
+import json
+import httpx
+from autogen_core.models import SystemMessage, UserMessage
+from tools.custom_gemini_client import CustomGeminiClient, get_shared_http_client, close_shared_http_client
+
+def _gemini_response(text="Hello there"):
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": 7, "candidatesTokenCount": 3},
+    }
+
+def test_create_uses_async_transport_and_retries():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0"})
+        return httpx.Response(200, json=_gemini_response())
+
+    async def run():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = CustomGeminiClient(api_key="test-key", model="gemini-2.5-flash", http_client=http_client)
+        result = await client.create([SystemMessage(content="Be brief."), UserMessage(content="Hi", source="user")])
+        await client.close()
+        # Injected clients are not owned, so close() must leave them open
+        assert not http_client.is_closed
+        await http_client.aclose()
+        return result
+
+    result = asyncio.run(run())
+    assert result.content == "Hello there"
+    assert result.usage.prompt_tokens == 7
+    assert len(calls) == 2
+    assert calls[-1].url.path.endswith("/models/gemini-2.5-flash:generateContent")
+    assert calls[-1].headers["x-goog-api-key"] == "test-key"
+
+def test_clients_share_one_pool_per_loop():
+    async def run():
+        a = CustomGeminiClient(api_key="k")
+        b = CustomGeminiClient(api_key="k")
+        assert a._get_http_client() is b._get_http_client() is get_shared_http_client()
+
+        dedicated = CustomGeminiClient(api_key="k", pool_limits=httpx.Limits(max_connections=2))
+        own_pool = dedicated._get_http_client()
+        assert own_pool is not get_shared_http_client()
+        await dedicated.close()
+        assert own_pool.is_closed
+
+        await close_shared_http_client()
+
+    asyncio.run(run())
+
+def test_create_stream_yields_incremental_deltas():
+    chunks = [
+        {"candidates": [{"content": {"parts": [{"text": "Multi-agent "}]}}]},
+        {"candidates": [{"content": {"parts": [{"text": "systems"}]}}]},
+        {"candidates": [{"content": {"parts": [{"functionCall": {"name": "search_arxiv", "args": {"query": "marl"}}}]}, "finishReason": "STOP"}],
+         "usageMetadata": {"promptTokenCount": 11, "candidatesTokenCount": 4}},
+    ]
+    body = "".join(f"data: {json.dumps(c)}\r\n\r\n" for c in chunks)
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    async def run():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client = CustomGeminiClient(api_key="k", model="gemini-2.5-flash", http_client=http_client)
+        items = [item async for item in client.create_stream([UserMessage(content="Hi", source="user")])]
+        await http_client.aclose()
+        return items
+
+    items = asyncio.run(run())
+    assert items[:2] == ["Multi-agent ", "systems"]
+    result = items[-1]
+    assert result.finish_reason == "function_calls"
+    assert result.content[0].name == "search_arxiv"
+    assert json.loads(result.content[0].arguments) == {"query": "marl"}
+    assert (result.usage.prompt_tokens, result.usage.completion_tokens) == (11, 4)
+    assert seen[0].url.path.endswith(":streamGenerateContent")
+    assert seen[0].url.params["alt"] == "sse"
+
+if __name__ == "__main__":
+    test_create_uses_async_transport_and_retries()
+    test_clients_share_one_pool_per_loop()
+    test_create_stream_yields_incremental_deltas()
+    print("CustomGeminiClient tests passed.")
@@ -0,0 +1,249 @@
+import os
+import time
+import asyncio
+import tempfile
+
+# graph.nodes builds the CrewAI LLM at import time; no request is made in these tests
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph, END
+import graph.nodes as nodes
+import graph.discovery as discovery
+import tools.arxiv_search as arxiv_search
+from server.events import graph_events
+from tools.disk_cache import DiskCache
+from tools.rate_limit import RateLimiter
+from graph.discovery import SpeculativeDiscovery, extract_subqueries, discover_papers, selected_papers
+
+REFINED = """Refinement_Agent: **Subtopics:**
+1. **Cooperative perception:** sharing sensor data between vehicles
+2. Multi-agent reinforcement learning for traffic
+- Communication protocols for V2X
+
+**FINAL REFINED TOPIC:** Multi-agent reinforcement learning for cooperative autonomous driving.
+"""
+
+def _paper(pid, version="v1"):
+    return {"title": f"Paper {pid}", "summary": "S", "url": f"http://arxiv.org/abs/{pid}{version}",
+            "published": "2024-01-01", "authors": [], "categories": []}
+
+def test_subqueries_start_with_final_topic():
+    assert extract_subqueries(REFINED) == [
+        "Multi-agent reinforcement learning for cooperative autonomous driving",
+        "Cooperative perception",
+        "Multi-agent reinforcement learning for traffic",
+        "Communication protocols for V2X",
+    ]
+    assert len(extract_subqueries(REFINED, max_queries=2)) == 2
+
+def test_fan_out_runs_concurrently_and_deduplicates():
+    def fake_fetch(query, max_results, sort_by_relevance):
+        time.sleep(0.2)
+        # Every query shares paper 0001 (in different versions) and has one unique paper
+        return [_paper("2401.00001", version=f"v{len(query) % 3 + 1}"), _paper(f"2401.1{len(query):04d}")]
+
+    original = (arxiv_search._fetch, arxiv_search._cache, arxiv_search._rate_limiter)
+    with tempfile.TemporaryDirectory() as tmp:
+        arxiv_search._fetch = fake_fetch
+        arxiv_search._cache = DiskCache(os.path.join(tmp, "arxiv.sqlite"), namespace="arxiv")
+        arxiv_search._rate_limiter = RateLimiter(rate=100, burst=10)
+        try:
+            start = time.perf_counter()
+            papers = asyncio.run(discover_papers(REFINED))
+            elapsed = time.perf_counter() - start
+        finally:
+            arxiv_search._cache.close()
+            arxiv_search._fetch, arxiv_search._cache, arxiv_search._rate_limiter = original
+
+    # Four 200 ms queries finish in roughly one query's latency
+    assert elapsed < 0.6
+    ids = [p["id"] for p in papers]
+    assert len(ids) == len(set(ids)) == 5
+    assert ids[0] == "2401.00001"
+    assert len(papers[0]["queries"]) == 4
+
+def _with_fake_arxiv(fetch, run, limiter=None):
+    original = (arxiv_search._fetch, arxiv_search._cache, arxiv_search._rate_limiter)
+    with tempfile.TemporaryDirectory() as tmp:
+        arxiv_search._fetch = fetch
+        arxiv_search._cache = DiskCache(os.path.join(tmp, "arxiv.sqlite"), namespace="arxiv")
+        arxiv_search._rate_limiter = limiter or RateLimiter(rate=100, burst=10)
+        try:
+            return asyncio.run(run())
+        finally:
+            arxiv_search._cache.close()
+            arxiv_search._fetch, arxiv_search._cache, arxiv_search._rate_limiter = original
+
+def test_speculative_searches_overlap_refinement():
+    fetched = []
+
+    def fake_fetch(query, max_results, sort_by_relevance):
+        fetched.append(query)
+        # The raw topic is still in flight when discovery starts
+        time.sleep(1.0 if query == "multi-agent systems for driving" else 0.2)
+        return [_paper(f"2401.1{len(query):04d}")]
+
+    async def fake_stage(stage, agent_name, inputs, source=None, tap=None):
+        if stage == "discover":
+            return "papers"
+        # The refiner streams its answer in small deltas over ~0.5 s
+        text = REFINED.split(": ", 1)[1]
+        for i in range(0, len(text), 20):
+            tap(text[i:i + 20])
+            await asyncio.sleep(0.5 * 20 / len(text))
+        return text
+
+    async def pipeline():
+        config = {"configurable": {"thread_id": "speculative-session"}}
+        state = {"messages": [HumanMessage(content="multi-agent systems for driving")]}
+        refined = await nodes.topic_refiner_node(state, config)
+        raw_search = discovery._speculations["speculative-session"].searches["multi-agent systems for driving"]
+        # Supervisor round trip before Paper_Discoverer runs
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        discovered = await nodes.paper_discoverer_node({"messages": refined["messages"]}, config)
+        return discovered, time.perf_counter() - start, raw_search
+
+    original = nodes._run_stage, discovery.ARXIV_MIN_INTERVAL
+    # The raw topic is only searched when arXiv requests are not paced
+    nodes._run_stage, discovery.ARXIV_MIN_INTERVAL = fake_stage, 0
+    try:
+        discovered, elapsed, raw_search = _with_fake_arxiv(fake_fetch, pipeline)
+    finally:
+        nodes._run_stage, discovery.ARXIV_MIN_INTERVAL = original
+
+    # Every refined query was searched exactly once, during refinement
+    assert sorted(fetched[1:]) == sorted(extract_subqueries(REFINED))
+    assert elapsed < 0.1
+    assert len(discovered["papers"]) == 4
+    # The raw topic matched no refined query and was cancelled
+    assert raw_search.cancelled()
+    assert "speculative-session" not in discovery._speculations
+
+def test_speculation_matching_and_cancellation():
+    def fake_fetch(query, max_results, sort_by_relevance):
+        time.sleep(0.3)
+        return [_paper("2401.00001")]
+
+    async def run():
+        speculation = SpeculativeDiscovery()
+        speculation.start("Communication protocols for V2X networks")
+        speculation.start("protein folding")
+        # Same terms up to case and plurals, and an overlap of 3 in 4 terms
+        assert speculation.take("communication protocol for v2x network") is not None
+        speculation.start("Communication protocols for V2X networks")
+        assert speculation.take("Communication protocols for V2X") is not None
+        assert speculation.take("graph neural networks") is None
+        task = speculation.searches["protein folding"]
+        assert speculation.cancel() == 1 and speculation.searches == {}
+        await asyncio.sleep(0)
+        return task.cancelled()
+
+    assert _with_fake_arxiv(fake_fetch, run)
+
+def test_cancelled_speculative_searches_give_back_their_rate_limit_slots():
+    def fake_fetch(query, max_results, sort_by_relevance):
+        time.sleep(0.05)
+        return [_paper("2401.00001")]
+
+    async def run():
+        speculation = SpeculativeDiscovery()
+        for query in ("protein folding", "graph neural networks", "quantum error correction", "solar cells"):
+            speculation.start(query)
+        # The first search holds the only slot, the other three are queued on the limiter
+        await asyncio.sleep(0.01)
+        speculation.cancel()
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        await arxiv_search._rate_limiter.acquire_async()
+        return time.perf_counter() - start
+
+    # One interval (0.1 s) at most, not one per cancelled search
+    assert _with_fake_arxiv(fake_fetch, run, RateLimiter(rate=10, burst=1)) <= 0.12
+
+def test_speculation_ends_with_the_run():
+    async def refiner(state):
+        speculation = discovery.begin_speculation("abandoned-session", "multi-agent systems for driving")
+        # Paced arXiv API: the raw topic does not take a request slot from the refined queries
+        assert speculation.searches == {}
+        speculation.feed("1. Cooperative perception\n")
+        raise RuntimeError("refinement failed")
+
+    workflow = StateGraph(dict)
+    workflow.add_node("Topic_Refiner", refiner)
+    workflow.set_entry_point("Topic_Refiner")
+    workflow.add_edge("Topic_Refiner", END)
+    graph = workflow.compile()
+
+    async def run():
+        config = {"configurable": {"thread_id": "abandoned-session"}}
+        events = [event async for event in graph_events(graph, {}, config, stream_tokens=False)]
+        return events, "abandoned-session" in discovery._speculations
+
+    def fake_fetch(query, max_results, sort_by_relevance):
+        time.sleep(0.3)
+        return [_paper("2401.00001")]
+
+    original = discovery.ARXIV_BACKEND, discovery.ARXIV_MIN_INTERVAL
+    discovery.ARXIV_BACKEND, discovery.ARXIV_MIN_INTERVAL = "api", 3.0
+    try:
+        events, leaked = _with_fake_arxiv(fake_fetch, run)
+    finally:
+        discovery.ARXIV_BACKEND, discovery.ARXIV_MIN_INTERVAL = original
+    assert events[-1]["type"] == "error"
+    assert not leaked
+
+def test_discoverer_searches_itself_without_candidates():
+    stages = []
+
+    async def fake_stage(stage, agent_name, inputs, source=None, tap=None):
+        stages.append((stage, inputs))
+        return "papers"
+
+    async def no_papers(refined_text, speculation=None):
+        return []
+
+    original = nodes._run_stage, nodes.discover_papers
+    nodes._run_stage, nodes.discover_papers = fake_stage, no_papers
+    try:
+        asyncio.run(nodes.paper_discoverer_node({"messages": [HumanMessage(content=REFINED)]}))
+    finally:
+        nodes._run_stage, nodes.discover_papers = original
+    assert stages == [("discover_search", {"refined_topic": REFINED})]
+
+def test_synthesis_uses_the_papers_the_agent_selected():
+    papers = [
+        {"id": f"2401.0000{i}", "title": f"Paper {i}", "url": f"http://arxiv.org/abs/2401.0000{i}v1", "summary": "Traffic agents."}
+        for i in range(1, 5)
+    ]
+    answer = AIMessage(content="Discovery_Agent: 1. Paper 3 (http://arxiv.org/abs/2401.00003v1)\n2. **paper 1**: cooperative driving")
+    messages = [HumanMessage(content="topic"), answer]
+    assert [p["id"] for p in selected_papers(messages, papers)] == ["2401.00001", "2401.00003"]
+    # An answer naming none of the candidates keeps all of them
+    assert selected_papers([HumanMessage(content="topic")], papers) == papers
+
+    received = {}
+
+    async def fake_stage(stage, agent_name, inputs, source=None, tap=None):
+        received.update(inputs)
+        return "insights"
+
+    original = nodes._run_stage
+    nodes._run_stage = fake_stage
+    try:
+        asyncio.run(nodes.insight_synthesizer_node({"messages": messages, "papers": papers}))
+    finally:
+        nodes._run_stage = original
+    assert "2401.00003" in received["papers"] and "2401.00002" not in received["papers"]
+
+if __name__ == "__main__":
+    test_subqueries_start_with_final_topic()
+    test_fan_out_runs_concurrently_and_deduplicates()
+    test_speculative_searches_overlap_refinement()
+    test_speculation_matching_and_cancellation()
+    test_cancelled_speculative_searches_give_back_their_rate_limit_slots()
+    test_speculation_ends_with_the_run()
+    test_discoverer_searches_itself_without_candidates()
+    test_synthesis_uses_the_papers_the_agent_selected()
+    print("Discovery tests passed.")
@@ -0,0 +1,68 @@
+import json
+from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+from graph.handoff import key_points, outline, stage_input, synthesis_input
+from tools.custom_gemini_client import CustomGeminiClient
+
+INSIGHTS = """Insight_Agent: ### Cooperative driving with MARL
+- **Joint policies** reduce collisions in highway merging.
+- Communication between agents is learned end to end.
+
+### A survey of traffic simulation
+Simulators differ in fidelity. Most support reinforcement learning agents. Few model V2X links.
+"""
+
+REPORT = "# Report\n\n## Executive Summary\n" + "The field is growing quickly. " * 40 + "\n\n## Key Findings\n" + \
+    "".join(f"{i}. Finding number {i} with some supporting detail.\n" for i in range(1, 20))
+
+PAPERS = [{"id": "2401.00002", "title": "Cooperative driving with MARL", "url": "http://arxiv.org/abs/2401.00002v1"}]
+
+def test_key_points_prefer_list_items_and_cut_long_text():
+    assert key_points("Intro sentence.\n- **First** point\n2. Second point") == ["First point", "Second point"]
+    assert key_points("One. Two! Three?", max_points=2) == ["One.", "Two!"]
+    long_point = key_points("word " * 100, max_chars=30)[0]
+    assert len(long_point) <= 31 and long_point.endswith("…")
+
+def test_outline_keeps_sections_and_paper_ids():
+    sections = outline(INSIGHTS.split(": ", 1)[1], PAPERS)["sections"]
+    assert sections[0] == {
+        "id": "2401.00002",
+        "heading": "Cooperative driving with MARL",
+        "points": ["Joint policies reduce collisions in highway merging.", "Communication between agents is learned end to end."],
+    }
+    assert sections[1]["heading"] == "A survey of traffic simulation" and len(sections[1]["points"]) == 3
+
+def test_json_handoff_is_smaller_than_full_text():
+    text = stage_input("Report_Agent: " + REPORT, fmt="text")
+    compact = stage_input("Report_Agent: " + REPORT, fmt="json")
+    assert text == REPORT
+    assert len(compact) < len(text) / 2
+    sections = json.loads(compact)["sections"]
+    assert [s["heading"] for s in sections] == ["Executive Summary", "Key Findings"]
+    assert len(sections[1]["points"]) == 6
+
+    records = [{"id": "1", "title": "T", "url": "u", "excerpts": ["a", "b"]}]
+    assert json.loads(synthesis_input(records, fmt="json")) == {"papers": [{"id": "1", "title": "T", "excerpts": ["a", "b"]}]}
+    assert synthesis_input(records, fmt="text") == "Title: T\nURL: u\nRelevant excerpts:\n- a\n- b\n---\n"
+    assert json.loads(synthesis_input(records, fmt="json", topic="x"))["topic"] == "x"
+    assert synthesis_input(records, fmt="text", topic="x").startswith("Topic: x\n---\nTitle: T")
+
+def test_client_payload_without_name_prefix_and_with_merged_parts():
+    messages = [
+        SystemMessage(content="Be brief."),
+        UserMessage(content="Topic?", source="user"),
+        UserMessage(content="Also this.", source="user"),
+        AssistantMessage(content="Refined topic.", source="Topic_Refinement_Agent"),
+    ]
+    contents = CustomGeminiClient(api_key="k")._build_payload(messages)["contents"]
+    assert contents[0] == {"role": "user", "parts": [{"text": "System Instruction:\nBe brief.\n\n\nTopic?\n\nAlso this."}]}
+    assert contents[1] == {"role": "model", "parts": [{"text": "Refined topic."}]}
+
+    prefixed = CustomGeminiClient(api_key="k", name_prefix=True)._build_payload(messages)["contents"]
+    assert prefixed[1]["parts"][0]["text"] == "[Topic_Refinement_Agent]: Refined topic."
+
+if __name__ == "__main__":
+    test_key_points_prefer_list_items_and_cut_long_text()
+    test_outline_keeps_sections_and_paper_ids()
+    test_json_handoff_is_smaller_than_full_text()
+    test_client_payload_without_name_prefix_and_with_merged_parts()
+    print("Handoff tests passed.")
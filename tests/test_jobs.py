@@ -0,0 +1,92 @@
+import asyncio
+from server.jobs import JobManager
+
+def _runner(in_flight, latency=0.1):
+    async def run(job):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            yield {"type": "status", "agent": "Supervisor", "status": "planning"}
+            yield {"type": "delta", "agent": "Topic_Refiner", "content": "tok"}
+            await asyncio.sleep(latency)
+            if job.spec == "bad":
+                yield {"type": "error", "content": "boom"}
+                return
+            yield {"type": "message", "agent": "Gap_Analyst", "content": f"Gap_Agent: {job.spec}"}
+            yield {"type": "status", "agent": "System", "status": "finished"}
+        finally:
+            in_flight["now"] -= 1
+    return run
+
+def test_pool_size_caps_concurrency_and_queue_rejects_overflow():
+    async def run():
+        in_flight = {"now": 0, "max": 0}
+        manager = JobManager(_runner(in_flight), workers=2, max_queue=4)
+        await manager.start()
+        jobs = [manager.submit(f"topic {i}") for i in range(4)]
+        try:
+            manager.submit("one too many")
+            rejected = False
+        except asyncio.QueueFull:
+            rejected = True
+        await asyncio.sleep(0.02)
+        assert manager.stats()["running"] == 2
+        assert manager.position(jobs[3]) == 1
+        await asyncio.sleep(0.35)
+        await manager.stop()
+        return rejected, in_flight["max"], [job.status for job in jobs], manager.stats()
+
+    rejected, max_in_flight, statuses, stats = asyncio.run(run())
+    assert rejected
+    assert max_in_flight == 2
+    assert statuses == ["completed"] * 4
+    assert stats["completed"] == 4
+
+def test_late_subscriber_gets_whole_run_and_failures_are_recorded():
+    async def run():
+        manager = JobManager(_runner({"now": 0, "max": 0}), workers=1, max_queue=4)
+        await manager.start()
+        good = manager.submit("good")
+        bad = manager.submit("bad")
+        await asyncio.sleep(0.05)
+        # Attach mid-run: past events are replayed, then live ones follow until the end
+        live = [event async for event in good.events()]
+        await asyncio.sleep(0.2)
+        replayed = [event async for event in good.events()]
+        await manager.stop()
+        return good, bad, live, replayed
+
+    good, bad, live, replayed = asyncio.run(run())
+    assert good.status == "completed"
+    assert live[-1] == {"type": "status", "agent": "System", "status": "finished"}
+    # Deltas are forwarded live only; the final message supersedes them
+    assert all(event["type"] != "delta" for event in replayed)
+    assert good.to_dict()["messages"] == [{"type": "message", "agent": "Gap_Analyst", "content": "Gap_Agent: good"}]
+    assert bad.status == "failed" and bad.error == "boom"
+
+def test_cancel_queued_and_running_jobs():
+    async def run():
+        in_flight = {"now": 0, "max": 0}
+        manager = JobManager(_runner(in_flight, latency=5), workers=1, max_queue=4)
+        await manager.start()
+        running = manager.submit("slow")
+        queued = manager.submit("waiting")
+        await asyncio.sleep(0.05)
+        assert manager.cancel(queued.id)
+        assert manager.cancel(running.id)
+        await asyncio.sleep(0.05)
+        cancelled_again = manager.cancel(running.id)
+        await manager.stop()
+        return running, queued, in_flight["now"], cancelled_again
+
+    running, queued, in_flight_now, cancelled_again = asyncio.run(run())
+    assert running.status == "cancelled" and queued.status == "cancelled"
+    assert queued.started_at is None
+    assert in_flight_now == 0
+    assert not cancelled_again
+
+if __name__ == "__main__":
+    test_pool_size_caps_concurrency_and_queue_rejects_overflow()
+    test_late_subscriber_gets_whole_run_and_failures_are_recorded()
+    test_cancel_queued_and_running_jobs()
+    print("Job queue tests passed.")
@@ -0,0 +1,66 @@
+import os
+import asyncio
+import tempfile
+import httpx
+from autogen_core.models import UserMessage
+from tools.custom_gemini_client import CustomGeminiClient
+from tools.llm_cache import ResponseCache
+
+def _client(cache, calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={
+            "candidates": [{"content": {"parts": [{"text": "cached answer"}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 2},
+        })
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return CustomGeminiClient(api_key="k", model="gemini-2.5-flash", http_client=http_client, response_cache=cache)
+
+def test_identical_payload_is_served_from_cache():
+    calls = []
+    cache = ResponseCache(max_memory_entries=8)
+    client = _client(cache, calls)
+    messages = [UserMessage(content="Summarise MARL", source="user")]
+
+    async def run():
+        first = await client.create(messages)
+        second = await client.create(messages)
+        streamed = [item async for item in client.create_stream(messages)]
+        other = await client.create([UserMessage(content="Something else", source="user")])
+        return first, second, streamed, other
+
+    first, second, streamed, other = asyncio.run(run())
+    assert len(calls) == 2
+    assert not first.cached and first.usage.prompt_tokens == 10
+    assert second.cached and second.content == "cached answer"
+    assert (second.usage.prompt_tokens, second.usage.completion_tokens) == (0, 0)
+    assert streamed[0] == "cached answer" and streamed[-1].cached
+    assert not other.cached
+    assert cache.stats()["memory_hits"] == 2
+
+def test_key_ignores_dict_ordering_and_tracks_generation_config():
+    a = {"contents": [{"role": "user", "parts": [{"text": "x"}]}], "generationConfig": {"temperature": 0.7, "maxOutputTokens": 10}}
+    b = {"generationConfig": {"maxOutputTokens": 10, "temperature": 0.7}, "contents": [{"parts": [{"text": "x"}], "role": "user"}]}
+    c = {"contents": a["contents"], "generationConfig": {"temperature": 0.2, "maxOutputTokens": 10}}
+    assert ResponseCache.make_key("m", a) == ResponseCache.make_key("m", b)
+    assert ResponseCache.make_key("m", a) != ResponseCache.make_key("m", c)
+    assert ResponseCache.make_key("m", a) != ResponseCache.make_key("other", a)
+
+def test_persistent_tier_survives_new_cache_instance():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm.sqlite")
+        first = ResponseCache(path=path)
+        first.set("k", {"content": "v", "finish_reason": "stop"})
+        first.close()
+
+        second = ResponseCache(path=path)
+        assert second.get("k") == {"content": "v", "finish_reason": "stop"}
+        assert second.get("k") is not None
+        assert second.stats()["disk_hits"] == 1 and second.stats()["memory_hits"] == 1
+        second.close()
+
+if __name__ == "__main__":
+    test_identical_payload_is_served_from_cache()
+    test_key_ignores_dict_ordering_and_tracks_generation_config()
+    test_persistent_tier_survives_new_cache_instance()
+    print("LLM cache tests passed.")
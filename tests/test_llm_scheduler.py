@@ -0,0 +1,139 @@
+import time
+import asyncio
+from types import SimpleNamespace
+from tools.cancellation import CancellationToken, run_cancellation
+from tools.llm_scheduler import LLMScheduler, schedule_crewai_llm, llm_session, INTERACTIVE, BATCH
+
+def _grant_order(scheduler, requests):
+    # Requests queue up during a pause, then are granted one at a time
+    async def run():
+        order = []
+        scheduler.throttle(0.1)
+
+        async def one(label, priority, session):
+            await scheduler.acquire_async(10, priority=priority, session=session)
+            order.append(label)
+
+        tasks = []
+        for label, priority, session in requests:
+            tasks.append(asyncio.create_task(one(label, priority, session)))
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*tasks)
+        return order
+    return asyncio.run(run())
+
+def test_request_rate_is_enforced():
+    scheduler = LLMScheduler(rpm=600, tpm=0, burst=1)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(scheduler.acquire_async(10) for _ in range(6)))
+        return time.perf_counter() - start
+
+    # 10 requests/s with no burst: 6 requests need ~0.5s
+    assert 0.4 < asyncio.run(run()) < 1.5
+    assert scheduler.stats()["priorities"][INTERACTIVE]["granted"] == 6
+
+def test_interactive_requests_go_before_batch():
+    scheduler = LLMScheduler(rpm=1200, tpm=0, burst=1)
+    order = _grant_order(scheduler, [("b1", BATCH, "job"), ("b2", BATCH, "job"), ("i1", INTERACTIVE, "user")])
+    assert order == ["i1", "b1", "b2"]
+    stats = scheduler.stats()["priorities"]
+    assert stats[BATCH]["wait_max_ms"] > stats[INTERACTIVE]["wait_max_ms"]
+
+def test_sessions_are_served_round_robin():
+    scheduler = LLMScheduler(rpm=1200, tpm=0, burst=1)
+    requests = [(f"a{i}", BATCH, "a") for i in range(3)] + [("b0", BATCH, "b"), ("c0", BATCH, "c")]
+    assert _grant_order(scheduler, requests) == ["a0", "b0", "c0", "a1", "a2"]
+
+def test_token_budget_and_settlement():
+    # 600 tokens/minute = 10 tokens/s
+    scheduler = LLMScheduler(rpm=6000, tpm=600, burst=10)
+
+    start = time.perf_counter()
+    grant = scheduler.acquire(600)
+    # Nothing was used (e.g. a failed request): the reservation is refunded
+    grant.settle(0)
+    scheduler.acquire(600).settle(600)
+    assert time.perf_counter() - start < 0.2
+    # Budget exhausted: 5 more tokens take ~0.5s to refill
+    scheduler.acquire(5)
+    assert 0.3 < time.perf_counter() - start < 1.5
+
+def test_cancelled_waiter_does_not_consume_budget():
+    scheduler = LLMScheduler(rpm=60, tpm=0, burst=1)
+
+    async def run():
+        await scheduler.acquire_async(10)
+        waiting = asyncio.create_task(scheduler.acquire_async(10))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["priorities"][INTERACTIVE]["granted"] == 1
+    assert stats["priorities"][INTERACTIVE]["queued"] == 0
+
+def test_granted_calls_leave_no_callbacks_on_the_run_token():
+    scheduler = LLMScheduler(rpm=6000, tpm=0, burst=10)
+    token = CancellationToken()
+    reset = run_cancellation.set(token)
+    try:
+        for _ in range(5):
+            scheduler.acquire(10).settle(10)
+    finally:
+        run_cancellation.reset(reset)
+    assert token._callbacks == []
+
+def test_crewai_llm_calls_are_scheduled_from_threads():
+    scheduler = LLMScheduler(rpm=600, tpm=0, burst=1)
+    sessions = []
+
+    class FakeLLM:
+        def __init__(self):
+            self.total = 0
+        def call(self, messages, **kwargs):
+            self.total += 50
+            return "ok"
+        def get_token_usage_summary(self):
+            return SimpleNamespace(prompt_tokens=self.total, completion_tokens=0)
+
+    llm = schedule_crewai_llm(FakeLLM(), scheduler)
+    original_acquire = scheduler.acquire
+
+    def recording_acquire(tokens, priority=None, session=None):
+        sessions.append(llm_session.get())
+        return original_acquire(tokens, priority, session)
+    scheduler.acquire = recording_acquire
+
+    async def run():
+        llm_session.set("s1")
+        # asyncio.to_thread copies the context, like CrewAI kickoffs in graph/nodes.py
+        return await asyncio.gather(*(asyncio.to_thread(llm.call, "prompt") for _ in range(3)))
+
+    start = time.perf_counter()
+    assert asyncio.run(run()) == ["ok", "ok", "ok"]
+    assert time.perf_counter() - start > 0.15
+    assert sessions == ["s1", "s1", "s1"]
+
+def test_disabled_scheduler_never_waits():
+    scheduler = LLMScheduler(rpm=0)
+    start = time.perf_counter()
+    for _ in range(100):
+        scheduler.acquire(10_000).settle(10_000)
+    assert time.perf_counter() - start < 0.1
+
+if __name__ == "__main__":
+    test_request_rate_is_enforced()
+    test_interactive_requests_go_before_batch()
+    test_sessions_are_served_round_robin()
+    test_token_budget_and_settlement()
+    test_cancelled_waiter_does_not_consume_budget()
+    test_granted_calls_leave_no_callbacks_on_the_run_token()
+    test_crewai_llm_calls_are_scheduled_from_threads()
+    test_disabled_scheduler_never_waits()
+    print("LLM scheduler tests passed.")
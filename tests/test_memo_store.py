@@ -0,0 +1,166 @@
+import os
+import asyncio
+import time
+
+# graph.nodes builds the CrewAI LLM at import time; no request is made in these tests
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from langchain_core.messages import HumanMessage, AIMessage
+import graph.nodes as nodes
+import graph.workflow as workflow_module
+import tools.memo_store as memo_store_module
+from graph.checkpoint import session_config
+from graph.memo import MEMO_STAGES, record_run, seed_from_memo
+from server.events import graph_events
+from tools.memo_store import MemoStore, normalize_topic, topic_terms
+
+PREFIXES = [prefix for _, prefix in MEMO_STAGES]
+PAPERS = [{"id": "2401.00001", "title": "Paper", "url": "http://arxiv.org/abs/2401.00001"}]
+
+def _finished_run(topic):
+    return [HumanMessage(content=topic)] + [AIMessage(content=f"{prefix} output for {topic}") for prefix in PREFIXES]
+
+def test_topics_are_normalised_and_deduplicated():
+    assert topic_terms("Multi-Agent Systems for Driving Policies") == ["multi", "agent", "system", "driving", "policy"]
+    assert normalize_topic("Autonomous driving with multi-agent systems") == normalize_topic("multi agent system for autonomous driving")
+
+    store = MemoStore(":memory:")
+    store.put("Multi-Agent Systems for Autonomous Driving", {"v": 1})
+    store.put("multi-agent system, autonomous driving", {"v": 2})
+    assert len(store) == 1
+    assert store.lookup("multi agent systems for autonomous driving")["artifacts"] == {"v": 2}
+
+def test_lookup_by_similarity():
+    store = MemoStore(":memory:")
+    store.put("Multi-Agent Systems for Autonomous Driving", {"v": 1})
+    store.put("Graph neural networks for drug discovery", {"v": 2})
+
+    exact = store.lookup('I want to research "multi-agent systems for autonomous driving"')
+    assert exact["similarity"] == 1.0
+    similar = store.lookup("multi agent reinforcement learning for autonomous driving", min_similarity=0.5)
+    assert similar["artifacts"] == {"v": 1} and 0.5 <= similar["similarity"] < 1.0
+    assert store.lookup("protein folding", min_similarity=0.1) is None
+    assert store.stats() == {"hits": 2, "misses": 1, "entries": 2}
+
+def test_expired_and_evicted_memos_are_ignored():
+    store = MemoStore(":memory:", ttl=0.05, max_entries=2)
+    store.put("topic one", {})
+    time.sleep(0.1)
+    assert store.lookup("topic one") is None
+
+    store = MemoStore(":memory:", max_entries=2)
+    for topic in ("alpha beta", "gamma delta", "epsilon zeta"):
+        store.put(topic, {})
+    assert len(store) == 2 and store.lookup("alpha beta") is None
+
+def test_record_and_seed_modes():
+    store = MemoStore(":memory:")
+    # Incomplete runs are not stored
+    assert record_run("topic", _finished_run("topic")[:3], store=store) is None
+    assert record_run("Multi-Agent Systems for Autonomous Driving", _finished_run("mas"), PAPERS, store=store)
+
+    reuse = seed_from_memo("multi-agent systems for autonomous driving", store=store)
+    assert reuse["memo"]["mode"] == "reuse"
+    assert [m.content.split(" ")[0] for m in reuse["messages"]] == PREFIXES
+    assert reuse["papers"] == PAPERS
+
+    seed = seed_from_memo("cooperative multi-agent systems for autonomous driving", store=store)
+    assert seed["memo"]["mode"] == "seed"
+    # Only the papers are reused; every stage runs again for the new topic
+    assert seed["messages"] == [] and seed["papers"] == PAPERS
+
+    assert seed_from_memo("protein folding", store=store) is None
+
+def test_graph_answers_repeated_topic_from_memo():
+    calls = []
+    names = ["paper_discoverer_node", "insight_synthesizer_node", "report_compiler_node", "gap_analyst_node"]
+
+    def fake(name):
+        async def node(state):
+            calls.append(name)
+            return {"messages": [AIMessage(content="unused")]}
+        return node
+
+    originals = {name: getattr(workflow_module, name) for name in names}
+    previous_store = memo_store_module._store
+    memo_store_module._store = MemoStore(":memory:")
+    memo_store_module._store.put("Multi-Agent Systems for Autonomous Driving", {
+        "refined": "Refinement_Agent: refined", "discovery": "Discovery_Agent: papers", "insights": "Insight_Agent: insights",
+        "report": "Report_Agent: report", "gaps": "Gap_Agent: gaps", "papers": PAPERS,
+    })
+    try:
+        for name in names:
+            setattr(workflow_module, name, fake(name))
+        graph = workflow_module.create_workflow()
+        config = session_config("memo-session", routing_mode="rule")
+        state = {"messages": [HumanMessage(content="multi-agent systems for autonomous driving")]}
+
+        async def run():
+            return [event async for event in graph_events(graph, state, config)]
+
+        events = asyncio.run(run())
+    finally:
+        memo_store_module._store = previous_store
+        for name, original in originals.items():
+            setattr(workflow_module, name, original)
+
+    assert calls == []
+    memo = next(e for e in events if e["type"] == "memo")
+    assert memo["mode"] == "reuse" and memo["similarity"] == 1.0
+    agents = [e["agent"] for e in events if e["type"] == "message" and e["agent"] != "Supervisor"]
+    assert agents == ["Topic_Refiner", "Paper_Discoverer", "Insight_Synthesizer", "Report_Compiler", "Gap_Analyst"]
+    assert events[-1] == {"type": "status", "agent": "System", "status": "finished"}
+
+def test_seeded_run_works_on_the_new_topic():
+    stages = []
+
+    async def fake_stage(stage, agent_name, inputs, source=None, tap=None):
+        stages.append((stage, inputs))
+        if stage == "refine":
+            return f"Final Refined Topic: {inputs['topic']}"
+        return f"{stage} output"
+
+    async def no_search(*args, **kwargs):
+        raise AssertionError("seeded runs reuse the stored papers")
+
+    papers = [{"id": "2401.00002", "title": "Cooperative perception", "url": "http://arxiv.org/abs/2401.00002",
+               "summary": "Cooperative multi-agent perception for autonomous vehicles."}]
+    originals = nodes._run_stage, nodes.discover_papers
+    previous_store = memo_store_module._store
+    memo_store_module._store = MemoStore(":memory:")
+    memo_store_module._store.put("Multi-Agent Systems for Autonomous Driving", {
+        "refined": "Refinement_Agent: Final Refined Topic: multi-agent systems for autonomous driving",
+        "discovery": "Discovery_Agent: papers", "insights": "Insight_Agent: insights",
+        "report": "Report_Agent: report", "gaps": "Gap_Agent: gaps", "papers": papers,
+    })
+    topic = "cooperative multi-agent systems for autonomous driving"
+    try:
+        nodes._run_stage, nodes.discover_papers = fake_stage, no_search
+        graph = workflow_module.create_workflow()
+        config = session_config("seeded-session", routing_mode="rule")
+
+        async def run():
+            return [event async for event in graph_events(graph, {"messages": [HumanMessage(content=topic)]}, config)]
+
+        events = asyncio.run(run())
+    finally:
+        memo_store_module._store = previous_store
+        nodes._run_stage, nodes.discover_papers = originals
+
+    assert next(e for e in events if e["type"] == "memo")["mode"] == "seed"
+    inputs = dict(stages)
+    assert inputs["refine"] == {"topic": topic}
+    assert topic in inputs["discover"]["refined_topic"]
+    # Synthesis works on the new topic, not on the stored run's refinement
+    assert topic in inputs["synthesize"]["papers"]
+    assert "2401.00002" in inputs["synthesize"]["papers"]
+    assert [stage for stage, _ in stages] == ["refine", "discover", "synthesize", "report", "gap"]
+
+if __name__ == "__main__":
+    test_topics_are_normalised_and_deduplicated()
+    test_lookup_by_similarity()
+    test_expired_and_evicted_memos_are_ignored()
+    test_record_and_seed_modes()
+    test_graph_answers_repeated_topic_from_memo()
+    test_seeded_run_works_on_the_new_topic()
+    print("Memo store tests passed.")
@@ -0,0 +1,50 @@
+import asyncio
+import httpx
+from autogen_core.models import UserMessage
+from benchmarks.mock_services import MockSettings, ServerThread, create_mock_app
+from graph.discovery import extract_subqueries
+from tools import arxiv_search
+from tools.custom_gemini_client import CustomGeminiClient
+from tools.llm_scheduler import LLMScheduler
+
+SETTINGS = MockSettings(latency=0.0, tokens_per_second=0, response_tokens=60, arxiv_latency=0.0, arxiv_results=3)
+
+def test_gemini_client_against_mock():
+    async def run(url):
+        client = CustomGeminiClient(api_key="test-key", model="gemini-2.5-flash", http_client=httpx.AsyncClient(), scheduler=LLMScheduler(rpm=0))
+        client.base_url = f"{url}/v1beta"
+        messages = [UserMessage(content="Refine my topic", source="user")]
+        result = await client.create(messages)
+        chunks = [item async for item in client.create_stream(messages)]
+        await client._http_client.aclose()
+        return result, chunks
+
+    with ServerThread(create_mock_app(SETTINGS)) as server:
+        result, chunks = asyncio.run(run(server.url))
+        stats = httpx.get(f"{server.url}/stats").json()
+
+    assert "Final Answer:" in result.content
+    assert result.usage.completion_tokens == 60
+    # Several text deltas, then the final result with the same text
+    assert len(chunks) > 2 and "".join(chunks[:-1]) == chunks[-1].content == result.content
+    assert extract_subqueries(result.content)[0] == "Cooperative perception for multi-agent autonomous driving"
+    assert stats == {"generate": 1, "stream": 1, "arxiv": 0, "pdf": 0, "peak_in_flight": 1}
+
+def test_arxiv_fetch_against_mock():
+    original = arxiv_search.ARXIV_API_URL
+    with ServerThread(create_mock_app(SETTINGS)) as server:
+        arxiv_search.ARXIV_API_URL = f"{server.url}/api/query"
+        try:
+            results = arxiv_search._fetch("multi agent driving", max_results=5, sort_by_relevance=True)
+        finally:
+            arxiv_search.ARXIV_API_URL = original
+
+    assert len(results) == 3
+    assert results[0]["title"] == "Mock paper 1 on multi agent driving"
+    assert results[0]["categories"] == ["cs.AI"]
+    assert arxiv_search.arxiv_id(results[0]["url"]).startswith("2401.")
+
+if __name__ == "__main__":
+    test_gemini_client_against_mock()
+    test_arxiv_fetch_against_mock()
+    print("Mock services tests passed.")
@@ -0,0 +1,130 @@
+import os
+import asyncio
+import json
+import tempfile
+import httpx
+import tools.paper_corpus as paper_corpus
+from benchmarks.mock_services import minimal_pdf
+from graph.discovery import with_passages
+from graph.handoff import synthesis_input
+from tools.paper_corpus import PaperCorpus, fetch_pdf, ingest_papers, shutdown_process_pool
+
+SECTIONS = {
+    "2401.00001": ["Cooperative perception lets vehicles share lidar features.", "Bandwidth is reduced by learned compression."],
+    "2401.00002": ["Graph neural networks predict molecular properties.", "Message passing scales to large molecules."],
+}
+
+def _write_pdfs(directory):
+    for pid, lines in SECTIONS.items():
+        with open(os.path.join(directory, f"{pid}.pdf"), "wb") as f:
+            f.write(minimal_pdf(lines * 20))
+
+def test_ingest_from_local_directory_into_mmap_corpus():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "pdfs")
+        os.makedirs(source)
+        _write_pdfs(source)
+        corpus = PaperCorpus(os.path.join(tmp, "corpus"), chunk_words=40)
+        ticks = []
+
+        async def run():
+            async def ticker():
+                # The event loop keeps running while PDFs are parsed in worker processes
+                while True:
+                    ticks.append(1)
+                    await asyncio.sleep(0.001)
+
+            task = asyncio.create_task(ticker())
+            try:
+                return await ingest_papers(["2401.00001", "2401.00002", "2401.09999"], corpus, source_dir=source)
+            finally:
+                task.cancel()
+
+        try:
+            counts = asyncio.run(run())
+        finally:
+            shutdown_process_pool()
+
+        assert counts["2401.00001"] > 1 and counts["2401.00002"] > 1
+        assert counts["2401.09999"] == 0
+        assert len(ticks) > 1
+        chunks = corpus.chunks("2401.00001")
+        assert len(chunks) == counts["2401.00001"] and chunks[0].startswith("Cooperative perception")
+        assert all(len(chunk.split()) <= 40 for chunk in chunks)
+
+        # Stored papers are read back from disk (offset index + mmap) without parsing the PDFs again
+        for name in os.listdir(source):
+            os.remove(os.path.join(source, name))
+        corpus.close()
+        reopened = PaperCorpus(os.path.join(tmp, "corpus"), chunk_words=40)
+        assert asyncio.run(ingest_papers(["2401.00001"], reopened, source_dir=source)) == {"2401.00001": counts["2401.00001"]}
+        assert reopened.chunks("2401.00001") == chunks
+
+        passages = reopened.passages("lidar compression", ["2401.00001", "2401.00002"], k=2)
+        assert [p["id"] for p in passages] == ["2401.00001", "2401.00001"]
+        assert reopened.passages("protein folding", ["2401.00001"], k=2) == []
+
+        papers = [{"id": pid, "title": f"Paper {pid}", "url": f"http://arxiv.org/abs/{pid}v1"} for pid in SECTIONS]
+        records = with_passages([], "message passing molecules", papers, corpus=reopened, k=1)
+        handoff = json.loads(synthesis_input(records, fmt="json"))["papers"]
+        assert handoff[0]["id"] == "2401.00002" and "Message passing" in handoff[0]["passages"][0]
+        reopened.close()
+
+def test_pdf_download_is_streamed_to_disk():
+    body = minimal_pdf(["Streamed paper."])
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(str(request.url))
+        return httpx.Response(200, content=body, headers={"content-type": "application/pdf"})
+
+    async def run(cache_dir):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            path = await fetch_pdf("2401.00003", client, cache_dir=cache_dir)
+            # Cached on disk: no second request
+            assert await fetch_pdf("2401.00003", client, cache_dir=cache_dir) == path
+            original = paper_corpus.PDF_MAX_BYTES
+            paper_corpus.PDF_MAX_BYTES = 10
+            try:
+                await fetch_pdf("2401.00004", client, cache_dir=cache_dir)
+                raise AssertionError("oversized PDF was accepted")
+            except ValueError:
+                pass
+            finally:
+                paper_corpus.PDF_MAX_BYTES = original
+            return path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = asyncio.run(run(tmp))
+        with open(path, "rb") as f:
+            assert f.read() == body
+        assert sorted(os.listdir(tmp)) == ["2401.00003.pdf"]
+    assert requested == ["https://arxiv.org/pdf/2401.00003", "https://arxiv.org/pdf/2401.00004"]
+
+def test_concurrent_downloads_of_one_paper():
+    body = minimal_pdf(["Fetched twice at once."])
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        async def blocks():
+            # Slow, chunked body: both downloads are in flight together
+            for i in range(0, len(body), 64):
+                await asyncio.sleep(0.001)
+                yield body[i:i + 64]
+        return httpx.Response(200, content=blocks())
+
+    async def run(cache_dir):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await asyncio.gather(*(fetch_pdf("2401.00005", client, cache_dir=cache_dir) for _ in range(2)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = asyncio.run(run(tmp))
+        assert paths[0] == paths[1]
+        with open(paths[0], "rb") as f:
+            assert f.read() == body
+        assert os.listdir(tmp) == ["2401.00005.pdf"]
+
+if __name__ == "__main__":
+    test_ingest_from_local_directory_into_mmap_corpus()
+    test_pdf_download_is_streamed_to_disk()
+    test_concurrent_downloads_of_one_paper()
+    print("Paper corpus tests passed.")
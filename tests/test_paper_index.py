@@ -0,0 +1,77 @@
+import os
+import asyncio
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from langchain_core.messages import HumanMessage, AIMessage
+import graph.nodes as nodes
+from graph.discovery import rank_candidates, relevant_excerpts
+from tools.paper_index import PaperIndex, chunk_text
+
+def _paper(pid, title, summary):
+    return {"id": pid, "title": title, "summary": summary, "url": f"http://arxiv.org/abs/{pid}v1"}
+
+PAPERS = [
+    _paper("2401.00001", "Graph neural networks for molecules",
+           "We predict molecular properties with message passing. Results improve on drug discovery benchmarks."),
+    _paper("2401.00002", "Cooperative driving with multi-agent reinforcement learning",
+           "Vehicles learn joint policies with multi-agent reinforcement learning. "
+           "We evaluate on highway merging. Communication between agents reduces collisions."),
+    _paper("2401.00003", "A survey of traffic simulation",
+           "Simulators for autonomous driving are compared. One section covers reinforcement learning agents in traffic."),
+]
+
+def test_chunks_keep_sentences_within_budget():
+    text = "One two three. Four five six. Seven eight nine ten eleven twelve."
+    assert chunk_text(text, max_words=6) == ["One two three. Four five six.", "Seven eight nine ten eleven twelve."]
+    assert chunk_text("", max_words=6) == []
+
+def test_rank_papers_by_bm25_relevance():
+    ranked = rank_candidates("multi-agent reinforcement learning for autonomous driving", PAPERS)
+    assert [p["id"] for p in ranked] == ["2401.00002", "2401.00003", "2401.00001"]
+    assert ranked[0]["relevance"] > ranked[1]["relevance"] > ranked[2]["relevance"] == 0.0
+    # No matching term: arXiv order is kept
+    assert [p["id"] for p in PaperIndex(PAPERS).rank_papers("protein folding")] == ["2401.00001", "2401.00002", "2401.00003"]
+
+def test_top_chunks_and_excerpts():
+    index = PaperIndex(PAPERS, chunk_words=10)
+    assert len(index) > len(PAPERS)
+    top = index.top_chunks("highway merging", k=1)
+    assert top[0]["paper"] == 1 and "highway merging" in top[0]["text"]
+
+    records = relevant_excerpts("multi-agent reinforcement learning driving", PAPERS, k=2)
+    assert records[0]["id"] == "2401.00002" and records[0]["title"].startswith("Cooperative driving")
+    assert sum(len(r["excerpts"]) for r in records) == 2
+    assert "molecular" not in str(records)
+
+def test_synthesizer_gets_top_chunks_instead_of_full_discovery_output():
+    captured = {}
+
+    async def fake_run_stage(stage, agent_name, inputs, source=None):
+        captured.update(inputs)
+        return "insights"
+
+    original = nodes._run_stage
+    nodes._run_stage = fake_run_stage
+    try:
+        state = {
+            "messages": [
+                HumanMessage(content="MARL for driving"),
+                AIMessage(content="Refinement_Agent: FINAL REFINED TOPIC: multi-agent reinforcement learning for cooperative driving"),
+                AIMessage(content="Discovery_Agent: " + "very long list of papers " * 50),
+            ],
+            "papers": PAPERS,
+        }
+        asyncio.run(nodes.insight_synthesizer_node(state))
+    finally:
+        nodes._run_stage = original
+
+    assert "Cooperative driving" in captured["papers"]
+    assert "very long list" not in captured["papers"]
+
+if __name__ == "__main__":
+    test_chunks_keep_sentences_within_budget()
+    test_rank_papers_by_bm25_relevance()
+    test_top_chunks_and_excerpts()
+    test_synthesizer_gets_top_chunks_instead_of_full_discovery_output()
+    print("Paper index tests passed.")
@@ -0,0 +1,75 @@
+import os
+import time
+import asyncio
+
+# graph.nodes builds the CrewAI LLM at import time; no request is made in these tests
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from langchain_core.messages import HumanMessage, AIMessage
+import graph.workflow as workflow_module
+from graph.nodes import insight_reducer_node
+
+PAPERS = [{"id": f"2401.0000{i}", "title": f"Paper {i}", "url": f"http://arxiv.org/abs/2401.0000{i}v1", "summary": "S"} for i in range(4)]
+
+def _fake_worker(prefix, extra=None):
+    async def node(state):
+        update = {"messages": [AIMessage(content=f"{prefix}: done")]}
+        update.update(extra or {})
+        return update
+    return node
+
+def test_insights_fan_out_per_paper_under_concurrency_cap():
+    in_flight = {"now": 0, "max": 0}
+
+    async def fake_paper_insight(state):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.2)
+        in_flight["now"] -= 1
+        paper = state["paper"]
+        return {"paper_insights": [{"id": paper["id"], "title": paper["title"], "insight": f"insight {paper['id']}"}]}
+
+    fakes = {
+        "topic_refiner_node": _fake_worker("Refinement_Agent"),
+        "paper_discoverer_node": _fake_worker("Discovery_Agent", {"papers": PAPERS}),
+        "paper_insight_node": fake_paper_insight,
+        "report_compiler_node": _fake_worker("Report_Agent"),
+        "gap_analyst_node": _fake_worker("Gap_Agent"),
+    }
+    originals = {name: getattr(workflow_module, name) for name in fakes}
+    for name, fake in fakes.items():
+        setattr(workflow_module, name, fake)
+    try:
+        graph = workflow_module.create_workflow(parallel=True)
+    finally:
+        for name, original in originals.items():
+            setattr(workflow_module, name, original)
+
+    config = {"recursion_limit": 50, "max_concurrency": 2, "configurable": {"routing_mode": "rule"}}
+    start = time.perf_counter()
+    final_state = asyncio.run(graph.ainvoke({"messages": [HumanMessage(content="topic")]}, config=config))
+    elapsed = time.perf_counter() - start
+
+    assert in_flight["max"] == 2
+    # 4 papers x 200 ms with 2 at a time ~= 400 ms instead of 800 ms serially
+    assert 0.35 < elapsed < 0.75
+    contents = [m.content for m in final_state["messages"]]
+    assert [c.split(":")[0] for c in contents] == ["topic", "Refinement_Agent", "Discovery_Agent", "Insight_Agent", "Report_Agent", "Gap_Agent"]
+    insight = contents[3]
+    assert insight.index("Paper 0") < insight.index("Paper 1") < insight.index("Paper 3")
+
+def test_reducer_keeps_discovery_order():
+    state = {
+        "papers": PAPERS[:2],
+        "paper_insights": [
+            {"id": PAPERS[1]["id"], "title": "Paper 1", "insight": "second"},
+            {"id": PAPERS[0]["id"], "title": "Paper 0", "insight": "first"},
+        ],
+    }
+    message = asyncio.run(insight_reducer_node(state))["messages"][0].content
+    assert message.startswith("Insight_Agent: ### Paper 0\nfirst")
+
+if __name__ == "__main__":
+    test_insights_fan_out_per_paper_under_concurrency_cap()
+    test_reducer_keeps_discovery_order()
+    print("Parallel workflow tests passed.")
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import server.sse as sse
+from server.sse import sse_stream, format_event, format_comment
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+def test_ready_events_are_batched_into_one_write():
+    async def events():
+        for i in range(3):
+            yield {"type": "status", "n": i}
+
+    chunks = asyncio.run(_collect(sse_stream(events(), heartbeat_interval=5)))
+    frames = "".join(chunks).split("\n\n")[:-1]
+    assert [json.loads(f.removeprefix("data: "))["n"] for f in frames] == [0, 1, 2]
+    assert len(chunks) < 3
+
+def test_heartbeat_sent_while_producer_is_idle():
+    async def events():
+        await asyncio.sleep(0.25)
+        yield {"type": "status"}
+
+    chunks = asyncio.run(_collect(sse_stream(events(), heartbeat_interval=0.05)))
+    assert chunks[0] == format_comment()
+    assert chunks[-1] == format_event({"type": "status"})
+
+def test_consumer_close_cancels_producer():
+    state = {"cancelled": False}
+
+    async def events():
+        try:
+            yield {"n": 0}
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        stream = sse_stream(events(), heartbeat_interval=5)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert state["cancelled"]
+
+def test_cancel_with_full_buffer_does_not_hang():
+    async def events():
+        n = 0
+        while True:
+            yield {"n": n}
+            n += 1
+
+    async def run():
+        stream = sse_stream(events(), heartbeat_interval=5, max_batch=1)
+        await stream.__anext__()
+        # Let the producer fill the buffer and block on it
+        await asyncio.sleep(0.05)
+        closing = asyncio.ensure_future(stream.aclose())
+        await asyncio.wait([closing], timeout=1)
+        return closing.done()
+
+    original = sse.MAX_BUFFER
+    sse.MAX_BUFFER = 4
+    try:
+        assert asyncio.run(run())
+    finally:
+        sse.MAX_BUFFER = original
+
+def test_format_event_fields():
+    assert format_event("hi", event="message", event_id="7") == "id: 7\nevent: message\ndata: hi\n\n"
+
+if __name__ == "__main__":
+    test_ready_events_are_batched_into_one_write()
+    test_heartbeat_sent_while_producer_is_idle()
+    test_consumer_close_cancels_producer()
+    test_cancel_with_full_buffer_does_not_hang()
+    test_format_event_fields()
+    print("SSE writer tests passed.")
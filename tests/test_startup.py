@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Seconds `import main` may take in a fresh process (~1 s with deferred imports, ~7 s without)
+IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", "3.0"))
+
+IMPORT_SCRIPT = """
+import sys, time, json
+started = time.perf_counter()
+import main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "heavy": [m for m in ("crewai", "langgraph", "langchain_google_genai") if m in sys.modules],
+    "graph": main.graph is not None,
+}))
+"""
+
+SERVE_SCRIPT = """
+import time, json, asyncio, threading
+started = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+
+# Warmup is held until /ready has been checked, so the not-ready state is not a race with a fast build
+release = threading.Event()
+build_graphs = main._build_graphs
+async def held_build_graphs():
+    await asyncio.to_thread(release.wait, 120)
+    await build_graphs()
+main._build_graphs = held_build_graphs
+
+with TestClient(main.app) as client:
+    health = client.get("/health").status_code
+    health_seconds = time.perf_counter() - started
+    ready_before = client.get("/ready").status_code
+    release.set()
+    while client.get("/ready").status_code != 200:
+        assert time.perf_counter() - started < 120, "warmup did not finish"
+        time.sleep(0.05)
+    ready_seconds = time.perf_counter() - started
+    unknown_session = client.get("/sessions/unknown").status_code
+print(json.dumps({"health": health, "health_seconds": health_seconds, "ready_before": ready_before,
+                  "ready_seconds": ready_seconds, "unknown_session": unknown_session}))
+"""
+
+# JOB_WORKERS=0: submitted jobs stay queued
+SESSIONS_SCRIPT = """
+import json
+from concurrent.futures import ThreadPoolExecutor
+import main
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    queued = client.post("/jobs", json={"topic": "t", "session_id": "queued"}).status_code
+    stream = client.post("/research-stream", json={"topic": "t", "session_id": "queued"}).status_code
+    run = client.post("/researchagents", json={"topic": "t", "session_id": "queued"}).status_code
+    with ThreadPoolExecutor(4) as pool:
+        race = sorted(pool.map(lambda _: client.post("/jobs", json={"topic": "t", "session_id": "race"}).status_code, range(4)))
+print(json.dumps({"queued": queued, "stream": stream, "run": run, "race": race}))
+"""
+
+def _run(script: str, **env) -> dict:
+    # Fresh interpreter: this test process has long imported everything
+    environ = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    environ.update(CHECKPOINT_BACKEND="memory", **env)
+    output = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=environ, capture_output=True, text=True, timeout=180)
+    assert output.returncode == 0, output.stderr[-2000:]
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def test_importing_main_defers_heavy_packages():
+    # No GEMINI_API_KEY either: nothing is built at import time
+    result = _run(IMPORT_SCRIPT)
+    print(f"import main: {result['seconds']:.2f}s")
+    assert result["heavy"] == []
+    assert not result["graph"]
+    assert result["seconds"] < IMPORT_BUDGET
+
+def test_health_answers_while_graphs_warm_up():
+    result = _run(SERVE_SCRIPT, WARMUP="background")
+    print(f"first healthy /health: {result['health_seconds']:.2f}s, /ready: {result['ready_seconds']:.2f}s")
+    assert result["health"] == 200
+    # The background warmup has not finished yet
+    assert result["ready_before"] == 503
+    assert result["health_seconds"] < IMPORT_BUDGET + 1.0
+    # A missing API key does not stop the graphs from being built
+    assert result["unknown_session"] == 404
+
+def test_session_id_is_claimed_once_across_streams_and_jobs():
+    result = _run(SESSIONS_SCRIPT, WARMUP="eager", JOB_WORKERS="0")
+    assert result["queued"] == 202
+    # A queued job owns its session ID before any checkpoint exists
+    assert result["stream"] == 409
+    assert result["run"] == 409
+    # Concurrent submissions under one ID: only the first is accepted
+    assert result["race"] == [202, 409, 409, 409]
+
+if __name__ == "__main__":
+    test_importing_main_defers_heavy_packages()
+    test_health_answers_while_graphs_warm_up()
+    test_session_id_is_claimed_once_across_streams_and_jobs()
+    print("Startup tests passed.")
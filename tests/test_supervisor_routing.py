@@ -0,0 +1,52 @@
+import asyncio
+from langchain_core.messages import HumanMessage, AIMessage
+import graph.supervisor as supervisor
+from graph.supervisor import supervisor_node, route_by_rules
+
+def _route(messages, mode):
+    config = {"configurable": {"routing_mode": mode}}
+    return asyncio.run(supervisor_node({"messages": messages}, config))["next"]
+
+def test_rule_routing_follows_pipeline():
+    messages = [HumanMessage(content="multi-agent systems")]
+    assert route_by_rules(messages) == "Topic_Refiner"
+
+    expected = [
+        ("Refinement_Agent: refined", "Paper_Discoverer"),
+        ("Discovery_Agent: papers", "Insight_Synthesizer"),
+        ("Insight_Agent: insights", "Report_Compiler"),
+        ("Report_Agent: report", "Gap_Analyst"),
+        ("Gap_Agent: gaps", "FINISH"),
+    ]
+    for content, next_agent in expected:
+        messages.append(AIMessage(content=content))
+        assert _route(messages, "rule") == next_agent
+
+def test_ambiguous_state_uses_llm_only_in_hybrid_mode():
+    messages = [HumanMessage(content="topic"), AIMessage(content="unlabelled output")]
+    assert route_by_rules(messages) is None
+
+    calls = []
+    async def fake_llm_route(msgs):
+        calls.append(len(msgs))
+        return "Paper_Discoverer"
+
+    original = supervisor.route_with_llm
+    supervisor.route_with_llm = fake_llm_route
+    try:
+        # Rule mode never touches the LLM
+        assert _route(messages, "rule") == "Topic_Refiner"
+        assert calls == []
+
+        # Hybrid mode only asks the LLM for ambiguous states
+        assert _route(messages[:1], "hybrid") == "Topic_Refiner"
+        assert calls == []
+        assert _route(messages, "hybrid") == "Paper_Discoverer"
+        assert calls == [2]
+    finally:
+        supervisor.route_with_llm = original
+
+if __name__ == "__main__":
+    test_rule_routing_follows_pipeline()
+    test_ambiguous_state_uses_llm_only_in_hybrid_mode()
+    print("Supervisor routing tests passed.")
@@ -0,0 +1,62 @@
+import asyncio
+from typing import TypedDict
+from langgraph.graph import StateGraph, END
+from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+from graph.streaming import stream_deltas
+
+class _State(TypedDict):
+    text: str
+
+def _fake_kickoff():
+    # Mimics a streaming CrewAI LLM emitting chunks from the kickoff thread
+    for chunk in ["Refined ", "topic"]:
+        crewai_event_bus.emit(None, event=LLMStreamChunkEvent(chunk=chunk, call_id="test"))
+    return "Refined topic"
+
+async def _worker(state: _State):
+    with stream_deltas("Topic_Refiner"):
+        result = await asyncio.to_thread(_fake_kickoff)
+    return {"text": result}
+
+def test_worker_deltas_reach_custom_stream():
+    workflow = StateGraph(_State)
+    workflow.add_node("Topic_Refiner", _worker)
+    workflow.set_entry_point("Topic_Refiner")
+    workflow.add_edge("Topic_Refiner", END)
+    graph = workflow.compile()
+
+    async def run():
+        return [item async for item in graph.astream({"text": ""}, stream_mode=["updates", "custom"])]
+
+    items = asyncio.run(run())
+    deltas = [output for mode, output in items if mode == "custom"]
+    updates = [output for mode, output in items if mode == "updates"]
+
+    assert deltas == [
+        {"agent": "Topic_Refiner", "delta": "Refined "},
+        {"agent": "Topic_Refiner", "delta": "topic"},
+    ]
+    # Deltas arrive before the node's final update
+    assert items[-1][0] == "updates"
+    assert updates == [{"Topic_Refiner": {"text": "Refined topic"}}]
+
+def test_chunks_outside_a_node_are_dropped():
+    # No active sink: emitting must be a no-op
+    _fake_kickoff()
+
+def test_tap_sees_deltas_outside_a_graph_run():
+    received = []
+
+    async def run():
+        with stream_deltas("Topic_Refiner", tap=received.append):
+            await asyncio.to_thread(_fake_kickoff)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert received == ["Refined ", "topic"]
+
+if __name__ == "__main__":
+    test_worker_deltas_reach_custom_stream()
+    test_chunks_outside_a_node_are_dropped()
+    test_tap_sees_deltas_outside_a_graph_run()
+    print("Token streaming tests passed.")
@@ -0,0 +1,293 @@
+"""
+Offline arXiv search: a BM25 inverted index over a local arXiv metadata
+snapshot (the public JSON-lines dump, one paper per line with id, title,
+abstract, authors_parsed, categories and versions).
+
+The index is a directory of .npy arrays opened with mmap_mode="r" (sorted
+terms, posting offsets, postings, per-paper length and date) plus the
+result metadata as JSON lines read through mmap, so opening it costs
+milliseconds regardless of its size.
+
+Usage:
+    python -m tools.arxiv_index build arxiv-metadata-oai-snapshot.json --categories cs. stat.ML
+    python -m tools.arxiv_index search "multi-agent reinforcement learning" --category cs.MA
+"""
+import os
+import re
+import json
+import mmap
+import time
+import argparse
+from array import array
+from collections import Counter
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from tools.memo_store import topic_terms
+
+# Index directory used by tools/arxiv_search.py when ARXIV_BACKEND=offline
+ARXIV_INDEX_PATH = os.getenv("ARXIV_INDEX_PATH", os.path.join(".cache", "arxiv_index"))
+# BM25 term-frequency saturation and length normalisation
+ARXIV_BM25_K1 = float(os.getenv("ARXIV_BM25_K1", "1.2"))
+ARXIV_BM25_B = float(os.getenv("ARXIV_BM25_B", "0.75"))
+
+# Terms are stored as fixed-width bytes so the sorted vocabulary can be binary searched in place
+TERM_BYTES = 32
+# Category filters are postings of pseudo-terms ("cat:cs.ai" and "cat:cs"); ":" never occurs in a word term
+CATEGORY_PREFIX = "cat:"
+
+_FIELD = re.compile(r"\b(?:ti|abs|all|au|co|jr|rn|id):")
+_CATEGORY = re.compile(r"\bcat:([\w.\-]+)", re.IGNORECASE)
+_OPERATOR = re.compile(r"\b(?:AND|OR)\b")
+# ANDNOT and its operand: a term, a quoted phrase or a parenthesised group, with an optional field prefix
+_EXCLUDED = re.compile(r"\bANDNOT\s+(?:\w+:)?(?:\([^)]*\)|\"[^\"]*\"|\S+)")
+
+def _term(term: str) -> bytes:
+    return term.encode("ascii", "ignore")[:TERM_BYTES]
+
+def _category_terms(categories: Iterable[str]) -> List[str]:
+    terms = set()
+    for category in categories:
+        category = category.lower()
+        terms.add(CATEGORY_PREFIX + category)
+        terms.add(CATEGORY_PREFIX + category.split(".")[0])
+    return sorted(terms)
+
+def _date(value: Optional[str]) -> int:
+    # "YYYY-MM-DD" -> YYYYMMDD
+    return int(value.replace("-", "")[:8]) if value else 0
+
+def parse_query(query: str) -> Tuple[str, List[str]]:
+    """
+    Splits an arXiv-style query into free text and category filters:
+    'cat:cs.AI AND ti:"multi agent"' -> ('multi agent', ['cs.AI']).
+    Field prefixes and boolean operators are dropped; all terms are ORed.
+    Excluded terms (ANDNOT x) are dropped rather than searched for.
+    """
+    query = _EXCLUDED.sub(" ", query)
+    categories = _CATEGORY.findall(query)
+    text = _CATEGORY.sub(" ", query)
+    text = _OPERATOR.sub(" ", _FIELD.sub(" ", text))
+    return " ".join(re.sub(r"[\"()]", " ", text).split()), categories
+
+def snapshot_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    A snapshot line in the schema returned by tools.arxiv_search.search_arxiv.
+    """
+    versions = raw.get("versions") or []
+    published = raw.get("update_date")
+    if versions and versions[0].get("created"):
+        published = str(parsedate_to_datetime(versions[0]["created"]).date())
+    if raw.get("authors_parsed"):
+        authors = [" ".join(part for part in (a[1], a[0], *a[2:]) if part) for a in raw["authors_parsed"]]
+    else:
+        authors = [a.strip() for a in re.split(r",| and ", raw.get("authors", "")) if a.strip()]
+    version = versions[-1]["version"] if versions else "v1"
+    return {
+        "title": " ".join(raw["title"].split()),
+        "summary": raw.get("abstract", "").strip(),
+        "url": f"http://arxiv.org/abs/{raw['id']}{version}",
+        "published": published,
+        "authors": authors,
+        "categories": raw.get("categories", "").split(),
+    }
+
+def build_index(snapshot_path: str, path: str = ARXIV_INDEX_PATH, categories: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Bulk-loads a snapshot into an index directory. `categories` keeps only
+    papers with a category starting with one of the prefixes ("cs.", "stat.ML").
+    Postings are collected in memory, so restrict very large dumps.
+    """
+    started = time.perf_counter()
+    os.makedirs(path, exist_ok=True)
+    postings: Dict[str, Tuple[array, array]] = {}
+    doc_lengths, doc_dates, doc_offsets = array("I"), array("i"), array("q", [0])
+
+    with open(snapshot_path, encoding="utf-8") as snapshot, open(os.path.join(path, "docs.jsonl"), "wb") as docs:
+        for line in snapshot:
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            record = snapshot_record(raw)
+            if categories and not any(c.startswith(prefix) for c in record["categories"] for prefix in categories):
+                continue
+
+            doc = len(doc_lengths)
+            terms = [_term(t).decode() for t in topic_terms(f"{record['title']} {record['summary']}")]
+            for term, tf in Counter(terms).items():
+                docs_list, tfs = postings.setdefault(term, (array("i"), array("H")))
+                docs_list.append(doc)
+                tfs.append(min(tf, 65535))
+            for term in _category_terms(record["categories"]):
+                docs_list, tfs = postings.setdefault(term, (array("i"), array("H")))
+                docs_list.append(doc)
+                tfs.append(0)
+            doc_lengths.append(len(terms))
+            doc_dates.append(_date(record["published"]))
+            docs.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+            doc_offsets.append(docs.tell())
+            if limit and len(doc_lengths) >= limit:
+                break
+
+    vocabulary = sorted(postings, key=_term)
+    term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    term_offsets[1:] = np.cumsum([len(postings[t][0]) for t in vocabulary])
+    np.save(os.path.join(path, "terms.npy"), np.array([_term(t) for t in vocabulary], dtype=f"S{TERM_BYTES}"))
+    np.save(os.path.join(path, "term_offsets.npy"), term_offsets)
+    np.save(os.path.join(path, "post_docs.npy"), np.concatenate([np.frombuffer(postings[t][0], dtype=np.int32) for t in vocabulary]) if vocabulary else np.zeros(0, dtype=np.int32))
+    np.save(os.path.join(path, "post_tf.npy"), np.concatenate([np.frombuffer(postings[t][1], dtype=np.uint16) for t in vocabulary]) if vocabulary else np.zeros(0, dtype=np.uint16))
+    np.save(os.path.join(path, "doc_len.npy"), np.frombuffer(doc_lengths, dtype=np.uint32))
+    np.save(os.path.join(path, "doc_date.npy"), np.frombuffer(doc_dates, dtype=np.int32))
+    np.save(os.path.join(path, "doc_offsets.npy"), np.frombuffer(doc_offsets, dtype=np.int64))
+
+    stats = {
+        "papers": len(doc_lengths),
+        "terms": len(vocabulary),
+        "postings": int(term_offsets[-1]),
+        "avg_length": float(np.mean(doc_lengths)) if len(doc_lengths) else 0.0,
+        "source": os.path.abspath(snapshot_path),
+        "built": time.time(),
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(stats, f)
+    print(f"DEBUG: Built arXiv index {path}: {stats['papers']} papers, {stats['terms']} terms in {time.perf_counter() - started:.1f}s")
+    return stats
+
+class ArxivIndex:
+    """
+    Read-only view of an index directory built by build_index. Arrays are
+    memory-mapped; only the postings of the query terms and the metadata of
+    the returned papers are touched by a search. Safe to share between threads.
+    """
+    def __init__(self, path: str = ARXIV_INDEX_PATH, k1: float = ARXIV_BM25_K1, b: float = ARXIV_BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+
+        self.terms = load("terms")
+        self.term_offsets = load("term_offsets")
+        self.post_docs = load("post_docs")
+        self.post_tf = load("post_tf")
+        self.doc_len = load("doc_len")
+        self.doc_date = load("doc_date")
+        self.doc_offsets = load("doc_offsets")
+        self._docs_file = open(os.path.join(path, "docs.jsonl"), "rb")
+        self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ) if self.meta["papers"] else None
+
+    def __len__(self) -> int:
+        return self.meta["papers"]
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        key = _term(term)
+        i = int(np.searchsorted(self.terms, key))
+        if i >= len(self.terms) or self.terms[i] != key:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16)
+        start, end = self.term_offsets[i], self.term_offsets[i + 1]
+        return self.post_docs[start:end], self.post_tf[start:end]
+
+    def record(self, doc: int) -> Dict[str, Any]:
+        return json.loads(self._docs[self.doc_offsets[doc]:self.doc_offsets[doc + 1]])
+
+    def search(self, query: str, max_results: int = 5, sort_by_relevance: bool = True, categories: Optional[List[str]] = None, date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Same results schema as tools.arxiv_search.search_arxiv. Categories
+        (from the arguments or "cat:" in the query) match a full category or a
+        whole archive ("cs"); dates are inclusive "YYYY-MM-DD" bounds on the
+        first version. Without relevance sorting the newest matches come first.
+        """
+        text, query_categories = parse_query(query)
+        categories = list(categories or []) + query_categories
+        n = len(self)
+        if not n:
+            return []
+
+        scores = None
+        terms = list(dict.fromkeys(topic_terms(text)))
+        if terms:
+            scores = np.zeros(n, dtype=np.float32)
+            avg_length = self.meta["avg_length"] or 1.0
+            for term in terms:
+                docs, tf = self._postings(term)
+                if not len(docs):
+                    continue
+                idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                tf = tf.astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / avg_length)
+                # A term's postings hold each paper once, so plain fancy-index addition is safe
+                scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+            candidates = np.flatnonzero(scores)
+        else:
+            candidates = np.arange(n) if categories else np.zeros(0, dtype=np.int64)
+
+        if categories:
+            allowed = [self._postings(CATEGORY_PREFIX + c.lower())[0] for c in categories]
+            candidates = candidates[np.isin(candidates, np.concatenate(allowed))]
+        if date_from or date_to:
+            dates = self.doc_date[candidates]
+            keep = np.ones(len(candidates), dtype=bool)
+            if date_from:
+                keep &= dates >= _date(date_from)
+            if date_to:
+                keep &= dates <= _date(date_to)
+            candidates = candidates[keep]
+
+        if scores is not None and sort_by_relevance:
+            ranking = -scores[candidates]
+        else:
+            ranking = -self.doc_date[candidates].astype(np.int64)
+        if len(candidates) > max_results:
+            top = np.argpartition(ranking, max_results - 1)[:max_results]
+            candidates, ranking = candidates[top], ranking[top]
+        ordered = candidates[np.argsort(ranking, kind="stable")]
+        return [self.record(int(doc)) for doc in ordered]
+
+    def close(self) -> None:
+        if self._docs is not None:
+            self._docs.close()
+        self._docs_file.close()
+
+_index: Optional[ArxivIndex] = None
+
+def get_arxiv_index() -> ArxivIndex:
+    """
+    The process-wide offline index (ARXIV_INDEX_PATH), opened on first use.
+    """
+    global _index
+    if _index is None:
+        _index = ArxivIndex()
+    return _index
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index a JSON-lines metadata snapshot")
+    build.add_argument("snapshot")
+    build.add_argument("--out", default=ARXIV_INDEX_PATH, help="index directory")
+    build.add_argument("--categories", nargs="+", help="category prefixes to keep, e.g. cs. stat.ML")
+    build.add_argument("--limit", type=int, help="stop after this many papers")
+    search = commands.add_parser("search", help="query an index")
+    search.add_argument("query")
+    search.add_argument("--index", default=ARXIV_INDEX_PATH)
+    search.add_argument("--max-results", type=int, default=5)
+    search.add_argument("--category", nargs="+")
+    search.add_argument("--date-from")
+    search.add_argument("--date-to")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(build_index(args.snapshot, args.out, args.categories, args.limit), indent=2))
+        return
+    index = ArxivIndex(args.index)
+    started = time.perf_counter()
+    results = index.search(args.query, args.max_results, categories=args.category, date_from=args.date_from, date_to=args.date_to)
+    print(f"{len(results)} results in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for paper in results:
+        print(f"{paper['published']}  {paper['url']}  {paper['title']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,69 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
 import arxiv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from tools.cancellation import raise_if_cancelled
+from tools.disk_cache import DiskCache
+from tools.rate_limit import RateLimiter
+from tools.telemetry import span
 
-def search_arxiv(query: str, max_results: int = 5, sort_by_relevance: bool = True) -> List[Dict[str, Any]]:
+# Cache settings (shared by the AutoGen tool and the CrewAI tool)
+ARXIV_CACHE_PATH = os.getenv("ARXIV_CACHE_PATH", os.path.join(".cache", "arxiv_cache.sqlite"))
+ARXIV_CACHE_TTL = float(os.getenv("ARXIV_CACHE_TTL", str(24 * 3600)))
+ARXIV_CACHE_MAX_ENTRIES = int(os.getenv("ARXIV_CACHE_MAX_ENTRIES", "2000"))
+
+# arXiv asks for no more than one request every 3 seconds; ARXIV_BURST > 1 allows short bursts
+ARXIV_MIN_INTERVAL = float(os.getenv("ARXIV_MIN_INTERVAL", "3.0"))
+ARXIV_BURST = int(os.getenv("ARXIV_BURST", "1"))
+
+# arXiv query endpoint; point it at a local stand-in (benchmarks/mock_services.py) to run offline
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query")
+
+# Search backend: "api" (live arXiv, cached and rate limited) or "offline" (local index, see tools/arxiv_index.py)
+ARXIV_BACKEND = os.getenv("ARXIV_BACKEND", "api").lower()
+
+_cache: Optional[DiskCache] = None
+_rate_limiter = RateLimiter(rate=1.0 / ARXIV_MIN_INTERVAL if ARXIV_MIN_INTERVAL > 0 else float("inf"), burst=ARXIV_BURST)
+
+def get_cache() -> DiskCache:
     """
-    Search arXiv for papers based on a query.
+    Returns the process-wide arXiv results cache, opening it on first use.
+    """
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(ARXIV_CACHE_PATH, namespace="arxiv", ttl=ARXIV_CACHE_TTL, max_entries=ARXIV_CACHE_MAX_ENTRIES)
+    return _cache
 
-    Args:
-        query (str): The search query (e.g., 'multi-agent systems', 'cat:cs.AI').
-        max_results (int): Maximum number of results to return.
-        sort_by_relevance (bool): Whether to sort by relevance (True) or submitted date (False).
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a query for cache keys: case and whitespace are ignored,
+    but arXiv boolean operators (AND, OR, ANDNOT) keep their meaning.
+    """
+    tokens = re.split(r"\s+", query.strip())
+    return " ".join(t if t in ("AND", "OR", "ANDNOT") else t.lower() for t in tokens if t)
 
-    Returns:
-        List[Dict[str, Any]]: A list of dictionaries containing paper details.
+def cache_key(query: str, max_results: int, sort_by_relevance: bool) -> str:
+    sort = "relevance" if sort_by_relevance else "submitted"
+    raw = f"{normalize_query(query)}\x1f{max_results}\x1f{sort}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def arxiv_id(url: str) -> str:
+    """
+    Version-less arXiv ID from an entry URL, e.g. 'http://arxiv.org/abs/2401.01234v2' -> '2401.01234'.
+    """
+    ident = url.rstrip("/").split("/abs/")[-1]
+    return re.sub(r"v\d+$", "", ident)
+
+def _fetch(query: str, max_results: int, sort_by_relevance: bool) -> List[Dict[str, Any]]:
+    """
+    Live arXiv API call. Callers must take a slot from the rate limiter first.
     """
     client = arxiv.Client()
-    
+    client.query_url_format = ARXIV_API_URL + "?{}"
+
     sort_criterion = arxiv.SortCriterion.Relevance if sort_by_relevance else arxiv.SortCriterion.SubmittedDate
 
     search = arxiv.Search(
@@ -33,9 +82,115 @@ def search_arxiv(query: str, max_results: int = 5, sort_by_relevance: bool = Tru
             "authors": [a.name for a in r.authors],
             "categories": r.categories
         })
-    
+
     return results
 
+def _search_offline(query: str, max_results: int, sort_by_relevance: bool) -> List[Dict[str, Any]]:
+    # Milliseconds on the memory-mapped index: no cache, no rate limit, no thread hop
+    from tools.arxiv_index import get_arxiv_index
+
+    with span("arxiv", "search", query=query, backend="offline") as arxiv_span:
+        results = get_arxiv_index().search(query, max_results, sort_by_relevance)
+        arxiv_span.set(results=len(results))
+        return results
+
+def search_arxiv(query: str, max_results: int = 5, sort_by_relevance: bool = True) -> List[Dict[str, Any]]:
+    """
+    Search arXiv for papers based on a query.
+    Results are cached on disk, so repeated searches skip the API entirely.
+
+    Args:
+        query (str): The search query (e.g., 'multi-agent systems', 'cat:cs.AI').
+        max_results (int): Maximum number of results to return.
+        sort_by_relevance (bool): Whether to sort by relevance (True) or submitted date (False).
+
+    Returns:
+        List[Dict[str, Any]]: A list of dictionaries containing paper details.
+    """
+    if ARXIV_BACKEND == "offline":
+        return _search_offline(query, max_results, sort_by_relevance)
+    with span("arxiv", "search", query=query) as arxiv_span:
+        cache = get_cache()
+        key = cache_key(query, max_results, sort_by_relevance)
+        cached = cache.get(key)
+        arxiv_span.set(cached=cached is not None)
+        if cached is not None:
+            arxiv_span.set(results=len(cached))
+            return cached
+
+        started = time.perf_counter()
+        _rate_limiter.acquire()
+        arxiv_span.set(queue_wait=time.perf_counter() - started)
+        # Called from crew threads, which asyncio cannot cancel: stop here if the run was abandoned
+        raise_if_cancelled()
+        results = _fetch(query, max_results, sort_by_relevance)
+        arxiv_span.set(results=len(results))
+        cache.set(key, results)
+        return results
+
+async def asearch_arxiv(query: str, max_results: int = 5, sort_by_relevance: bool = True) -> List[Dict[str, Any]]:
+    """
+    Async variant of search_arxiv: waits for the rate limiter without holding a
+    thread, then runs the blocking arXiv client in a worker thread.
+    """
+    if ARXIV_BACKEND == "offline":
+        return _search_offline(query, max_results, sort_by_relevance)
+    with span("arxiv", "search", query=query) as arxiv_span:
+        cache = get_cache()
+        key = cache_key(query, max_results, sort_by_relevance)
+        cached = cache.get(key)
+        arxiv_span.set(cached=cached is not None)
+        if cached is not None:
+            arxiv_span.set(results=len(cached))
+            return cached
+
+        started = time.perf_counter()
+        await _rate_limiter.acquire_async()
+        arxiv_span.set(queue_wait=time.perf_counter() - started)
+        results = await asyncio.to_thread(_fetch, query, max_results, sort_by_relevance)
+        arxiv_span.set(results=len(results))
+        cache.set(key, results)
+        return results
+
+async def search_arxiv_many(queries: List[str], max_results: int = 5, sort_by_relevance: bool = True) -> List[Dict[str, Any]]:
+    """
+    Runs several queries concurrently (under the shared rate limiter) and merges
+    the results (see merge_results).
+    """
+    outcomes = await asyncio.gather(
+        *(asearch_arxiv(q, max_results, sort_by_relevance) for q in queries),
+        return_exceptions=True
+    )
+    return merge_results(queries, outcomes)
+
+def merge_results(queries: List[str], outcomes: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Merges per-query result lists, deduplicated by arXiv ID. Results are
+    interleaved round-robin so every query contributes its best hits first.
+    Each paper gets an "id" and the list of "queries" that found it. A query
+    whose outcome is an exception is skipped.
+    """
+    per_query = []
+    for query, outcome in zip(queries, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"DEBUG: arXiv query failed ({query!r}): {outcome}")
+            continue
+        per_query.append((query, outcome))
+
+    merged: Dict[str, Dict[str, Any]] = {}
+    depth = max((len(r) for _, r in per_query), default=0)
+    for rank in range(depth):
+        for query, results in per_query:
+            if rank >= len(results):
+                continue
+            paper = results[rank]
+            pid = arxiv_id(paper["url"])
+            if pid in merged:
+                merged[pid]["queries"].append(query)
+            else:
+                merged[pid] = {**paper, "id": pid, "queries": [query]}
+    return list(merged.values())
+
 if __name__ == "__main__":
     # Test the function
     papers = search_arxiv("multi-agent reinforcement learning", max_results=2)
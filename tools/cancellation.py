@@ -0,0 +1,106 @@
+import time
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class CancellationToken:
+    """
+    Cooperative cancellation of one research run. Coroutines are cancelled
+    by asyncio itself; the token reaches the work asyncio cannot interrupt
+    (crew.kickoff and tool calls in crew threads) and is checked there
+    before every LLM call, arXiv request and rate-limit wait.
+    Has the methods of autogen_core's CancellationToken, and is thread-safe.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def add_callback(self, callback: Callable[[], None]) -> None:
+        # Runs at once when the token is already cancelled
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]) -> None:
+        # For callbacks that are no longer needed once the work they would stop is done
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def link_future(self, future: asyncio.Future) -> asyncio.Future:
+        """
+        Cancels the future when the token is cancelled, from any thread. The
+        link is dropped once the future is done.
+        """
+        loop = future.get_loop()
+
+        def cancel():
+            try:
+                loop.call_soon_threadsafe(future.cancel)
+            except RuntimeError:
+                # The loop is already closed, and the future with it
+                pass
+
+        def forget(_):
+            self.remove_callback(cancel)
+
+        self.add_callback(cancel)
+        future.add_done_callback(forget)
+        return future
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the token is cancelled or the timeout expires; True if cancelled.
+        """
+        return self._event.wait(timeout)
+
+# Token of the research run in this context (set by server.events.graph_events). Crew threads
+# get a copy of the context (crew.execution.run_blocking), so they see their run's token.
+run_cancellation: ContextVar[Optional[CancellationToken]] = ContextVar("run_cancellation", default=None)
+
+def raise_if_cancelled(token: Optional[CancellationToken] = None) -> None:
+    """
+    Raises CancelledError when the given token, or the current run's, is
+    cancelled. CancelledError is not an Exception, so CrewAI's retry and
+    error handling lets it through.
+    """
+    token = token or run_cancellation.get()
+    if token is not None and token.is_cancelled():
+        raise asyncio.CancelledError("research run cancelled")
+
+def cancellable_sleep(seconds: float) -> None:
+    # time.sleep that ends early (with CancelledError) when the current run is cancelled
+    token = run_cancellation.get()
+    if token is None:
+        time.sleep(seconds)
+    elif token.wait(seconds):
+        raise_if_cancelled(token)
+
+async def cancellable(awaitable: Awaitable[T], token=None) -> T:
+    """
+    Awaits in a task that the token (this module's or autogen_core's)
+    cancels, so a call can be abandoned without cancelling its caller.
+    """
+    if token is None:
+        return await awaitable
+    task = asyncio.ensure_future(awaitable)
+    token.link_future(task)
+    return await task
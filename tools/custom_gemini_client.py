@@ -1,7 +1,9 @@
 import os
 import json
+import time
 import httpx
-from typing import Mapping, Any, Sequence, AsyncGenerator, Union
+import weakref
+from typing import Mapping, Any, Sequence, AsyncGenerator, Optional, Union
 from autogen_core.models import (
     ChatCompletionClient,
     CreateResult,
@@ -15,14 +17,103 @@ from autogen_core.models import (
 )
 from autogen_core.tools import Tool
 from autogen_core._types import FunctionCall
+from tools.cancellation import cancellable, run_cancellation
+from tools.llm_cache import ResponseCache
+from tools.llm_scheduler import LLMScheduler, get_scheduler, estimate_tokens
+from tools.telemetry import span, detached_span, current_span
 import asyncio
-import requests
+
+# Connection pool defaults (overridable via env or per client)
+DEFAULT_POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("GEMINI_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("GEMINI_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", "30")),
+)
+DEFAULT_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+# Gemini API host; point it at a local stand-in (benchmarks/mock_services.py) to run offline
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip("/")
+
+# Status codes worth retrying (same set the old urllib3 Retry used)
+RETRY_STATUS_CODES = (429, 500, 503)
+
+# One pooled client per event loop: connections cannot be shared across loops
+_shared_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+def _http2_available() -> bool:
+    # HTTP/2 needs the optional 'h2' package (pip install httpx[http2])
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def create_http_client(limits: Optional[httpx.Limits] = None, http2: bool = True, timeout: httpx.Timeout = DEFAULT_TIMEOUT) -> httpx.AsyncClient:
+    """
+    Builds an AsyncClient with keep-alive pooling (and HTTP/2 when available).
+    """
+    return httpx.AsyncClient(
+        http2=http2 and _http2_available(),
+        limits=limits or DEFAULT_POOL_LIMITS,
+        timeout=timeout,
+    )
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide pooled client for the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _shared_http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = create_http_client()
+        _shared_http_clients[loop] = client
+    return client
+
+async def close_shared_http_client() -> None:
+    """
+    Closes the shared pool of the running event loop (call on app shutdown).
+    """
+    client = _shared_http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
 
 class CustomGeminiClient(ChatCompletionClient):
-    def __init__(self, api_key: str, model: str = "models/gemini-2.5-flash"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "models/gemini-2.5-flash",
+        http_client: Optional[httpx.AsyncClient] = None,
+        pool_limits: Optional[httpx.Limits] = None,
+        http2: bool = True,
+        max_retries: int = 5,
+        backoff_factor: float = 1.0,
+        response_cache: Optional[ResponseCache] = None,
+        scheduler: Optional[LLMScheduler] = None,
+        name_prefix: bool = False,
+    ):
+        """
+        By default all clients share one pooled httpx.AsyncClient per event loop.
+        Pass `http_client` to supply your own, or `pool_limits` to get a dedicated
+        pool owned (and closed) by this client. Pass a `response_cache` to reuse
+        responses for identical payloads (opt-in). Requests wait for the
+        process-wide Gemini budget (tools.llm_scheduler) unless another
+        `scheduler` is given. With `name_prefix`, assistant turns are sent as
+        "[source]: text" (off by default: it costs tokens on every turn and the
+        model tends to echo it).
+        """
         self.api_key = api_key
-        self.model = model
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/openai/chat/completions"
+        # Accept both "gemini-2.5-flash" and "models/gemini-2.5-flash"
+        self.model = model.removeprefix("models/")
+        self.base_url = f"{GEMINI_API_BASE}/v1beta"
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._http_client = http_client
+        self._pool_limits = pool_limits
+        self._http2 = http2
+        self._owns_http_client = False
+        self.response_cache = response_cache
+        self.scheduler = scheduler or get_scheduler()
+        self.name_prefix = name_prefix
         self._model_capabilities = ModelCapabilities(
             vision=False,
             function_calling=True,
@@ -37,7 +128,7 @@ class CustomGeminiClient(ChatCompletionClient):
     @property
     def model_capabilities(self) -> ModelCapabilities:
         return self._model_capabilities
-    
+
     @property
     def model_info(self) -> ModelInfo:
         return ModelInfo(
@@ -46,69 +137,146 @@ class CustomGeminiClient(ChatCompletionClient):
             json_output=False,
             family="gemini"
         )
-        
+
     def remaining_tokens(self) -> Union[int, float]:
         return float("inf")
-        
+
     def actual_usage(self) -> RequestUsage:
         return self._total_usage
 
     def total_usage(self) -> RequestUsage:
         return self._total_usage
-        
-    def close(self) -> None:
-        pass
-        
+
+    async def close(self) -> None:
+        # Only close pools this client created; the shared pool outlives individual clients
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._owns_http_client = False
+
     def count_tokens(self, messages: Sequence[LLMMessage], tools: Sequence[Tool] = []) -> int:
         # Mock implementation
         return sum(len(m.content) for m in messages if isinstance(m.content, str)) // 4
 
-    async def create_stream(
-        self,
-        messages: Sequence[LLMMessage],
-        tools: Sequence[Tool] = [],
-        json_output: bool = False,
-        extra_create_args: Mapping[str, Any] = {},
-        cancellation_token: Any = None,
-    ) -> AsyncGenerator[Union[str, CreateResult], None]:
-        # Simple non-streaming wrapper for now
-        result = await self.create(messages, tools, json_output, extra_create_args, cancellation_token)
-        yield result.content if isinstance(result.content, str) else "" 
-        yield result
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is not None and not self._http_client.is_closed:
+            return self._http_client
+        if self._pool_limits is not None:
+            self._http_client = create_http_client(self._pool_limits, http2=self._http2)
+            self._owns_http_client = True
+            return self._http_client
+        return get_shared_http_client()
 
-    async def create(
-        self,
-        messages: Sequence[LLMMessage],
-        tools: Sequence[Tool] = [],
-        json_output: bool = False,
-        extra_create_args: Mapping[str, Any] = {},
-        cancellation_token: Any = None,
-    ) -> CreateResult:
-        
-        # Native Gemini API URL
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent"
-        
+    def _headers(self) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "x-goog-api-key": self.api_key
+        }
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        # Honour Retry-After on 429s, otherwise exponential backoff like urllib3's Retry
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_factor * (2 ** attempt)
+
+    def _estimate_tokens(self, payload: dict) -> int:
+        return estimate_tokens(json.dumps(payload["contents"]), payload.get("generationConfig", {}).get("maxOutputTokens"))
+
+    @staticmethod
+    def _used_tokens(usage_meta: dict) -> Optional[int]:
+        return usage_meta.get("totalTokenCount") if usage_meta else None
+
+    @staticmethod
+    def _record_wait(grant, llm_span=None) -> None:
+        llm_span = llm_span or current_span()
+        if llm_span is not None and llm_span.kind == "llm":
+            llm_span.add(queue_wait=grant.waited)
+
+    def _track_usage(self, llm_span, result: CreateResult) -> None:
+        if self.response_cache is not None:
+            llm_span.set(cached=result.cached)
+        if result.cached:
+            return
+        llm_span.add_tokens(result.usage.prompt_tokens, result.usage.completion_tokens)
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + result.usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + result.usage.completion_tokens,
+        )
+
+    async def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> None:
+        delay = self._retry_delay(attempt, response)
+        if response is not None and response.status_code == 429:
+            # Quota exhausted: pause every caller in the process; the next attempt waits in the scheduler
+            self.scheduler.throttle(delay)
+            return
+        await asyncio.sleep(delay)
+
+    async def _post(self, url: str, payload: dict) -> httpx.Response:
+        """
+        POSTs the payload on the pooled client, retrying transient failures.
+        Every attempt waits for the shared request/token budget first.
+        """
+        client = self._get_http_client()
+        tokens = self._estimate_tokens(payload)
+        for attempt in range(self.max_retries + 1):
+            grant = await self.scheduler.acquire_async(tokens)
+            self._record_wait(grant)
+            try:
+                response = await client.post(url, headers=self._headers(), json=payload)
+            except httpx.TransportError as e:
+                grant.settle(0)
+                if attempt >= self.max_retries:
+                    raise RuntimeError(f"Connection failed: {e}")
+                await self._backoff(attempt)
+                continue
+
+            if response.status_code != 200:
+                grant.settle(0)
+            else:
+                grant.settle(self._used_tokens(response.json().get("usageMetadata")))
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                await self._backoff(attempt, response)
+                continue
+            return response
+
+    def _dump_payload(self, payload: dict) -> None:
+        # Attempt to dump payload on error for debugging
+        try:
+            with open("debug_gemini_payload_error.json", "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2)
+            print("DEBUG: Payload dumped to debug_gemini_payload_error.json")
+        except Exception as e:
+            print(f"DEBUG: Failed to dump payload: {e}")
+
+    def _build_payload(self, messages: Sequence[LLMMessage], tools: Sequence[Tool] = []) -> dict:
+        """
+        Converts AutoGen messages and tools into a native Gemini request body.
+        """
         # Conversion Logic: AutoGen -> Gemini Native
         contents = []
         system_prompt_text = ""
-        
+
         for msg in messages:
             role = "user" # Default
             parts = []
-            
+
             if isinstance(msg, SystemMessage):
                 # Accumulate system prompt to prepend to first user message
                 system_prompt_text += msg.content + "\n\n"
                 continue
-                
+
             elif isinstance(msg, UserMessage):
                 role = "user"
                 parts = [{"text": msg.content}]
-                
+
             elif isinstance(msg, AssistantMessage):
                 # Assistant --> Model
-                role = "model" 
-                if isinstance(msg.content, str):
+                role = "model"
+                if isinstance(msg.content, str) and not self.name_prefix:
+                    parts = [{"text": msg.content}]
+                elif isinstance(msg.content, str):
                     source_name = getattr(msg, 'source', 'Assistant')
                     prefix = f"[{source_name}]:"
                     content_str = msg.content
@@ -127,7 +295,7 @@ class CustomGeminiClient(ChatCompletionClient):
                                     "args": json.loads(fc.arguments) if isinstance(fc.arguments, str) else fc.arguments
                                 }
                             })
-            
+
             else:
                 # Fallback for generic messages
                 role = "user"
@@ -135,14 +303,19 @@ class CustomGeminiClient(ChatCompletionClient):
                      parts = [{"text": str(msg.content)}]
                 else:
                      continue # Skip empty/unknown messages
-            
+
             if not parts:
                 continue
 
             # Strict Merging Logic
             if contents and contents[-1]['role'] == role:
-                # Same role -> Merge
-                contents[-1]['parts'].extend(parts)
+                # Same role -> Merge, joining adjacent text into one part
+                previous = contents[-1]['parts']
+                for part in parts:
+                    if "text" in part and previous and "text" in previous[-1]:
+                        previous[-1] = {"text": previous[-1]["text"] + "\n\n" + part["text"]}
+                    else:
+                        previous.append(part)
             else:
                 contents.append({"role": role, "parts": parts})
 
@@ -164,7 +337,7 @@ class CustomGeminiClient(ChatCompletionClient):
         if contents and contents[-1]['role'] == 'model':
             # Append synthetic user continuation
             contents.append({"role": "user", "parts": [{"text": "Please continue based on the above context."}]})
-            
+
         # If conversation is empty (only system prompt?), ensure at least one user message
         if not contents:
              contents.append({"role": "user", "parts": [{"text": f"System Instruction:\n{system_prompt_text}\nPlease start."}]})
@@ -201,88 +374,50 @@ class CustomGeminiClient(ChatCompletionClient):
                 {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
             ],
             "generationConfig": {
-                "temperature": 0.7, 
+                "temperature": 0.7,
                 "maxOutputTokens": 2048
             }
         }
-            
+
         if google_tools:
             payload["tools"] = google_tools
 
-        headers = {
-            "Content-Type": "application/json",
-            "x-goog-api-key": self.api_key
-        }
-        
-        # Ensure session exists (Robustness)
-        if not hasattr(self, 'session'):
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.retry import Retry
-            self.session = requests.Session()
-            retry_strategy = Retry(
-                total=5,backoff_factor=1,status_forcelist=[429, 500, 503],
-                allowed_methods=["POST"]
-            )
-            adapter = HTTPAdapter(max_retries=retry_strategy)
-            self.session.mount("https://", adapter)
-
-        # Execute Request
-        def _make_request():
-            try:
-                return self.session.post(url, headers=headers, json=payload, timeout=60.0)
-            except Exception as e:
-                raise RuntimeError(f"Connection failed: {e}")
-
-        response = await asyncio.to_thread(_make_request)
-        
-        if response.status_code != 200:
-             # Attempt to dump payload on error for debugging
-             try:
-                 with open("debug_gemini_payload_error.json", "w", encoding="utf-8") as f:
-                     json.dump(payload, f, indent=2)
-                 print("DEBUG: Payload dumped to debug_gemini_payload_error.json")
-             except Exception as e:
-                 print(f"DEBUG: Failed to dump payload: {e}")
-                 
-             raise RuntimeError(f"Gemini Native API Error {response.status_code}: {response.text}")
-
-        data = response.json()
-        
+        return payload
+
+    def _parse_response(self, data: dict, payload: dict) -> CreateResult:
+        """
+        Converts a native Gemini response body into an AutoGen CreateResult.
+        """
         if "candidates" not in data or not data["candidates"]:
-             try:
-                 with open("debug_gemini_payload_error.json", "w", encoding="utf-8") as f:
-                     json.dump(payload, f, indent=2)
-                 print("DEBUG: Payload dumped to debug_gemini_payload_error.json")
-             except Exception as e:
-                 print(f"DEBUG: Failed to dump payload: {e}")
-                 
+             self._dump_payload(payload)
              error_msg = f"Gemini returned no candidates.\nResponse: {json.dumps(data, indent=2)}\nPayload dumped to debug_gemini_payload_error.json"
              raise RuntimeError(error_msg)
-             
+
         candidate = data["candidates"][0]
         parts = candidate.get("content", {}).get("parts", [])
-        
+
         # Extract Text and Function Calls
         text_content = ""
         tool_calls = []
-        
+
         for part in parts:
             if "text" in part:
                 text_content += part["text"]
             if "functionCall" in part:
-                fc = part["functionCall"]
-                tool_calls.append(FunctionCall(
-                    id="call_" + fc["name"], 
-                    name=fc["name"],
-                    arguments=json.dumps(fc["args"]) 
-                ))
-        
-        finish_reason = candidate.get("finishReason", "STOP").lower()
-        if finish_reason == "stop": finish_reason = "stop"
-        else: finish_reason = "stop" 
-        
-        usage_meta = data.get("usageMetadata", {})
-        
+                tool_calls.append(self._function_call(part["functionCall"]))
+
+        return self._make_result(text_content, tool_calls, data.get("usageMetadata", {}))
+
+    def _function_call(self, fc: dict) -> FunctionCall:
+        return FunctionCall(
+            id="call_" + fc["name"],
+            name=fc["name"],
+            arguments=json.dumps(fc.get("args", {}))
+        )
+
+    def _make_result(self, text_content: str, tool_calls: list, usage_meta: dict) -> CreateResult:
+        finish_reason = "function_calls" if tool_calls else "stop"
+
         return CreateResult(
             content=tool_calls if tool_calls else text_content,
             usage=RequestUsage(
@@ -292,3 +427,167 @@ class CustomGeminiClient(ChatCompletionClient):
             finish_reason=finish_reason,
             cached=False
         )
+
+    def _cache_lookup(self, payload: dict):
+        """
+        Returns (key, cached CreateResult or None). Cache hits report zero usage.
+        """
+        if self.response_cache is None:
+            return None, None
+        key = ResponseCache.make_key(self.model, payload)
+        entry = self.response_cache.get(key)
+        if entry is None:
+            return key, None
+        content = entry["content"]
+        if isinstance(content, list):
+            content = [FunctionCall(**fc) for fc in content]
+        return key, CreateResult(
+            content=content,
+            usage=RequestUsage(prompt_tokens=0, completion_tokens=0),
+            finish_reason=entry["finish_reason"],
+            cached=True
+        )
+
+    def _cache_store(self, key: Optional[str], result: CreateResult) -> None:
+        if key is None:
+            return
+        content = result.content
+        if isinstance(content, list):
+            content = [{"id": fc.id, "name": fc.name, "arguments": fc.arguments} for fc in content]
+        self.response_cache.set(key, {"content": content, "finish_reason": result.finish_reason})
+
+    async def _stream_chunks(self, url: str, payload: dict, llm_span=None) -> AsyncGenerator[dict, None]:
+        """
+        POSTs to the SSE endpoint and yields each decoded chunk as it arrives.
+        Transient failures are only retried before the first chunk was received.
+        """
+        client = self._get_http_client()
+        tokens = self._estimate_tokens(payload)
+        received = False
+        for attempt in range(self.max_retries + 1):
+            retry_response = None
+            usage_meta = {}
+            grant = await self.scheduler.acquire_async(tokens)
+            self._record_wait(grant, llm_span)
+            try:
+                async with client.stream("POST", url, params={"alt": "sse"}, headers=self._headers(), json=payload) as response:
+                    if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                        retry_response = response
+                    elif response.status_code != 200:
+                        body = (await response.aread()).decode("utf-8", errors="replace")
+                        self._dump_payload(payload)
+                        raise RuntimeError(f"Gemini Native API Error {response.status_code}: {body}")
+                    else:
+                        async for line in response.aiter_lines():
+                            # SSE frames look like "data: {...}"; ignore blank lines and comments
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data:
+                                received = True
+                                chunk = json.loads(data)
+                                usage_meta = chunk.get("usageMetadata", usage_meta)
+                                yield chunk
+                        return
+            except httpx.TransportError as e:
+                if received or attempt >= self.max_retries:
+                    raise RuntimeError(f"Connection failed: {e}")
+            finally:
+                # Usage is cumulative; the last chunk carries the final counts
+                grant.settle(self._used_tokens(usage_meta) or 0)
+            await self._backoff(attempt, retry_response)
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool] = [],
+        tool_choice: Any = "auto",
+        json_output: bool = False,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Any = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        """
+        Streams text deltas from streamGenerateContent, then yields the final CreateResult.
+        Cancelling the token (or the research run's, see tools/cancellation.py)
+        aborts the request and closes the connection.
+        """
+        url = f"{self.base_url}/models/{self.model}:streamGenerateContent"
+        token = cancellation_token or run_cancellation.get()
+        payload = self._build_payload(messages, tools)
+
+        # Not made the current span: this generator yields into the caller's context
+        with detached_span("llm", self.model, stream=True) as llm_span:
+            cache_key, cached = self._cache_lookup(payload)
+            if cached is not None:
+                self._track_usage(llm_span, cached)
+                if isinstance(cached.content, str) and cached.content:
+                    yield cached.content
+                yield cached
+                return
+
+            text_content = ""
+            tool_calls = []
+            usage_meta = {}
+            got_candidates = False
+
+            chunks = self._stream_chunks(url, payload, llm_span)
+            while True:
+                try:
+                    chunk = await cancellable(chunks.__anext__(), token)
+                except StopAsyncIteration:
+                    break
+                candidates = chunk.get("candidates") or []
+                if candidates:
+                    if not got_candidates:
+                        llm_span.set(first_token_ms=round((time.time() - llm_span.start) * 1000, 2))
+                    got_candidates = True
+                    for part in candidates[0].get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            text_content += part["text"]
+                            yield part["text"]
+                        if "functionCall" in part:
+                            tool_calls.append(self._function_call(part["functionCall"]))
+                # Usage is cumulative; the last chunk carries the final counts
+                usage_meta = chunk.get("usageMetadata", usage_meta)
+
+            if not got_candidates:
+                self._dump_payload(payload)
+                raise RuntimeError("Gemini returned no candidates.\nPayload dumped to debug_gemini_payload_error.json")
+
+            result = self._make_result(text_content, tool_calls, usage_meta)
+            self._track_usage(llm_span, result)
+            self._cache_store(cache_key, result)
+            yield result
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool] = [],
+        tool_choice: Any = "auto",
+        json_output: bool = False,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Any = None,
+    ) -> CreateResult:
+
+        # Native Gemini API URL
+        url = f"{self.base_url}/models/{self.model}:generateContent"
+        token = cancellation_token or run_cancellation.get()
+        payload = self._build_payload(messages, tools)
+
+        with span("llm", self.model) as llm_span:
+            cache_key, cached = self._cache_lookup(payload)
+            if cached is not None:
+                self._track_usage(llm_span, cached)
+                return cached
+
+            # Execute Request (async, on the pooled connection); the token aborts it, retries included
+            response = await cancellable(self._post(url, payload), token)
+
+            if response.status_code != 200:
+                 self._dump_payload(payload)
+                 raise RuntimeError(f"Gemini Native API Error {response.status_code}: {response.text}")
+
+            result = self._parse_response(response.json(), payload)
+            self._track_usage(llm_span, result)
+            self._cache_store(cache_key, result)
+            return result
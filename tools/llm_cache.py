@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+from tools.disk_cache import DiskCache
+
+# Parts of the Gemini payload that determine the response
+KEY_FIELDS = ("contents", "tools", "generationConfig")
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses: an in-memory LRU in front of an
+    optional persistent SQLite tier (DiskCache). Entries expire after `ttl`
+    seconds in both tiers.
+    """
+    def __init__(self, max_memory_entries: int = 256, ttl: Optional[float] = None, path: Optional[str] = None, max_disk_entries: int = 5000):
+        self.max_memory_entries = max_memory_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk = DiskCache(path, namespace="llm_responses", ttl=ttl, max_entries=max_disk_entries) if path else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """
+        Builds a cache from GEMINI_RESPONSE_CACHE* env vars, or None when caching is off.
+        """
+        if os.getenv("GEMINI_RESPONSE_CACHE", "").lower() not in ("1", "true", "yes"):
+            return None
+        ttl = os.getenv("GEMINI_RESPONSE_CACHE_TTL")
+        return cls(
+            max_memory_entries=int(os.getenv("GEMINI_RESPONSE_CACHE_MEMORY_ENTRIES", "256")),
+            ttl=float(ttl) if ttl else None,
+            path=os.getenv("GEMINI_RESPONSE_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite")),
+        )
+
+    @staticmethod
+    def make_key(model: str, payload: dict) -> str:
+        """
+        Stable hash of the request: canonical JSON of the model and the payload
+        fields that affect generation (safety settings are constant).
+        """
+        canonical = {"model": model}
+        for field in KEY_FIELDS:
+            if field in payload:
+                canonical[field] = payload[field]
+        raw = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or now - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._memory[key]
+
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, value, now)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self.stores += 1
+            self._remember(key, value, time.time())
+        if self._disk is not None:
+            self._disk.set(key, value)
+
+    def _remember(self, key: str, value: Any, stored_at: float) -> None:
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
@@ -0,0 +1,387 @@
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from tools.cancellation import raise_if_cancelled, run_cancellation
+from tools.telemetry import span
+
+# Process-wide Gemini budget shared by every agent, the Supervisor and the AutoGen client.
+# Set these to the quota of your API key; GEMINI_RPM=0 disables scheduling.
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+# Requests that may start back to back after an idle period
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "10"))
+# Output tokens reserved per request until the real usage is known
+GEMINI_EXPECTED_OUTPUT_TOKENS = int(os.getenv("GEMINI_EXPECTED_OUTPUT_TOKENS", "1024"))
+# Pause applied to everyone when a provider SDK reports a 429 without a Retry-After value
+GEMINI_RETRY_AFTER = float(os.getenv("GEMINI_RETRY_AFTER", "10"))
+
+# Priority classes, served strictly in this order
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+# Set per research run (see server.events.graph_events); copied into worker threads by asyncio.to_thread
+llm_session: ContextVar[Optional[str]] = ContextVar("llm_session", default=None)
+llm_priority: ContextVar[str] = ContextVar("llm_priority", default=INTERACTIVE)
+
+# Queue wait samples kept per priority for percentiles
+WAIT_SAMPLES = 1000
+
+def estimate_tokens(text: str, max_output_tokens: Optional[int] = None) -> int:
+    # ~4 characters per token for the prompt, plus the reserved output
+    return len(text) // 4 + (max_output_tokens or GEMINI_EXPECTED_OUTPUT_TOKENS)
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class Grant:
+    """
+    Permission for one LLM request. settle() corrects the token budget with
+    the real usage once the response is in.
+    """
+    def __init__(self, scheduler: "LLMScheduler", tokens: int, waited: float):
+        self.scheduler = scheduler
+        self.tokens = tokens
+        self.waited = waited
+        self._settled = False
+
+    def settle(self, used_tokens: Optional[int] = None) -> None:
+        if self._settled:
+            return
+        self._settled = True
+        if used_tokens is not None:
+            self.scheduler._adjust_tokens(self.tokens - used_tokens)
+
+class _Waiter:
+    def __init__(self, tokens: int, priority: str, session: Optional[str]):
+        self.tokens = tokens
+        self.priority = priority
+        self.session = session
+        self.enqueued = time.monotonic()
+        self.cancelled = False
+        self.grant: Optional[Grant] = None
+        self.event = threading.Event()
+        self.loop = None
+        self.future = None
+
+    def wake(self) -> None:
+        self.event.set()
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+class LLMScheduler:
+    """
+    Token-bucket scheduler for LLM requests (requests/minute and tokens/minute).
+
+    Callers wait in per-priority classes; interactive requests are always
+    served before batch ones. Within a class, sessions are served round-robin
+    so one long run can't starve the others. A 429 from the API pauses
+    dispatching for everyone (throttle()) instead of letting each caller retry
+    on its own schedule. Works from the event loop and from worker threads.
+    """
+    def __init__(self, rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM, burst: int = GEMINI_BURST):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst = max(1, burst)
+        self.enabled = rpm > 0
+        self._requests = float(self.burst)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        # priority -> session -> FIFO of waiters (OrderedDict order is the round-robin order)
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self._cond = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITIES}
+        self._granted = {priority: 0 for priority in PRIORITIES}
+        self._throttled = 0
+
+    # Budget
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.burst, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _delay_for(self, tokens: int, now: float) -> float:
+        # Seconds until a request of this size fits the budget
+        delay = max(0.0, self._paused_until - now)
+        if self._requests < 1:
+            delay = max(delay, (1 - self._requests) * 60 / self.rpm)
+        tokens = min(tokens, self.tpm)
+        if self.tpm > 0 and self._tokens < tokens:
+            delay = max(delay, (tokens - self._tokens) * 60 / self.tpm)
+        return delay
+
+    def _adjust_tokens(self, delta: float) -> None:
+        with self._cond:
+            # Negative balances are allowed: an underestimate is paid back by later requests
+            self._tokens = min(self.tpm, self._tokens + delta)
+            self._cond.notify()
+
+    def throttle(self, seconds: float) -> None:
+        """
+        Pauses dispatching for everyone, e.g. after a 429 with Retry-After.
+        """
+        with self._cond:
+            self._throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # Only one probe request goes out when the pause ends; the rest follow at the refill rate
+            self._requests = min(self._requests, 1.0)
+            self._cond.notify()
+
+    # Queueing
+
+    def _head(self) -> Optional[_Waiter]:
+        for priority in PRIORITIES:
+            queues = self._queues[priority]
+            while queues:
+                session, waiters = next(iter(queues.items()))
+                while waiters and waiters[0].cancelled:
+                    waiters.popleft()
+                if waiters:
+                    return waiters[0]
+                del queues[session]
+        return None
+
+    def _pop(self, waiter: _Waiter) -> None:
+        queues = self._queues[waiter.priority]
+        waiters = queues[waiter.session]
+        waiters.popleft()
+        # Round-robin: the session goes to the back of its class
+        del queues[waiter.session]
+        if waiters:
+            queues[waiter.session] = waiters
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                waiter = self._head()
+                if waiter is None:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                self._refill(now)
+                delay = self._delay_for(waiter.tokens, now)
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self._pop(waiter)
+                self._requests -= 1
+                self._tokens -= waiter.tokens
+                waited = now - waiter.enqueued
+                self._waits[waiter.priority].append(waited)
+                self._granted[waiter.priority] += 1
+                waiter.grant = Grant(self, waiter.tokens, waited)
+            waiter.wake()
+
+    def _new_waiter(self, tokens: int, priority: Optional[str], session: Optional[str]) -> _Waiter:
+        # Defaults come from the research run that is making the call
+        priority = priority or llm_priority.get()
+        if priority not in self._queues:
+            priority = BATCH
+        return _Waiter(tokens, priority, session if session is not None else llm_session.get())
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        with self._cond:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm-scheduler", daemon=True)
+                self._dispatcher.start()
+            self._queues[waiter.priority].setdefault(waiter.session, deque()).append(waiter)
+            self._cond.notify()
+
+    def _cancel(self, waiter: _Waiter) -> None:
+        with self._cond:
+            waiter.cancelled = True
+            # Granted just before the cancellation: hand the request and tokens back
+            if waiter.grant is not None:
+                self._requests = min(self.burst, self._requests + 1)
+                waiter.grant.settle(0)
+            self._cond.notify()
+
+    def acquire(self, tokens: int, priority: Optional[str] = None, session: Optional[str] = None) -> Grant:
+        """
+        Blocks the calling thread until the request fits the budget.
+        """
+        if not self.enabled:
+            return Grant(self, tokens, 0.0)
+        waiter = self._new_waiter(tokens, priority, session)
+        token = run_cancellation.get()
+        wake = waiter.event.set
+        if token is not None:
+            # A cancelled run stops waiting for the budget
+            token.add_callback(wake)
+        self._enqueue(waiter)
+        try:
+            waiter.event.wait()
+            if waiter.grant is None:
+                raise_if_cancelled(token)
+        except BaseException:
+            self._cancel(waiter)
+            raise
+        finally:
+            if token is not None:
+                # A run makes many calls: don't keep one callback per granted call on its token
+                token.remove_callback(wake)
+        return waiter.grant
+
+    async def acquire_async(self, tokens: int, priority: Optional[str] = None, session: Optional[str] = None) -> Grant:
+        """
+        Waits (without blocking the event loop) until the request fits the budget.
+        """
+        if not self.enabled:
+            return Grant(self, tokens, 0.0)
+        waiter = self._new_waiter(tokens, priority, session)
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        self._enqueue(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._cancel(waiter)
+            raise
+        return waiter.grant
+
+    @contextmanager
+    def slot(self, tokens: int, priority: Optional[str] = None, session: Optional[str] = None):
+        grant = self.acquire(tokens, priority, session)
+        try:
+            yield grant
+        finally:
+            grant.settle()
+
+    @asynccontextmanager
+    async def slot_async(self, tokens: int, priority: Optional[str] = None, session: Optional[str] = None):
+        grant = await self.acquire_async(tokens, priority, session)
+        try:
+            yield grant
+        finally:
+            grant.settle()
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = {p: sum(len(w) for w in self._queues[p].values()) for p in PRIORITIES}
+            waits = {p: list(self._waits[p]) for p in PRIORITIES}
+            return {
+                "enabled": self.enabled,
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "available_requests": round(self._requests, 2),
+                "available_tokens": round(self._tokens),
+                "throttled": self._throttled,
+                "priorities": {
+                    p: {
+                        "queued": queued[p],
+                        "granted": self._granted[p],
+                        "wait_p50_ms": round(_percentile(waits[p], 0.5) * 1000, 1),
+                        "wait_p95_ms": round(_percentile(waits[p], 0.95) * 1000, 1),
+                        "wait_max_ms": round(max(waits[p], default=0.0) * 1000, 1),
+                    }
+                    for p in PRIORITIES
+                },
+            }
+
+_scheduler: Optional[LLMScheduler] = None
+
+def get_scheduler() -> LLMScheduler:
+    """
+    The process-wide scheduler every Gemini entry point goes through.
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text
+
+async def scheduled_ainvoke(runnable, inputs, prompt_tokens: int, scheduler: Optional[LLMScheduler] = None, name: str = "supervisor"):
+    """
+    Invokes a LangChain runnable (e.g. the Supervisor's ChatGoogleGenerativeAI)
+    once the budget allows it, settling with the reported usage.
+    """
+    scheduler = scheduler or get_scheduler()
+    with span("llm", name) as llm_span:
+        grant = await scheduler.acquire_async(prompt_tokens + GEMINI_EXPECTED_OUTPUT_TOKENS)
+        llm_span.set(queue_wait=grant.waited)
+        try:
+            result = await runnable.ainvoke(inputs)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                scheduler.throttle(GEMINI_RETRY_AFTER)
+            grant.settle(0)
+            raise
+        usage = getattr(result, "usage_metadata", None) or {}
+        llm_span.add_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+        grant.settle(usage.get("total_tokens"))
+        return result
+
+def schedule_crewai_llm(llm, scheduler: Optional[LLMScheduler] = None):
+    """
+    Routes a CrewAI LLM's call()/acall() through the scheduler and records an
+    "llm" span per call. Usage is settled from the LLM's own token counters, so
+    the instance must not be shared between concurrent runs (see crew.registry).
+    """
+    scheduler = scheduler or get_scheduler()
+    call, acall = llm.call, getattr(llm, "acall", None)
+    name = getattr(llm, "model", "crewai")
+
+    def usage():
+        summary = llm.get_token_usage_summary()
+        return summary.prompt_tokens, summary.completion_tokens
+
+    def settle(grant: Grant, llm_span, before) -> None:
+        prompt_tokens, completion_tokens = (now - then for now, then in zip(usage(), before))
+        llm_span.add_tokens(prompt_tokens, completion_tokens)
+        grant.settle(prompt_tokens + completion_tokens)
+
+    def failed(grant: Grant, error: Exception) -> None:
+        if is_rate_limit_error(error):
+            scheduler.throttle(GEMINI_RETRY_AFTER)
+        grant.settle(0)
+
+    def scheduled_call(messages, *args, **kwargs):
+        # Runs in crew threads: a cancelled run makes no further calls, and drops the answer
+        # of the one in flight (the provider SDK call itself cannot be interrupted)
+        raise_if_cancelled()
+        with span("llm", name) as llm_span:
+            grant = scheduler.acquire(estimate_tokens(str(messages)))
+            llm_span.set(queue_wait=grant.waited)
+            before = usage()
+            try:
+                result = call(messages, *args, **kwargs)
+            except Exception as e:
+                failed(grant, e)
+                raise
+            settle(grant, llm_span, before)
+            raise_if_cancelled()
+            return result
+
+    async def scheduled_acall(messages, *args, **kwargs):
+        with span("llm", name) as llm_span:
+            grant = await scheduler.acquire_async(estimate_tokens(str(messages)))
+            llm_span.set(queue_wait=grant.waited)
+            before = usage()
+            try:
+                result = await acall(messages, *args, **kwargs)
+            except Exception as e:
+                failed(grant, e)
+                raise
+            settle(grant, llm_span, before)
+            return result
+
+    # CrewAI LLMs are pydantic models; bypass field validation to shadow the methods
+    object.__setattr__(llm, "call", scheduled_call)
+    if acall is not None:
+        object.__setattr__(llm, "acall", scheduled_acall)
+    return llm
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Completed research runs are kept here and reused for the same or similar topics
+MEMO_STORE = os.getenv("MEMO_STORE", "1").lower() in ("1", "true", "yes")
+MEMO_STORE_PATH = os.getenv("MEMO_STORE_PATH", os.path.join(".cache", "memo_store.sqlite"))
+MEMO_TTL = float(os.getenv("MEMO_TTL", str(7 * 24 * 3600)))
+MEMO_MAX_ENTRIES = int(os.getenv("MEMO_MAX_ENTRIES", "500"))
+# TF-IDF cosine similarity of topics: at or above REUSE the stored run is returned as is,
+# at or above SEED only its candidate papers are reused and every stage runs again for the new topic
+MEMO_REUSE_SIMILARITY = float(os.getenv("MEMO_REUSE_SIMILARITY", "0.9"))
+MEMO_SEED_SIMILARITY = float(os.getenv("MEMO_SEED_SIMILARITY", "0.6"))
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in", "into", "is",
+    "it", "of", "on", "or", "please", "research", "study", "the", "to", "towards", "want", "with",
+}
+
+def _stem(word: str) -> str:
+    # Plural folding is enough to match "systems"/"system", "policies"/"policy"
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def topic_terms(topic: str) -> List[str]:
+    """
+    Normalised terms of a topic: lowercase words without stopwords or plurals
+    ("Multi-Agent Systems for Driving" -> ["multi", "agent", "system", "driving"]).
+    """
+    return [_stem(w) for w in re.findall(r"[a-z0-9]+", topic.lower()) if w not in _STOPWORDS]
+
+def normalize_topic(topic: str) -> str:
+    # Order-insensitive key: "driving multi agent" and "multi-agent driving" dedupe to one memo
+    return " ".join(sorted(set(topic_terms(topic))))
+
+def tfidf_similarities(query: List[str], documents: List[List[str]]) -> List[float]:
+    """
+    Cosine similarity of the query to each document under TF-IDF weights
+    computed over the documents plus the query (smoothed IDF).
+    """
+    corpus = documents + [query]
+    df = Counter(term for doc in corpus for term in set(doc))
+    n = len(corpus)
+    idf = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+
+    def vector(terms):
+        tf = Counter(terms)
+        vec = {term: count * idf[term] for term, count in tf.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {term: v / norm for term, v in vec.items()}
+
+    q = vector(query)
+    return [sum(weight * q.get(term, 0.0) for term, weight in vector(doc).items()) for doc in documents]
+
+class MemoStore:
+    """
+    Completed research artifacts (refined topic, papers, insights, report,
+    gaps) on SQLite, one entry per normalised topic, looked up by exact key
+    or by TF-IDF similarity of topics. Safe to share between threads.
+    """
+    def __init__(self, path: str = None, ttl: Optional[float] = MEMO_TTL, max_entries: int = MEMO_MAX_ENTRIES):
+        self.path = path or MEMO_STORE_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memos ("
+            " key TEXT PRIMARY KEY, topic TEXT NOT NULL, terms TEXT NOT NULL,"
+            " artifacts TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memos_created ON memos (created)")
+        self._conn.commit()
+
+    def put(self, topic: str, artifacts: Dict[str, Any]) -> str:
+        """
+        Stores the artifacts of a finished run, replacing any older memo for
+        the same normalised topic. Returns the memo key.
+        """
+        key = normalize_topic(topic)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO memos (key, topic, terms, artifacts, created) VALUES (?, ?, ?, ?, ?)",
+                (key, topic, json.dumps(topic_terms(topic)), json.dumps(artifacts), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+        return key
+
+    def _evict(self) -> None:
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM memos WHERE created < ?", (time.time() - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM memos").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM memos WHERE key IN (SELECT key FROM memos ORDER BY created ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def _candidates(self) -> List[Tuple[str, List[str]]]:
+        oldest = time.time() - self.ttl if self.ttl is not None else 0
+        rows = self._conn.execute("SELECT key, terms FROM memos WHERE created >= ?", (oldest,)).fetchall()
+        return [(key, json.loads(terms)) for key, terms in rows]
+
+    def lookup(self, topic: str, min_similarity: float = MEMO_SEED_SIMILARITY) -> Optional[Dict[str, Any]]:
+        """
+        Best stored memo for a topic, or None below min_similarity. The result
+        carries "key", "topic", "similarity", "created" and "artifacts".
+        """
+        key, terms = normalize_topic(topic), topic_terms(topic)
+        with self._lock:
+            candidates = self._candidates()
+            best, similarity = None, 0.0
+            if any(k == key for k, _ in candidates):
+                best, similarity = key, 1.0
+            elif candidates and terms:
+                scores = tfidf_similarities(terms, [t for _, t in candidates])
+                i = max(range(len(scores)), key=scores.__getitem__)
+                best, similarity = candidates[i][0], scores[i]
+
+            if best is None or similarity < min_similarity:
+                self.misses += 1
+                return None
+            row = self._conn.execute("SELECT topic, artifacts, created FROM memos WHERE key = ?", (best,)).fetchone()
+            self.hits += 1
+        return {
+            "key": best,
+            "topic": row[0],
+            "similarity": round(similarity, 4),
+            "created": row[2],
+            "artifacts": json.loads(row[1]),
+        }
+
+    def delete(self, topic: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM memos WHERE key = ?", (normalize_topic(topic),))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM memos").fetchone()
+        return count
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_store: Optional[MemoStore] = None
+
+def get_memo_store() -> Optional[MemoStore]:
+    """
+    The process-wide memo store, or None when MEMO_STORE is off.
+    """
+    global _store
+    if not MEMO_STORE:
+        return None
+    if _store is None:
+        _store = MemoStore()
+    return _store
@@ -0,0 +1,262 @@
+import os
+import re
+import mmap
+import time
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import multiprocessing
+import httpx
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from tools.paper_index import PaperIndex, chunk_text
+from tools.telemetry import span
+
+# Full text of the best-ranked papers: PDFs are fetched, parsed in worker processes and stored as chunks
+FULLTEXT = os.getenv("FULLTEXT", "0").lower() in ("1", "true", "yes")
+FULLTEXT_MAX_PAPERS = int(os.getenv("FULLTEXT_MAX_PAPERS", "3"))
+# Downloaded PDFs, and a local directory of <arxiv id>.pdf files to read instead of downloading (offline runs, tests)
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(".cache", "pdfs"))
+PDF_SOURCE_DIR = os.getenv("PDF_SOURCE_DIR")
+ARXIV_PDF_URL = os.getenv("ARXIV_PDF_URL", "https://arxiv.org/pdf/{id}")
+# Concurrent downloads, size limit per PDF and text extraction processes
+PDF_MAX_DOWNLOADS = int(os.getenv("PDF_MAX_DOWNLOADS", "4"))
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(50 * 1024 * 1024)))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Chunk store: <CORPUS_PATH>.bin holds the chunk texts, <CORPUS_PATH>.sqlite their offsets
+CORPUS_PATH = os.getenv("CORPUS_PATH", os.path.join(".cache", "corpus"))
+CORPUS_CHUNK_WORDS = int(os.getenv("CORPUS_CHUNK_WORDS", "200"))
+
+_REFERENCES = re.compile(r"\n\s*(?:references|bibliography)\s*\n", re.IGNORECASE)
+
+def extract_pdf_text(path: str) -> str:
+    """
+    Plain text of a PDF without the reference list, hyphenation or line
+    breaks. Runs in a worker process (see ingest_papers).
+    """
+    from pdfminer.high_level import extract_text
+
+    text = extract_text(path)
+    # Drop the bibliography when it is in the second half of the paper
+    matches = list(_REFERENCES.finditer(text))
+    if matches and matches[-1].start() > len(text) / 2:
+        text = text[:matches[-1].start()]
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    return " ".join(text.split())
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Worker processes for PDF parsing (CPU bound, would block the event loop
+    or hold the GIL in a thread). Workers are spawned, not forked: the
+    server process runs threads, and a fork copies their locks in whatever
+    state they are in.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+class PaperCorpus:
+    """
+    Chunked paper full text. Chunks are appended to one data file that is
+    read through mmap; a SQLite index maps each paper to the (offset, length)
+    of its chunks, so stored papers are never parsed again. Safe to share
+    between threads.
+    """
+    def __init__(self, path: str = None, chunk_words: int = CORPUS_CHUNK_WORDS):
+        self.path = path or CORPUS_PATH
+        self.chunk_words = chunk_words
+        self.data_path = self.path + ".bin"
+        self._lock = threading.Lock()
+        self._view: Optional[mmap.mmap] = None
+        self._view_size = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        open(self.data_path, "ab").close()
+        self._conn = sqlite3.connect(self.path + ".sqlite", check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS papers ("
+            " paper_id TEXT PRIMARY KEY, source TEXT, chunks INTEGER NOT NULL, added REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " paper_id TEXT NOT NULL, seq INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL,"
+            " PRIMARY KEY (paper_id, seq))"
+        )
+        self._conn.commit()
+
+    def add(self, paper_id: str, text: str, source: str = "") -> int:
+        """
+        Chunks and stores a paper's text, replacing an earlier copy (its bytes
+        stay in the data file). Returns the number of chunks.
+        """
+        chunks = chunk_text(text, self.chunk_words)
+        with self._lock:
+            rows = []
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                for seq, chunk in enumerate(chunks):
+                    data = chunk.encode("utf-8")
+                    f.write(data)
+                    rows.append((paper_id, seq, offset, len(data)))
+                    offset += len(data)
+            self._conn.execute("DELETE FROM chunks WHERE paper_id = ?", (paper_id,))
+            self._conn.executemany("INSERT INTO chunks (paper_id, seq, offset, length) VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO papers (paper_id, source, chunks, added) VALUES (?, ?, ?, ?)",
+                (paper_id, source, len(chunks), time.time())
+            )
+            self._conn.commit()
+        return len(chunks)
+
+    def _mapped(self) -> Optional[mmap.mmap]:
+        # Remap once the data file has grown past the mapped size
+        size = os.path.getsize(self.data_path)
+        if size and size > self._view_size:
+            if self._view is not None:
+                self._view.close()
+            with open(self.data_path, "rb") as f:
+                self._view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view_size = size
+        return self._view
+
+    def __contains__(self, paper_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM papers WHERE paper_id = ?", (paper_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()
+        return count
+
+    def chunk_count(self, paper_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT chunks FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+        return row[0] if row else 0
+
+    def chunks(self, paper_id: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT offset, length FROM chunks WHERE paper_id = ? ORDER BY seq", (paper_id,)
+            ).fetchall()
+            view = self._mapped() if rows else None
+            return [view[offset:offset + length].decode("utf-8") for offset, length in rows]
+
+    def passages(self, query: str, paper_ids: List[str], k: int) -> List[Dict[str, object]]:
+        """
+        The k chunks of the given papers most relevant to the query (BM25),
+        best first, as {"id", "text", "score"}. Chunks without a matching
+        term are left out.
+        """
+        texts = [(paper_id, chunk) for paper_id in paper_ids for chunk in self.chunks(paper_id)]
+        if not texts:
+            return []
+        # Stored chunks are already within chunk_words, so the index keeps them whole
+        index = PaperIndex([{"title": "", "summary": chunk} for _, chunk in texts], chunk_words=self.chunk_words)
+        return [
+            {"id": texts[c["paper"]][0], "text": c["text"], "score": c["score"]}
+            for c in index.top_chunks(query, k) if c["score"] > 0
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._view is not None:
+                self._view.close()
+                self._view = None
+            self._conn.close()
+
+_corpus: Optional[PaperCorpus] = None
+
+def get_corpus() -> PaperCorpus:
+    """
+    The process-wide paper corpus, opened on first use.
+    """
+    global _corpus
+    if _corpus is None:
+        _corpus = PaperCorpus()
+    return _corpus
+
+def _pdf_name(arxiv_id: str) -> str:
+    # Old-style IDs contain a slash (hep-th/9901001)
+    return arxiv_id.replace("/", "_") + ".pdf"
+
+async def fetch_pdf(arxiv_id: str, client: Optional[httpx.AsyncClient] = None, cache_dir: str = PDF_CACHE_DIR, source_dir: Optional[str] = None) -> str:
+    """
+    Local path of a paper's PDF: <source_dir>/<id>.pdf when a source
+    directory is given, otherwise a cached or newly downloaded copy. Downloads
+    are streamed to disk and never held in memory.
+    """
+    if source_dir:
+        path = os.path.join(source_dir, _pdf_name(arxiv_id))
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return path
+
+    path = os.path.join(cache_dir, _pdf_name(arxiv_id))
+    if os.path.exists(path):
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    # A file of its own per download: concurrent fetches of one paper must not interleave
+    fd, partial = tempfile.mkstemp(prefix=_pdf_name(arxiv_id) + ".", suffix=".part", dir=cache_dir)
+    os.close(fd)
+    try:
+        async with client.stream("GET", ARXIV_PDF_URL.format(id=arxiv_id), follow_redirects=True) as response:
+            response.raise_for_status()
+            size = 0
+            with open(partial, "wb") as f:
+                async for block in response.aiter_bytes(64 * 1024):
+                    size += len(block)
+                    if size > PDF_MAX_BYTES:
+                        raise ValueError(f"PDF of {arxiv_id} is larger than {PDF_MAX_BYTES} bytes")
+                    f.write(block)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return path
+
+async def ingest_papers(arxiv_ids: List[str], corpus: Optional[PaperCorpus] = None, client: Optional[httpx.AsyncClient] = None, source_dir: Optional[str] = PDF_SOURCE_DIR) -> Dict[str, int]:
+    """
+    Adds the papers that are not in the corpus yet: PDFs are fetched
+    concurrently (at most PDF_MAX_DOWNLOADS at once) and parsed in the process
+    pool. Returns arXiv ID -> stored chunks; a paper that fails has 0.
+    """
+    corpus = corpus if corpus is not None else get_corpus()
+    semaphore = asyncio.Semaphore(PDF_MAX_DOWNLOADS)
+    loop = asyncio.get_running_loop()
+    http = client or (None if source_dir else httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)))
+
+    async def one(arxiv_id: str):
+        if arxiv_id in corpus:
+            return arxiv_id, corpus.chunk_count(arxiv_id)
+        with span("pdf", "ingest", paper=arxiv_id) as pdf_span:
+            try:
+                async with semaphore:
+                    path = await fetch_pdf(arxiv_id, http, source_dir=source_dir)
+                text = await loop.run_in_executor(get_process_pool(), extract_pdf_text, path)
+                count = await asyncio.to_thread(corpus.add, arxiv_id, text, path)
+            except Exception as e:
+                print(f"DEBUG: Full text of {arxiv_id} unavailable: {e}")
+                pdf_span.set(error=str(e)[:200])
+                return arxiv_id, 0
+            pdf_span.set(chunks=count)
+            return arxiv_id, count
+
+    try:
+        return dict(await asyncio.gather(*(one(arxiv_id) for arxiv_id in arxiv_ids)))
+    finally:
+        if http is not None and client is None:
+            await http.aclose()
@@ -0,0 +1,96 @@
+import os
+import re
+import numpy as np
+from typing import Any, Dict, List
+from tools.memo_store import topic_terms
+
+# Abstracts are split into chunks of about this many words (whole sentences)
+PAPER_CHUNK_WORDS = int(os.getenv("PAPER_CHUNK_WORDS", "60"))
+# BM25 term-frequency saturation and length normalisation
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+def chunk_text(text: str, max_words: int = PAPER_CHUNK_WORDS) -> List[str]:
+    """
+    Splits text into chunks of whole sentences of at most max_words words
+    (a longer sentence is a chunk on its own).
+    """
+    chunks, current, size = [], [], 0
+    for sentence in _SENTENCE.split(" ".join(text.split())):
+        words = len(sentence.split())
+        if current and size + words > max_words:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        if sentence:
+            current.append(sentence)
+            size += words
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+class PaperIndex:
+    """
+    In-memory BM25 index over paper titles and abstracts, held as a NumPy
+    chunk x term matrix. Every chunk is indexed together with its paper's
+    title, so a title match lifts all chunks of that paper.
+    """
+    def __init__(self, papers: List[Dict[str, Any]], chunk_words: int = PAPER_CHUNK_WORDS, k1: float = BM25_K1, b: float = BM25_B):
+        self.papers = papers
+        self.k1 = k1
+        self.b = b
+        self.chunks: List[Dict[str, Any]] = []
+        for i, paper in enumerate(papers):
+            for text in chunk_text(paper.get("summary", ""), chunk_words) or [""]:
+                self.chunks.append({"paper": i, "text": text})
+
+        tokens = [topic_terms(f"{papers[c['paper']]['title']} {c['text']}") for c in self.chunks]
+        self.vocabulary: Dict[str, int] = {}
+        for terms in tokens:
+            for term in terms:
+                self.vocabulary.setdefault(term, len(self.vocabulary))
+
+        self.tf = np.zeros((len(self.chunks), len(self.vocabulary)), dtype=np.float32)
+        for row, terms in enumerate(tokens):
+            np.add.at(self.tf[row], [self.vocabulary[t] for t in terms], 1.0)
+        self.lengths = self.tf.sum(axis=1)
+        avg_length = self.lengths.mean() if len(self.chunks) else 0.0
+        self.norm = k1 * (1 - b + b * self.lengths / (avg_length or 1.0))
+        df = (self.tf > 0).sum(axis=0)
+        n = len(self.chunks)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        BM25 score of every chunk for the query.
+        """
+        ids = [self.vocabulary[t] for t in topic_terms(query) if t in self.vocabulary]
+        if not ids or not self.chunks:
+            return np.zeros(len(self.chunks), dtype=np.float32)
+        tf = self.tf[:, ids]
+        weights = tf * (self.k1 + 1) / (tf + self.norm[:, None])
+        return weights @ self.idf[ids]
+
+    def rank_papers(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Papers ordered by their best chunk's score, each with a "relevance"
+        field. Ties keep the original (arXiv) order.
+        """
+        best = np.zeros(len(self.papers), dtype=np.float32)
+        if self.chunks:
+            np.maximum.at(best, [c["paper"] for c in self.chunks], self.scores(query))
+        order = np.argsort(-best, kind="stable")
+        return [{**self.papers[i], "relevance": round(float(best[i]), 4)} for i in order]
+
+    def top_chunks(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """
+        The k best chunks for the query, best first, with "paper" (index into
+        papers), "text" and "score".
+        """
+        scores = self.scores(query)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [{**self.chunks[i], "score": round(float(scores[i]), 4)} for i in order]
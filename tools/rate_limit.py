@@ -0,0 +1,58 @@
+import time
+import asyncio
+import threading
+from tools.cancellation import cancellable_sleep
+
+class RateLimiter:
+    """
+    Thread-safe token bucket usable from both threads and coroutines.
+
+    `rate` is in requests per second and `burst` is the bucket size. Callers
+    reserve a slot under the lock and then sleep outside it, so waiting callers
+    are served in arrival order without holding the lock.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Takes one token and returns how long the caller must wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Tokens may go negative: that is the queue of callers already waiting
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def _release(self) -> None:
+        # A reserved slot that will not be used (the caller was cancelled while waiting)
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            try:
+                # Wakes early if the research run is cancelled (tools/cancellation.py)
+                cancellable_sleep(delay)
+            except asyncio.CancelledError:
+                self._release()
+                raise
+
+    async def acquire_async(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Cancelled speculative searches and abandoned runs must not delay later callers
+                self._release()
+                raise
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import uuid
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+# Optional JSONL trace file: one line per finished span (node, LLM call, arXiv query)
+TRACE_FILE = os.getenv("TRACE_FILE")
+
+# Histogram buckets (seconds) for span durations and queue waits
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Innermost open span in this context; asyncio.to_thread copies it into CrewAI kickoff threads
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+# Research session of the current run (set by server.events.graph_events)
+trace_session: ContextVar[Optional[str]] = ContextVar("trace_session", default=None)
+
+class Span:
+    """
+    One timed operation. `kind` is "node", "llm" or "arxiv"; attributes such as
+    prompt_tokens, completion_tokens, queue_wait or cached can be set while it runs.
+    Tokens of LLM spans are also added to their enclosing node span.
+    """
+    def __init__(self, kind: str, name: str, parent: Optional["Span"] = None, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.session = trace_session.get()
+        self.attrs: Dict[str, Any] = attrs
+        self.status = "ok"
+        self.start = time.time()
+        self.duration = 0.0
+
+    @property
+    def agent(self) -> str:
+        # Nearest enclosing graph node, used to attribute LLM cost to an agent
+        span = self
+        while span is not None:
+            if span.kind == "node":
+                return span.name
+            span = span.parent
+        return "none"
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, **values) -> None:
+        # Accumulates numeric attributes, e.g. queue_wait over several retries
+        with _lock:
+            for key, value in values.items():
+                self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def add_tokens(self, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        with _lock:
+            span = self
+            while span is not None:
+                if span is self or span.kind == "node":
+                    span.attrs["prompt_tokens"] = span.attrs.get("prompt_tokens", 0) + (prompt_tokens or 0)
+                    span.attrs["completion_tokens"] = span.attrs.get("completion_tokens", 0) + (completion_tokens or 0)
+                span = span.parent
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": self.start,
+            "session": self.session,
+            "span_id": self.id,
+            "parent_id": self.parent.id if self.parent else None,
+            "kind": self.kind,
+            "name": self.name,
+            "agent": self.agent,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 2),
+            **self.attrs,
+        }
+
+_lock = threading.Lock()
+
+class _Metrics:
+    """
+    Minimal in-process metrics registry rendered in Prometheus text format.
+    """
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], list] = {}
+        self.help: Dict[str, Tuple[str, str]] = {}
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self.help[name] = (kind, text)
+
+    def inc(self, name: str, labels: dict, value: float = 1.0) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        # [bucket counts..., sum, count]
+        entry = self.histograms.setdefault(key, [0] * len(LATENCY_BUCKETS) + [0.0, 0])
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                entry[i] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+_metrics = _Metrics()
+_metrics.describe("research_span_duration_seconds", "histogram", "Wall time of graph nodes, LLM calls and arXiv queries")
+_metrics.describe("research_queue_wait_seconds", "histogram", "Time spent waiting for the LLM budget or the arXiv rate limiter")
+_metrics.describe("research_llm_tokens_total", "counter", "LLM tokens by agent and type (prompt/completion)")
+_metrics.describe("research_handoff_tokens_total", "counter", "Estimated tokens of the stage inputs passed to each worker agent")
+_metrics.describe("research_cache_requests_total", "counter", "Cache lookups for LLM responses and arXiv results")
+_metrics.describe("research_span_errors_total", "counter", "Spans that ended with an exception")
+
+def _record(span: Span) -> None:
+    labels = {"kind": span.kind, "name": span.name}
+    with _lock:
+        _metrics.observe("research_span_duration_seconds", labels, span.duration)
+        if span.status != "ok":
+            _metrics.inc("research_span_errors_total", labels)
+        if "queue_wait" in span.attrs:
+            _metrics.observe("research_queue_wait_seconds", {"kind": span.kind}, span.attrs["queue_wait"])
+        if span.kind == "llm":
+            for kind in ("prompt", "completion"):
+                tokens = span.attrs.get(f"{kind}_tokens")
+                if tokens:
+                    _metrics.inc("research_llm_tokens_total", {"agent": span.agent, "type": kind}, tokens)
+        if span.attrs.get("handoff_tokens"):
+            _metrics.inc("research_handoff_tokens_total", {"agent": span.agent}, span.attrs["handoff_tokens"])
+        if "cached" in span.attrs:
+            result = "hit" if span.attrs["cached"] else "miss"
+            _metrics.inc("research_cache_requests_total", {"kind": span.kind, "result": result})
+
+        if TRACE_FILE:
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+@contextmanager
+def detached_span(kind: str, name: str, **attrs):
+    """
+    Times the block as a child of the current span without becoming the
+    current span itself. For async generators: a span made current there
+    would leak into the consumer's context at every yield. Pass it on
+    explicitly where the work inside needs it.
+    """
+    current = Span(kind, name, parent=_current_span.get(), **attrs)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+        current.set(error=str(e)[:200])
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _record(current)
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    """
+    Times the block as a child of the current span. Works in threads and in
+    async code (the block may await, but not yield: see detached_span).
+    """
+    with detached_span(kind, name, **attrs) as current:
+        token = _current_span.set(current)
+        try:
+            yield current
+        finally:
+            _current_span.reset(token)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def traced_node(name: str, fn):
+    """
+    Wraps an async LangGraph node in a "node" span. The signature is kept
+    (functools.wraps), so LangGraph still passes `config` to nodes that take it.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with span("node", name):
+            return await fn(*args, **kwargs)
+    return wrapper
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+def render_metrics(gauges: Optional[Dict[str, Tuple[str, Dict[Tuple, float]]]] = None) -> str:
+    """
+    Prometheus text exposition of all recorded metrics. `gauges` maps a metric
+    name to (help text, {label tuple: value}) for values sampled at scrape time.
+    """
+    lines = []
+    with _lock:
+        names = sorted({name for name, _ in _metrics.counters} | {name for name, _ in _metrics.histograms})
+        for name in names:
+            kind, text = _metrics.help.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), entry in sorted(_metrics.histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(LATENCY_BUCKETS, entry):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {entry[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {entry[-2]:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {entry[-1]}")
+            else:
+                for (metric, labels), value in sorted(_metrics.counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+    for name, (text, samples) in sorted((gauges or {}).items()):
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in sorted(samples.items()):
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+def reset_metrics() -> None:
+    global _metrics
+    with _lock:
+        help_text = _metrics.help
+        _metrics = _Metrics()
+        _metrics.help = help_text
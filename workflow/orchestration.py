@@ -3,8 +3,11 @@ import os
 from dotenv import load_dotenv
 from autogen_agentchat.teams import SelectorGroupChat
 from autogen_agentchat.conditions import TextMentionTermination
+from autogen_agentchat.messages import ModelClientStreamingChunkEvent
 from autogen_core.tools import FunctionTool
-from tools.custom_gemini_client import CustomGeminiClient
+from typing import Callable, Optional
+from tools.custom_gemini_client import CustomGeminiClient, close_shared_http_client
+from tools.llm_cache import ResponseCache
 from agents.research_agents import create_research_agents
 from agents.user_proxy import create_user_proxy
 from tools.arxiv_search import search_arxiv
@@ -13,7 +16,16 @@ from tools.user_interaction import approve_papers
 # Load env variables
 load_dotenv()
 
-async def run_workflow():
+DEFAULT_TOPIC = "Multi-Agent Systems for Autonomous Driving"
+
+async def run_workflow(topic: str = DEFAULT_TOPIC, read_input: Optional[Callable[[str], str]] = None, on_message: Optional[Callable[[object], None]] = None, verbose: bool = True, close_http_pool: bool = True):
+    """
+    Runs the AutoGen research team on `topic` and returns the final TaskResult.
+    `read_input` replaces console input for the User_Proxy (a reply containing
+    TERMINATE ends the run) and `on_message` sees every streamed item.
+    Benchmarks run several workflows on one event loop with verbose=False and
+    close_http_pool=False.
+    """
     # Load config from env
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
@@ -23,7 +35,8 @@ async def run_workflow():
     # Initialize Model Client using CustomGeminiClient
     model_client = CustomGeminiClient(
         api_key=api_key,
-        model="gemini-2.5-flash"
+        model="gemini-2.5-flash",
+        response_cache=ResponseCache.from_env() # Opt-in via GEMINI_RESPONSE_CACHE=1
     )
 
     # Prepare Tools
@@ -36,7 +49,7 @@ async def run_workflow():
     # Create Agents
     # Pass tools to create_research_agents so they can be assigned to Paper_Discovery_Agent
     agents_dict = create_research_agents(model_client, paper_discovery_tools=[paper_search_tool])
-    user_proxy = create_user_proxy()
+    user_proxy = create_user_proxy(read_input)
 
     # --- Deterministic Selector Logic ---
     from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage, ModelCapabilities, ModelInfo, LLMMessage
@@ -117,7 +130,8 @@ async def run_workflow():
         "Insight_Synthesizer_Agent", "Report_Compiler_Agent", "Gap_Analysis_Agent"
     ])
 
-    selector_prompt = "You are a deterministic selector. This prompt is ignored by the logic."
+    # DeterministicSelector only reads the conversation history to find the last speaker
+    selector_prompt = "You are a deterministic selector. Conversation so far:\n\n{history}"
 
     termination = TextMentionTermination(text="TERMINATE")
 
@@ -138,13 +152,23 @@ async def run_workflow():
 
     # Run the workflow
     print("Initiating Research Assistant (AutoGen 0.4)...")
-    initial_message = """I want to research "Multi-Agent Systems for Autonomous Driving". 
+    initial_message = f"""I want to research "{topic}". 
 Please refine this topic, find relevant papers, synthesize insights, compile a report, and identify research gaps.
 """
     
     # Run with streaming to see progress
+    result = None
     stream = team.run_stream(task=initial_message)
     async for msg in stream:
+        result = msg
+        if on_message is not None:
+            on_message(msg)
+        if not verbose:
+            continue
+        if isinstance(msg, ModelClientStreamingChunkEvent):
+            # Token deltas: print inline as they arrive
+            print(msg.content, end="", flush=True)
+            continue
         print(f"DEBUG: Msg type: {type(msg)}")
         if hasattr(msg, 'source'):
             print(f"DEBUG: Source: {msg.source}")
@@ -155,6 +179,17 @@ Please refine this topic, find relevant papers, synthesize insights, compile a r
         else:
             print(f"DEBUG: Unhandled msg: {msg}")
 
+    usage = model_client.total_usage()
+    print(f"DEBUG: Token usage: prompt={usage.prompt_tokens} completion={usage.completion_tokens}")
+    if model_client.response_cache is not None:
+        print(f"DEBUG: Response cache stats: {model_client.response_cache.stats()}")
+
+    # Release pooled HTTP connections
+    await model_client.close()
+    if close_http_pool:
+        await close_shared_http_client()
+    return result
+
 def main():
     asyncio.run(run_workflow())
 